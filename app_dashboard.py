@@ -4,6 +4,25 @@ import torch
 from sentence_transformers import SentenceTransformer
 from datetime import datetime
 import re
+import os
+import time
+import json
+from db_publish import resolve_db_path
+from farm_queries import (
+    fetch_week_list, fetch_all_crops, fetch_briefing_rows, filter_by_crops,
+    organize_items_smartly, search_documents, search_vectors, fetch_weather_yoy, fetch_weather_regions,
+    fetch_trend_top_tags, fetch_trend_seasonal, fetch_trend_first_mentions, fetch_related,
+    fetch_risk_series, fetch_risk_crops, fetch_near_dups, week_no
+)
+from weather_extract import METRIC_LABELS
+from risk_index import ALL_CROPS
+from suggest_index import SuggestIndex, load_suggest_index
+from typo_index import TypoIndex, load_typo_index
+from content_render import render_display, clean_title as content_clean_title
+import perf_metrics
+import edge_bundle
+import shards
+from perf_metrics import stage
 
 # ==========================================
 # 1. 페이지 설정 및 스타일
@@ -73,24 +92,62 @@ def material_icon(name, size=20, color=None):
 # ==========================================
 # 2. 리소스 로드
 # ==========================================
+MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+
+# [오프라인 번들] FARM_BUNDLE 이 있으면 번들의 양자화 모델/DB/확장만 사용 (python edge_bundle.py launch)
+BUNDLE = edge_bundle.active_bundle()
+
 @st.cache_resource
+def load_model():
+    if BUNDLE:
+        return edge_bundle.load_bundle_model(BUNDLE)
+    return SentenceTransformer(MODEL_NAME, device='cpu')
+
+@st.cache_resource
+def load_bundle_vectors():
+    return edge_bundle.load_bundle_vectors(BUNDLE) if BUNDLE else None
+
+# [블루/그린] DB 경로별로 연결을 캐시 -> 포인터가 바뀌면 새 연결이 생기고,
+# 직전 버전 연결은 다음 교체 때까지 남아 진행 중인 세션을 보호함
+@st.cache_resource(max_entries=2)
+def open_database(db_path):
+    if BUNDLE:
+        con = edge_bundle.open_bundle_database(BUNDLE)
+    else:
+        con = duckdb.connect(
+            db_path, 
+            read_only=True, 
+            config={'allow_unsigned_extensions': 'true'}
+        )
+        con.execute("INSTALL vss; LOAD vss;")
+
+    # 워밍: 첫 사용자 요청 전에 카탈로그/주요 컬럼 블록을 미리 읽어 둠
+    warm_cols = "COUNT(*), MAX(year)" if BUNDLE and BUNDLE['vectors'] == 'npy' else "COUNT(*), MAX(year), COUNT(embedding)"
+    con.execute(f"SELECT {warm_cols} FROM farm_info").fetchone()
+    con.execute("SELECT DISTINCT year, month, regexp_extract(title, '\\[(.*?)\\]', 1) FROM farm_info").fetchall()
+    return con
+
+# [연도별 샤드] db_shards/manifest.json 이 있고 현재 공개 버전에서 만든 샤드면 검색만 샤드 팬아웃 (python shards.py build)
+# 매니페스트 해시가 캐시 키 -> 샤드가 갱신되면 새로 ATTACH
+@st.cache_resource(max_entries=2)
+def open_shards(manifest_key):
+    try:
+        return shards.open_shard_set()
+    except Exception:
+        return None
+
 def load_resources():
-    model_name = 'jhgan/ko-sroberta-multitask'
-    
     with st.spinner("시스템 초기화 중..."):
         try:
-            model = SentenceTransformer(model_name, device='cpu')
-            con = duckdb.connect(
-                'farming_granular.duckdb', 
-                read_only=True, 
-                config={'allow_unsigned_extensions': 'true'}
-            )
-            con.execute("INSTALL vss; LOAD vss;")
-            return model, con, "ok"
+            model = load_model()
+            db_path = edge_bundle.bundle_db_path(BUNDLE) if BUNDLE else resolve_db_path()
+            con = open_database(db_path)
+            return model, con, db_path, "ok"
         except Exception as e:
-            return None, None, str(e)
+            return None, None, None, str(e)
 
-model, con, status = load_resources()
+with stage('resource_load'):
+    model, con, db_path, status = load_resources()
 
 if status != "ok":
     st.error(f"시스템 오류: {status}")
@@ -99,81 +156,107 @@ if status != "ok":
 # ==========================================
 # 3. 유틸리티 함수
 # ==========================================
-def format_content(text):
-    if not text: return ""
-    text = text.replace('~', r'\~')
-    return text
+def format_content(display_md, content):
+    # 적재 시 렌더링된 본문(farm_display) 우선, 없거나 구버전이면 여기서 렌더링
+    return display_md if display_md is not None else render_display(content)
 
+# db_path 인자는 캐시 키 용도 (새 버전이 공개되면 자동으로 다른 캐시 사용)
 @st.cache_data(ttl=3600)
-def get_week_list(year, month):
+def get_week_list(db_path, year, month):
     try:
-        sql = """
-            SELECT DISTINCT regexp_extract(title, '\\[(.*?)\\]', 1) as week_range 
-            FROM farm_info 
-            WHERE year = ? AND month = ? 
-            ORDER BY week_range
-        """
-        return [row[0] for row in con.execute(sql, [int(year), int(month)]).fetchall() if row[0]]
+        return fetch_week_list(con, year, month)
     except:
         return []
 
 @st.cache_data(ttl=3600)
-def get_all_categories():
+def get_all_categories(db_path):
     try:
-        sql = "SELECT DISTINCT unnest(tags_crop) FROM farm_info ORDER BY 1"
-        rows = con.execute(sql).fetchall()
-        return [r[0] for r in rows if r[0]]
+        return fetch_all_crops(con)
     except:
         return []
 
-def organize_items_smartly(items, target_date_obj):
-    if not items: return []
+@st.cache_data(ttl=3600)
+def get_weather_yoy(db_path, metric, region):
+    try:
+        return fetch_weather_yoy(con, metric, region)
+    except:
+        return []
 
-    weeks_group = {}
-    for item in items:
-        w_range = item[4]
-        if not w_range: continue
-        if w_range not in weeks_group: weeks_group[w_range] = []
-        weeks_group[w_range].append(item)
-    
-    if not weeks_group: return []
+@st.cache_data(ttl=3600)
+def get_weather_regions(db_path, metric):
+    try:
+        return fetch_weather_regions(con, metric)
+    except:
+        return []
 
-    best_week = None
-    min_diff_days = 9999
-    
-    for w_str in weeks_group.keys():
-        try:
-            start_str = w_str.split('~')[0]
-            w_date = datetime.strptime(start_str, "%Y-%m-%d")
-            w_date_adj = w_date.replace(year=target_date_obj.year)
-            
-            diff = abs((target_date_obj - w_date_adj).days)
-            if diff < min_diff_days:
-                min_diff_days = diff
-                best_week = w_str
-        except:
-            continue
-            
-    if not best_week:
-        best_week = list(weeks_group.keys())[0]
+@st.cache_data(ttl=3600)
+def get_trend_top_tags(db_path, tag_type):
+    try:
+        return fetch_trend_top_tags(con, tag_type)
+    except:
+        return []
 
-    target_items = weeks_group[best_week]
-    
-    summary_list = []
-    weather_list = []
-    others_list = []
-    
-    for item in target_items:
-        title = item[1]
-        if '요약' in title or '요 약' in title:
-            summary_list.append(item)
-        elif '기상' in title:
-            weather_list.append(item)
-        else:
-            others_list.append(item)
-            
-    final_list = summary_list[:1] + weather_list[:1] + others_list
-    return final_list[:4]
+@st.cache_data(ttl=3600)
+def get_trend(db_path, tag_type, tags):
+    try:
+        return fetch_trend_seasonal(con, tag_type, list(tags)), fetch_trend_first_mentions(con, tag_type, list(tags))
+    except:
+        return [], []
+
+@st.cache_data(ttl=3600)
+def get_risk_crops(db_path):
+    try:
+        return fetch_risk_crops(con)
+    except:
+        return []
+
+@st.cache_data(ttl=3600)
+def get_risk_series(db_path, crop):
+    try:
+        return fetch_risk_series(con, crop)
+    except:
+        return []
+
+# 검색어 제안 인덱스는 DB 버전당 한 번만 메모리에 올림 (키 입력마다 DB/모델 호출 없음)
+@st.cache_resource(max_entries=2)
+def get_suggest_index(db_path):
+    try:
+        return load_suggest_index(con)
+    except Exception:
+        return SuggestIndex([])
+
+@st.cache_data(ttl=3600)
+def get_near_dups(db_path, doc_id):
+    try:
+        return fetch_near_dups(con, doc_id)
+    except:
+        return []
+
+# 오타 보정 사전도 DB 버전당 한 번만 메모리에 올림
+@st.cache_resource(max_entries=2)
+def get_typo_index(db_path):
+    try:
+        return load_typo_index(con)
+    except Exception:
+        return TypoIndex([])
+
+@st.cache_data(ttl=3600)
+def get_related(db_path, doc_id):
+    try:
+        return fetch_related(con, doc_id)
+    except:
+        return []
+
+# 검색어 로그 (hnsw_tune.py 등 오프라인 벤치마크의 실제 질의 집합)
+QUERY_LOG = os.path.join("logs", "query_log.jsonl")
+
+def log_query(query):
+    try:
+        os.makedirs(os.path.dirname(QUERY_LOG), exist_ok=True)
+        with open(QUERY_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'ts': datetime.now().isoformat(timespec='seconds'), 'query': query}, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
 
 # ==========================================
 # 4. 상태 관리
@@ -183,6 +266,8 @@ AVAILABLE_YEARS = [2023, 2024, 2025]
 
 if 'search_query' not in st.session_state:
     st.session_state.search_query = ""
+if 'run_suggested' not in st.session_state:
+    st.session_state.run_suggested = False
 
 if 'filter_year' not in st.session_state:
     if today.year in AVAILABLE_YEARS:
@@ -218,7 +303,8 @@ with st.container():
         with c2:
             sel_month = st.selectbox("월", range(1, 13), index=st.session_state.filter_month-1, key='sel_month_key', label_visibility="collapsed")
         
-        weeks_list = get_week_list(sel_year, sel_month)
+        with stage('week_list'):
+            weeks_list = get_week_list(db_path, sel_year, sel_month)
         weeks_options = ["주차"] + weeks_list
         
         with c3:
@@ -231,7 +317,7 @@ with st.container():
     # [2] 작목 선택 (필터) - 수정됨
     with f_col2:
         st.markdown(f"**{material_icon('filter_alt', color='#ea4335')} 작목 선택 (필터)**", unsafe_allow_html=True)
-        all_tags = get_all_categories()
+        all_tags = get_all_categories(db_path)
         # [수정] default를 비워두어 깔끔하게 보이게 함 (Logic에서 비어있으면 전체로 처리)
         selected_crops = st.multiselect(
             "작목을 선택하세요", 
@@ -257,38 +343,11 @@ else:
 
 with st.container(border=True):
     try:
-        if st.session_state.selected_week_range:
-            query_sql = """
-                SELECT year, title, content_md, tags_crop, regexp_extract(title, '\\[(.*?)\\]', 1) as w_range
-                FROM farm_info 
-                WHERE title LIKE ?
-                ORDER BY year DESC
-            """
-            params = [f'%{st.session_state.selected_week_range}%']
-        else:
-            query_sql = """
-                SELECT year, title, content_md, tags_crop, regexp_extract(title, '\\[(.*?)\\]', 1) as w_range
-                FROM farm_info 
-                WHERE month = ?
-                AND content_md NOT LIKE '%목 차%'
-                ORDER BY year DESC
-            """
-            params = [sel_month]
-
-        rows = con.execute(query_sql, params).fetchall()
-
-        # [수정] 작목 필터링 로직 변경
-        filtered_rows = []
-        
-        # 사용자가 작목을 하나라도 선택했다면 -> 그 작목들만 필터링
-        if selected_crops:
-            for r in rows:
-                item_tags = r[3] if r[3] else []
-                if any(crop in item_tags for crop in selected_crops):
-                    filtered_rows.append(r)
-        # 선택하지 않았다면(비어있으면) -> 전체 데이터 표시 (All)
-        else:
-            filtered_rows = rows
+        with stage('briefing_query'):
+            rows = fetch_briefing_rows(con, st.session_state.selected_week_range, sel_month)
+
+        # [수정] 작목 필터링 로직 변경 (선택이 없으면 전체 표시)
+        filtered_rows = filter_by_crops(rows, selected_crops)
 
         if filtered_rows:
             grouped_by_year = {2025: [], 2024: [], 2023: []}
@@ -303,17 +362,19 @@ with st.container(border=True):
                 if items:
                     st.markdown(f"##### {material_icon('calendar_today', color='#5f6368')} {year}년 기록", unsafe_allow_html=True)
                     
-                    display_items = organize_items_smartly(items, target_date)
+                    with stage('organize_items'):
+                        display_items = organize_items_smartly(items, target_date)
                     
                     if not display_items:
                         st.caption("해당 시기의 데이터가 부족합니다.")
                         st.divider()
                         continue
 
+                    render_t0 = time.perf_counter()
                     cols = st.columns(2)
                     for idx, item in enumerate(display_items):
-                        yr, title, content, tags, w_range = item
-                        clean_title = title.split(']')[-1].strip() if ']' in title else title
+                        yr, title, content, tags, w_range, clean_title, display_md, doc_id = item
+                        clean_title = clean_title or content_clean_title(title)
                         
                         icon = "📄"
                         if '요약' in title or '요 약' in title:
@@ -326,7 +387,16 @@ with st.container(border=True):
                             with st.popover(f"{icon} {clean_title}", use_container_width=True):
                                 if tags:
                                     st.caption(f"태그: {', '.join(tags)}")
-                                st.markdown(format_content(content), unsafe_allow_html=True)
+                                st.markdown(format_content(display_md, content), unsafe_allow_html=True)
+                                # 적재 시 계산한 다른 연도 유사 문서 (쿼리 시 임베딩/벡터 검색 없음)
+                                related = get_related(db_path, doc_id)
+                                if related:
+                                    st.divider()
+                                    st.caption("🔗 다른 연도 관련 지침")
+                                    for r_year, r_week, r_title, r_score in related:
+                                        st.markdown(f"- **{r_year}년** {r_week} · {content_clean_title(r_title)} "
+                                                    f"<span style='color:grey'>({r_score:.2f})</span>", unsafe_allow_html=True)
+                    perf_metrics.record('render_briefing', time.perf_counter() - render_t0)
                     
                     st.divider()
         else:
@@ -335,12 +405,109 @@ with st.container(border=True):
     except Exception as e:
         st.error(f"데이터 로드 오류: {e}")
 
+# ==========================================
+# 6-1. 기상 연도별 비교 (적재 시 추출한 weather_series 숫자 조회만 사용)
+# ==========================================
+with st.expander("🌡️ 기상 연도별 비교", expanded=False):
+    w1, w2 = st.columns(2)
+    with w1:
+        sel_metric = st.selectbox("지표", list(METRIC_LABELS), format_func=METRIC_LABELS.get)
+    with w2:
+        regions = get_weather_regions(db_path, sel_metric)
+        sel_region = st.selectbox("지역", [None] + regions, format_func=lambda r: "전체 평균" if r is None else r)
+
+    with stage('weather_chart'):
+        weather_rows = get_weather_yoy(db_path, sel_metric, sel_region)
+    if weather_rows:
+        weeks = sorted({r[0] for r in weather_rows})
+        years = sorted({r[1] for r in weather_rows})
+        lookup = {(r[0], r[1]): r[2] for r in weather_rows}
+        chart = {'주차': weeks}
+        for y in years:
+            chart[f"{y}년"] = [lookup.get((w, y)) for w in weeks]
+        st.line_chart(chart, x='주차', y=[f"{y}년" for y in years])
+        st.caption(f"기준 주차: {week_no(target_date)}주 ({target_date:%m월 %d일})")
+    else:
+        st.caption("기상 표 데이터가 없습니다. (python weather_extract.py 로 추출)")
+
+# ==========================================
+# 6-2. 병해충/태그 발생 트렌드 (적재 시 집계한 tag_trend 큐브만 조회)
+# ==========================================
+TREND_TAG_TYPES = {'pest': '병해충', 'env': '기상/환경', 'crop': '작목', 'task': '작업'}
+
+with st.expander("🐛 병해충 발생 트렌드", expanded=False):
+    t1, t2 = st.columns([0.3, 0.7])
+    with t1:
+        sel_tag_type = st.selectbox("종류", list(TREND_TAG_TYPES), format_func=TREND_TAG_TYPES.get)
+    top_tags = get_trend_top_tags(db_path, sel_tag_type)
+    with t2:
+        sel_tags = st.multiselect("태그", top_tags, default=top_tags[:3])
+
+    with stage('trend_chart'):
+        seasonal, first_rows = get_trend(db_path, sel_tag_type, tuple(sel_tags))
+    if seasonal:
+        weeks = sorted({r[0] for r in seasonal})
+        lookup = {(r[0], r[1]): r[2] for r in seasonal}
+        chart = {'주차': weeks}
+        for tag in sel_tags:
+            chart[tag] = [lookup.get((w, tag), 0) for w in weeks]
+        st.line_chart(chart, x='주차', y=list(sel_tags))
+
+        for tag in sel_tags:
+            peak = max(((lookup.get((w, tag), 0), w) for w in weeks), default=(0, None))
+            firsts = [f"{y}년 {w}주" for t, y, w in first_rows if t == tag]
+            if peak[0]:
+                st.caption(f"**{tag}**: 보통 {peak[1]}주차에 언급이 가장 많았습니다. (첫 언급: {', '.join(firsts)})")
+    elif top_tags:
+        st.caption("태그를 선택하세요.")
+    else:
+        st.caption("트렌드 데이터가 없습니다. (python trend_cube.py 로 집계)")
+
+# ==========================================
+# 6-3. 피해/위험 지수 (적재 시 계산한 risk_series 만 조회, 모델/벡터 연산 없음)
+# ==========================================
+with st.expander("⚠️ 피해 위험 지수", expanded=False):
+    risk_crops = get_risk_crops(db_path)
+    sel_risk_crop = st.selectbox("작목", risk_crops or [ALL_CROPS], key='risk_crop')
+
+    with stage('risk_chart'):
+        risk_rows = get_risk_series(db_path, sel_risk_crop)
+    if risk_rows:
+        weeks = sorted({r[0] for r in risk_rows})
+        years = sorted({r[1] for r in risk_rows})
+        lookup = {(r[0], r[1]): r[2] for r in risk_rows}
+        chart = {'주차': weeks}
+        for y in years:
+            chart[f"{y}년"] = [lookup.get((w, y)) for w in weeks]
+        st.line_chart(chart, x='주차', y=[f"{y}년" for y in years])
+
+        this_week = week_no(target_date)
+        current = [(y, risk, top) for w, y, risk, top in risk_rows if w == this_week]
+        if current:
+            st.caption(f"{this_week}주차 위험도: " + ", ".join(f"{y}년 {risk:.0f} ({top})" for y, risk, top in current))
+    else:
+        st.caption("위험 지수 데이터가 없습니다. (python risk_index.py --prototypes 로 계산)")
+
 # ==========================================
 # 7. 하단 전체 검색
 # ==========================================
 st.subheader("🔍 전체 검색")
 st.caption("위의 필터와 상관없이 모든 데이터베이스를 검색합니다.")
 
+# 제안어: 메모리 접두어 인덱스만 조회, 고른 제안어만 아래 벡터 검색으로 넘어감
+suggest_input = st.text_input("검색어 제안", placeholder="입력하면 검색어를 제안합니다 (예: 고추 ㅌ)", key="suggest_input")
+if suggest_input:
+    with stage('suggest'):
+        suggestions = get_suggest_index(db_path).suggest(suggest_input)
+    if suggestions:
+        s_cols = st.columns(4)
+        for i, (term, kind, _) in enumerate(suggestions):
+            icon = {'query': '🔎', 'tag': '🏷️'}.get(kind, '📄')
+            if s_cols[i % 4].button(f"{icon} {term}", key=f"suggest_{i}", use_container_width=True):
+                st.session_state.search_query = term
+                st.session_state.run_suggested = True
+                st.rerun()
+
 with st.form("global_search_form", clear_on_submit=False):
     c1, c2 = st.columns([0.85, 0.15])
     with c1:
@@ -348,29 +515,44 @@ with st.form("global_search_form", clear_on_submit=False):
     with c2:
         search_btn = st.form_submit_button("검색")
 
-if search_btn and query_input:
+run_suggested = st.session_state.run_suggested
+st.session_state.run_suggested = False
+if (search_btn or run_suggested) and query_input:
     with st.spinner("검색 중..."):
         try:
-            query_vector = model.encode(query_input).tolist()
-            sql = """
-                SELECT year, month, title, content_md, array_cosine_similarity(embedding, ?::FLOAT[768]) as score
-                FROM farm_info WHERE 1=1 ORDER BY score DESC LIMIT 10
-            """
-            results = con.execute(sql, [query_vector]).fetchall()
-            valid_results = [r for r in results if r[4] >= 0.40]
+            # 사전에 없는 단어만 자모 편집 거리로 보정 (모델 호출 없음), 로그에는 보정된 검색어
+            with stage('typo'):
+                search_text, typo_fixes = get_typo_index(db_path).rewrite(query_input)
+            if typo_fixes:
+                st.caption("🔤 " + ", ".join(f"'{a}' → '{b}'" for a, b in typo_fixes) + " 으로 검색합니다.")
+            log_query(search_text)
+            with stage('encode'):
+                query_vector = model.encode(search_text).tolist()
+            with stage('search_sql'):
+                bundle_vectors = load_bundle_vectors()
+                shard_key = None if BUNDLE else shards.manifest_version()
+                shard_set = open_shards(shard_key) if shard_key else None
+                # 샤드가 다른 버전(롤백 직후, 동기화 실패)에서 만들어졌으면 브리핑/유사 문서와 같은 DB 로 검색
+                if shard_set is not None and shard_set.serves(db_path):
+                    valid_results = shard_set.search(query_vector)
+                elif bundle_vectors is not None:
+                    valid_results = search_vectors(con, bundle_vectors[0], bundle_vectors[1], query_vector)
+                else:
+                    valid_results = search_documents(con, query_vector)
             
             if not valid_results:
                 st.warning("결과 없음")
             else:
                 st.success(f"{len(valid_results)}건 발견")
+                render_t0 = time.perf_counter()
                 for row in valid_results[:5]:
-                    yr, mn, title, content, score = row
+                    yr, mn, title, content, score, clean_title, display_md, doc_id = row
                     
                     badge, color = "참고용", "#9aa0a6"
                     if score >= 0.65: badge, color = "강력 추천", "#34a853"
                     elif score >= 0.50: badge, color = "관련 있음", "#f9ab00"
                     
-                    clean_title = title.split(']')[-1].strip()
+                    clean_title = clean_title or content_clean_title(title)
                     with st.container(border=True):
                         st.markdown(f"""
                         <div style='display:flex; justify-content:space-between;'>
@@ -380,12 +562,47 @@ if search_btn and query_input:
                         <div style='font-size:0.8em; color:gray;'>{yr}년 {mn}월</div>
                         """, unsafe_allow_html=True)
                         
-                        hl_content = format_content(content)
-                        for w in query_input.split():
-                            if len(w)>1: hl_content = hl_content.replace(w, f"<span class='highlight'>{w}</span>")
+                        with stage('format_highlight'):
+                            hl_content = format_content(display_md, content)
+                            for w in search_text.split():
+                                if len(w)>1: hl_content = hl_content.replace(w, f"<span class='highlight'>{w}</span>")
                         st.markdown(hl_content, unsafe_allow_html=True)
+                        # 거의 같은 내용의 다른 주차는 접어서 목록만
+                        dups = get_near_dups(db_path, doc_id)
+                        if dups:
+                            with st.expander(f"📑 같은 내용 {len(dups)}건 더"):
+                                st.caption(", ".join(f"{d_year}년 {d_week}" for d_year, d_week, _ in dups))
+                perf_metrics.record('render_search', time.perf_counter() - render_t0)
         except Exception as e:
             st.error(f"오류: {e}")
 
 st.markdown("---")
-st.markdown("<div style='text-align:center; color:gray; font-size:0.8em;'>Data: 농촌진흥청 | Powered by DuckDB & Streamlit</div>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<div style='text-align:center; color:gray; font-size:0.8em;'>Data: 농촌진흥청 | Powered by DuckDB & Streamlit</div>", unsafe_allow_html=True)
+
+# ==========================================
+# 8. 관리자 성능 패널 (?admin=1 일 때만 표시)
+# ==========================================
+# 지표 파일은 부가 기능 -> 쓰기 실패(디스크/권한)로 페이지가 깨지지 않게 (간격 제한은 perf_metrics 안에서)
+try:
+    perf_metrics.write_prometheus()
+except OSError as e:
+    print(f"⚠️ metrics 파일 쓰기 실패: {e}")
+
+if st.query_params.get("admin") == "1":
+    with st.expander("⏱️ 성능 패널 (단계별 지연)", expanded=True):
+        st.dataframe(perf_metrics.snapshot(), use_container_width=True, hide_index=True)
+
+        st.markdown("**가장 느린 쿼리**")
+        for i, entry in enumerate(perf_metrics.slow_queries()[:10]):
+            with st.container(border=True):
+                st.caption(f"{entry['name']} · {entry['seconds'] * 1000:.1f}ms · {datetime.fromtimestamp(entry['ts']):%H:%M:%S}")
+                if st.button("EXPLAIN ANALYZE", key=f"explain_{i}"):
+                    try:
+                        perf_metrics.explain_analyze(con, entry)
+                    except Exception as e:
+                        st.error(f"실행 계획 오류: {e}")
+                if entry['plan']:
+                    st.code(entry['plan'])
+
+        st.markdown(f"**Prometheus** (`{perf_metrics.METRICS_FILE}`, `python perf_metrics.py serve`로 /metrics 제공)")
+        st.code(perf_metrics.render_prometheus(), language="text")
\ No newline at end of file
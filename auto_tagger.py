@@ -0,0 +1,226 @@
+import sys
+import json
+import time
+import argparse
+import duckdb
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Any, Tuple
+from db_publish import clone_current, publish, resolve_db_path
+from near_dup import canonical_embedding_sql
+
+try:
+    import pyarrow as pa  # [선택] 중심 벡터 행렬을 Arrow 로 넘기면 executemany 보다 빠름
+except ImportError:
+    pa = None
+
+# ==========================================
+# 영농일지 자동 태깅 (활용방안 #7)
+# - 적재 시 tags_* 값마다 farm_info.embedding 의 중심 벡터(+ 대표 문서 몇 개)를 tag_centroids 에 저장
+# - 태깅 = 일지 묶음을 한 번 인코딩 + (일지 x 중심 벡터) 행렬곱 한 번
+#   태그 점수는 그 태그의 중심/대표 벡터 중 최대 유사도, 종류(crop/env/task...)마다 상위 몇 개
+# ==========================================
+MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+
+TAG_TYPES = ['crop', 'task', 'env', 'pest', 'admin']
+MIN_TAG_DOCS = 3       # 문서가 이보다 적은 태그는 중심 벡터가 불안정해서 제외
+MEDOIDS = 2            # 태그마다 중심에 가장 가까운 문서 벡터 몇 개를 함께 저장 (0 = 중심만)
+MAX_TAGS_PER_TYPE = 2
+MIN_TAG_SCORE = 0.40   # 검색 MIN_SCORE 와 같은 기준
+ENCODE_BATCH = 64
+
+
+# ==========================================
+# 1. 적재 시: 태그별 중심 벡터 계산
+# ==========================================
+def build_tag_centroids(con: duckdb.DuckDBPyConnection, min_docs: int = MIN_TAG_DOCS,
+                        medoids: int = MEDOIDS) -> int:
+    """tag_centroids 전체 재생성 (저장한 벡터 수)"""
+    # 거의 같은 섹션(near_dup.py)은 대표 행의 임베딩으로 (태그 문서 수가 줄지 않도록)
+    embedding, dup_join = canonical_embedding_sql(con)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE tag_vectors AS
+        SELECT f.id, {embedding} as embedding FROM farm_info f {dup_join} WHERE {embedding} IS NOT NULL
+    """)
+    cols = con.execute("SELECT id, embedding FROM tag_vectors ORDER BY id").fetchnumpy()
+    tag_union = "\nUNION ALL\n".join(
+        f"SELECT '{t}' as tag_type, unnest(tags_{t}) as tag, id FROM farm_info WHERE id IN (SELECT id FROM tag_vectors)"
+        for t in TAG_TYPES
+    )
+    groups = con.execute(f"""
+        SELECT tag_type, tag, list(DISTINCT id) as ids
+        FROM ({tag_union})
+        WHERE tag IS NOT NULL
+        GROUP BY ALL
+        HAVING COUNT(DISTINCT id) >= ?
+        ORDER BY tag_type, tag
+    """, [min_docs]).fetchall()
+    con.execute("DROP TABLE tag_vectors")
+    ids = cols['id']
+    if len(ids) == 0: return 0
+    emb = np.stack(cols['embedding']).astype(np.float32)
+    emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+
+    rows: List[Tuple[str, str, str, int]] = []
+    vectors: List[np.ndarray] = []
+    for tag_type, tag, tag_ids in groups:
+        members = emb[np.searchsorted(ids, tag_ids)]
+        centroid = members.mean(axis=0)
+        centroid /= max(np.linalg.norm(centroid), 1e-12)
+        rows.append((tag_type, tag, 'centroid', len(tag_ids)))
+        vectors.append(centroid)
+        if medoids:
+            # 중심에 가장 가까운 실제 문서 = 태그가 여러 갈래(예: 고추 탄저병/사과 탄저병)일 때 보완
+            k = min(medoids, len(tag_ids))
+            for idx in np.argsort(-(members @ centroid))[:k]:
+                rows.append((tag_type, tag, 'medoid', len(tag_ids)))
+                vectors.append(members[idx])
+
+    dim = emb.shape[1]
+    con.execute(f"""
+        CREATE OR REPLACE TABLE tag_centroids (
+            tag_type VARCHAR, tag VARCHAR, kind VARCHAR, n_docs INTEGER, vector FLOAT[{dim}]
+        )
+    """)
+    if not rows: return 0
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if pa is not None:
+        batch = pa.table({
+            'tag_type': [r[0] for r in rows], 'tag': [r[1] for r in rows],
+            'kind': [r[2] for r in rows], 'n_docs': pa.array([r[3] for r in rows], pa.int32()),
+            'vector': pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), dim),
+        })
+        con.register('centroid_batch', batch)
+        con.execute("INSERT INTO tag_centroids SELECT * FROM centroid_batch")
+        con.unregister('centroid_batch')
+    else:
+        con.executemany("INSERT INTO tag_centroids VALUES (?, ?, ?, ?, ?)",
+                        [(*r, v.tolist()) for r, v in zip(rows, matrix)])
+    return len(rows)
+
+
+# ==========================================
+# 2. 태깅 API
+# ==========================================
+def load_tagger(con: duckdb.DuckDBPyConnection) -> Dict[str, Any]:
+    """tag_centroids 를 (벡터 수 x 차원) 행렬 하나로 읽음. 같은 태그 행은 연속 -> starts 로 묶음"""
+    cols = con.execute("""
+        SELECT tag_type, tag, vector FROM tag_centroids ORDER BY tag_type, tag, kind
+    """).fetchnumpy()
+    n = len(cols['tag'])
+    if n == 0:
+        return {'labels': [], 'types': np.zeros(0, dtype=object), 'starts': np.zeros(0, dtype=np.int64),
+                'matrix': np.zeros((0, 0), dtype=np.float32)}
+
+    keys = list(zip(cols['tag_type'], cols['tag']))
+    starts = [i for i in range(n) if i == 0 or keys[i] != keys[i - 1]]
+    return {
+        'labels': [keys[i] for i in starts],
+        'types': np.asarray([keys[i][0] for i in starts], dtype=object),
+        'starts': np.asarray(starts, dtype=np.int64),
+        'matrix': np.stack(cols['vector']).astype(np.float32),
+    }
+
+def tag_vectors(tagger: Dict[str, Any], vectors: np.ndarray, max_per_type: int = MAX_TAGS_PER_TYPE,
+                min_score: float = MIN_TAG_SCORE) -> List[Dict[str, List[Tuple[str, float]]]]:
+    """정규화된 일지 벡터 (n x 차원) -> 일지마다 {태그 종류: [(태그, 점수), ...]}"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not tagger['labels'] or len(vectors) == 0:
+        return [{} for _ in range(len(vectors))]
+
+    sims = vectors @ tagger['matrix'].T                                  # (일지 x 저장 벡터)
+    scores = np.maximum.reduceat(sims, tagger['starts'], axis=1)         # (일지 x 태그) 중심/대표 중 최대
+
+    results = []
+    for row in scores:
+        tags: Dict[str, List[Tuple[str, float]]] = {}
+        for idx in np.argsort(-row):
+            score = float(row[idx])
+            if score < min_score: break
+            tag_type, tag = tagger['labels'][idx]
+            picked = tags.setdefault(tag_type, [])
+            if len(picked) < max_per_type:
+                picked.append((tag, round(score, 4)))
+        results.append(tags)
+    return results
+
+def tag_texts(model: SentenceTransformer, tagger: Dict[str, Any], texts: List[str],
+              batch_size: int = ENCODE_BATCH, **kwargs) -> List[Dict[str, List[Tuple[str, float]]]]:
+    """일지 텍스트 묶음 -> 태그 (인코딩 한 번 + 행렬곱 한 번)"""
+    if not texts: return []
+    vectors = model.encode(texts, batch_size=batch_size, show_progress_bar=False,
+                           convert_to_numpy=True, normalize_embeddings=True)
+    return tag_vectors(tagger, vectors, **kwargs)
+
+
+# ==========================================
+# 3. CLI
+# ==========================================
+def load_entries(path: str) -> List[str]:
+    """한 줄에 일지 하나 (JSONL 이면 'text' 필드)"""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        entries = []
+        for line in stream:
+            line = line.strip()
+            if not line or line.startswith('#'): continue
+            entries.append(str(json.loads(line).get('text', '')) if line.startswith('{') else line)
+        return entries
+    finally:
+        if stream is not sys.stdin: stream.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="영농일지 자동 태깅 (태그 중심 벡터)")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p_build = sub.add_parser('build', help="태그 중심 벡터 계산 후 새 버전으로 공개")
+    p_build.add_argument('--min-docs', type=int, default=MIN_TAG_DOCS)
+    p_build.add_argument('--medoids', type=int, default=MEDOIDS)
+
+    p_tag = sub.add_parser('tag', help="일지 파일 태깅 -> JSONL (표준출력)")
+    p_tag.add_argument('entries', help="한 줄에 일지 하나 (.txt/.jsonl, '-'는 표준입력)")
+    p_tag.add_argument('--max-per-type', type=int, default=MAX_TAGS_PER_TYPE)
+    p_tag.add_argument('--min-score', type=float, default=MIN_TAG_SCORE)
+    p_tag.add_argument('--batch-size', type=int, default=ENCODE_BATCH)
+    p_tag.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        db_path = clone_current()
+        con = duckdb.connect(db_path)
+        # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+        con.execute("LOAD vss;")
+        con.execute("SET hnsw_enable_experimental_persistence = true;")
+        t0 = time.perf_counter()
+        n = build_tag_centroids(con, args.min_docs, args.medoids)
+        tags = con.execute("SELECT COUNT(DISTINCT (tag_type, tag)) FROM tag_centroids").fetchone()[0]
+        con.execute("CHECKPOINT")
+        con.close()
+        print(f"🏷️ 태그 {tags}개, 벡터 {n}개 ({time.perf_counter() - t0:.1f}s)")
+        publish(db_path)
+        return
+
+    entries = load_entries(args.entries)
+    con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+    tagger = load_tagger(con)
+    con.close()
+    if not tagger['labels']:
+        print("❌ tag_centroids 없음 - python auto_tagger.py build", file=sys.stderr)
+        sys.exit(1)
+
+    model = SentenceTransformer(MODEL_NAME, device='cpu')
+    t0 = time.perf_counter()
+    results = []
+    for start in range(0, len(entries), args.batch_size):
+        chunk = entries[start:start + args.batch_size]
+        results.extend(tag_texts(model, tagger, chunk, args.batch_size,
+                                 max_per_type=args.max_per_type, min_score=args.min_score))
+    elapsed = time.perf_counter() - t0
+
+    for text, tags in zip(entries, results):
+        hashtags = [f"#{tag}" for picked in tags.values() for tag, _ in picked]
+        print(json.dumps({'text': text, 'tags': tags, 'hashtags': hashtags}, ensure_ascii=False))
+    print(f"✅ {len(entries)}건 태깅: {elapsed:.2f}s (태그 {len(tagger['labels'])}개)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import sys
+import json
+import time
+import argparse
+import duckdb
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Any, Iterator, Optional
+from db_publish import resolve_db_path
+
+# [설정]
+MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+
+ENCODE_BATCH = 64      # 한 번에 인코딩/검색할 질의 수 (점수 행렬 = ENCODE_BATCH x 전체 행)
+TOP_K = 10             # 앱 검색과 동일 (LIMIT 10)
+MIN_SCORE = 0.40       # 앱의 '결과 없음' 기준과 동일
+
+
+# ==========================================
+# 1. 질의 파일 읽기
+# ==========================================
+def parse_query_line(line: str) -> Optional[Dict[str, Any]]:
+    """한 줄을 질의 dict로 변환 (JSONL 또는 '질의<TAB>연도<TAB>월<TAB>작목')"""
+    line = line.strip()
+    if not line or line.startswith('#'): return None
+
+    if line.startswith('{'):
+        raw = json.loads(line)
+        query = {
+            'query': str(raw.get('query', '')).strip(),
+            'year': raw.get('year'), 'month': raw.get('month'), 'crop': raw.get('crop')
+        }
+    else:
+        cols = line.split('\t') + [''] * 3
+        query = {
+            'query': cols[0].strip(),
+            'year': cols[1].strip() or None, 'month': cols[2].strip() or None,
+            'crop': cols[3].strip() or None
+        }
+
+    if not query['query']: return None
+    query['year'] = int(query['year']) if query['year'] else None
+    query['month'] = int(query['month']) if query['month'] else None
+    return query
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        queries = []
+        for line in stream:
+            q = parse_query_line(line)
+            if q: queries.append(q)
+        return queries
+    finally:
+        if stream is not sys.stdin: stream.close()
+
+
+# ==========================================
+# 2. 코퍼스 (임베딩 행렬) 로드
+# ==========================================
+def load_corpus(con: duckdb.DuckDBPyConnection) -> Dict[str, Any]:
+    """farm_info 전체 임베딩을 한 번만 읽어 정규화된 행렬로 보관 (대표 행만, HNSW 검색과 같은 후보)"""
+    rows = con.execute("""
+        SELECT id, year, month, title, tags_crop, embedding
+        FROM farm_info WHERE embedding IS NOT NULL ORDER BY id
+    """).fetchall()
+
+    matrix = np.asarray([r[5] for r in rows], dtype=np.float32)
+    if rows:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+
+    return {
+        'ids': np.asarray([r[0] for r in rows], dtype=np.int64),
+        'years': np.asarray([r[1] for r in rows], dtype=np.int32),
+        'months': np.asarray([r[2] for r in rows], dtype=np.int32),
+        'titles': [r[3] for r in rows],
+        'crops': [set(r[4] or []) for r in rows],
+        'matrix': matrix,
+        '_crop_masks': {}
+    }
+
+def filter_mask(corpus: Dict[str, Any], query: Dict[str, Any]) -> Optional[np.ndarray]:
+    """질의별 연/월/작목 조건을 불리언 마스크로 (조건이 없으면 None)"""
+    mask = None
+    if query['year'] is not None:
+        mask = corpus['years'] == query['year']
+    if query['month'] is not None:
+        m = corpus['months'] == query['month']
+        mask = m if mask is None else (mask & m)
+    if query['crop']:
+        crop_masks = corpus['_crop_masks']
+        if query['crop'] not in crop_masks:
+            crop_masks[query['crop']] = np.fromiter(
+                (query['crop'] in tags for tags in corpus['crops']), dtype=bool, count=len(corpus['crops'])
+            )
+        m = crop_masks[query['crop']]
+        mask = m if mask is None else (mask & m)
+    return mask
+
+
+# ==========================================
+# 3. 배치 검색 (행렬 x 행렬 한 번)
+# ==========================================
+def iter_batch_results(model: SentenceTransformer, corpus: Dict[str, Any], queries: List[Dict[str, Any]],
+                       top_k: int = TOP_K, batch_size: int = ENCODE_BATCH,
+                       min_score: float = MIN_SCORE) -> Iterator[Dict[str, Any]]:
+    matrix = corpus['matrix']
+    n_docs = matrix.shape[0]
+    k = min(top_k, n_docs)
+
+    for start in range(0, len(queries), batch_size):
+        chunk = queries[start:start + batch_size]
+        q_vecs = model.encode(
+            [q['query'] for q in chunk], batch_size=batch_size, show_progress_bar=False,
+            convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+
+        scores = q_vecs @ matrix.T  # (배치 x 문서) 코사인 유사도
+
+        for i, q in enumerate(chunk):
+            mask = filter_mask(corpus, q)
+            if mask is not None:
+                scores[i, ~mask] = -np.inf
+
+        if k > 0:
+            top_idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top_idx, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top_idx = np.take_along_axis(top_idx, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for i, q in enumerate(chunk):
+            results = []
+            for rank in range(k):
+                score = float(top_scores[i, rank])
+                if score < min_score: break
+                idx = int(top_idx[i, rank])
+                results.append({
+                    'rank': rank + 1, 'id': int(corpus['ids'][idx]),
+                    'year': int(corpus['years'][idx]), 'month': int(corpus['months'][idx]),
+                    'title': corpus['titles'][idx], 'score': round(score, 4)
+                })
+            yield {'query_no': start + i, **q, 'results': results}
+
+
+# ==========================================
+# 4. 결과 출력 (JSONL 스트리밍 / Parquet)
+# ==========================================
+def write_jsonl(results: Iterator[Dict[str, Any]], out_path: str) -> int:
+    count = 0
+    stream = sys.stdout if out_path == '-' else open(out_path, 'w', encoding='utf-8')
+    try:
+        for res in results:
+            stream.write(json.dumps(res, ensure_ascii=False) + '\n')
+            count += 1
+    finally:
+        if stream is not sys.stdout: stream.close()
+    return count
+
+def write_parquet(results: Iterator[Dict[str, Any]], out_path: str) -> int:
+    """결과를 (질의, 순위) 단위 행으로 펼쳐 DuckDB COPY로 Parquet 저장"""
+    out = duckdb.connect()
+    out.execute("""
+        CREATE TABLE results (
+            query_no INTEGER, query TEXT, f_year INTEGER, f_month INTEGER, f_crop TEXT,
+            rank INTEGER, id INTEGER, year INTEGER, month INTEGER, title TEXT, score DOUBLE
+        )
+    """)
+    count = 0
+    for res in results:
+        rows = [(res['query_no'], res['query'], res['year'], res['month'], res['crop'],
+                 r['rank'], r['id'], r['year'], r['month'], r['title'], r['score']) for r in res['results']]
+        if not rows:
+            rows = [(res['query_no'], res['query'], res['year'], res['month'], res['crop'],
+                     None, None, None, None, None, None)]
+        out.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        count += 1
+    safe_path = out_path.replace("'", "''")
+    out.execute(f"COPY results TO '{safe_path}' (FORMAT PARQUET)")
+    out.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대량 질의 일괄 검색 (지도사용)")
+    parser.add_argument('queries', help="질의 파일 (.jsonl 또는 탭 구분 텍스트, '-'는 표준입력)")
+    parser.add_argument('-o', '--output', default='-', help="출력 경로 ('-'는 표준출력)")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default=None)
+    parser.add_argument('--top-k', type=int, default=TOP_K)
+    parser.add_argument('--batch-size', type=int, default=ENCODE_BATCH)
+    parser.add_argument('--min-score', type=float, default=MIN_SCORE)
+    parser.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    out_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'jsonl')
+    if out_format == 'parquet' and args.output == '-':
+        parser.error("Parquet 출력은 파일 경로(-o)가 필요합니다.")
+
+    queries = load_queries(args.queries)
+    print(f"📥 질의 {len(queries)}건 로드", file=sys.stderr)
+
+    model = SentenceTransformer(MODEL_NAME, device='cpu')
+    con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+    t0 = time.perf_counter()
+    corpus = load_corpus(con)
+    con.close()
+    if len(corpus['ids']) == 0:
+        print("❌ 임베딩이 있는 행이 없습니다 - python embed.py 로 먼저 적재하세요.", file=sys.stderr)
+        sys.exit(1)
+    print(f"📚 코퍼스 {len(corpus['ids'])}행 로드 ({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    results = iter_batch_results(model, corpus, queries, args.top_k, args.batch_size, args.min_score)
+    if out_format == 'parquet':
+        count = write_parquet(results, args.output)
+    else:
+        count = write_jsonl(results, args.output)
+    elapsed = time.perf_counter() - t0
+
+    qps = count / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {count}건 처리: {elapsed:.2f}s, 처리량 {qps:.1f} queries/sec", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import tempfile
+import argparse
+import subprocess
+import duckdb
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Callable
+import embed
+import farm_queries
+from synth_corpus import write_corpus, HashEncoder
+
+# ==========================================
+# 재현 가능한 벤치마크 (합성 코퍼스, 네트워크/실데이터 불필요)
+# - 적재 단계: 생성 -> 파싱/태깅(embed.parse_sections) -> 인코딩 -> INSERT -> HNSW
+# - 조회 단계: farm_queries 의 주차 목록/브리핑/정리/전체 검색 (앱과 같은 코드 경로)
+# - 결과는 bench_results/ 에 JSON 으로 저장하고 --compare 로 커밋 간 비교
+# ==========================================
+RESULTS_DIR = "bench_results"
+DEFAULT_SCALES = [1000, 10000]
+PARSE_CHUNK = 5000        # 대규모(1M) 에서도 메모리 상한을 두기 위한 스트리밍 단위
+QUERY_REPEAT = 30
+REGRESSION_TOLERANCE = 0.20
+NOISE_FLOOR_S = 0.001     # 이보다 짧은 항목은 측정 잡음으로 보고 저하 판정에서 제외
+SEED = 0
+
+SEARCH_QUERIES = ["봄배추 육묘", "꿀벌 월동관리", "고추 탄저병 방제", "장마 대비 배수로", "사과 적과 시기",
+                  "벼 이앙 물관리", "폭염 시설하우스 환기", "마늘 웃거름"]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    arr = np.asarray(latencies) * 1000
+    return {
+        'n': int(arr.size), 'mean_ms': float(arr.mean()),
+        'p50_ms': float(np.percentile(arr, 50)), 'p95_ms': float(np.percentile(arr, 95))
+    }
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies)
+
+
+# ==========================================
+# 1. 적재 단계
+# ==========================================
+def bench_ingest(workdir: str, n_sections: int, encoder) -> Dict[str, Any]:
+    stages = {}
+    md_path = os.path.join(workdir, f"synthetic_{n_sections}.md")
+    db_path = os.path.join(workdir, f"synthetic_{n_sections}.duckdb")
+
+    t0 = time.perf_counter()
+    write_corpus(md_path, n_sections, SEED)
+    stages['generate'] = {'seconds': time.perf_counter() - t0, 'bytes': os.path.getsize(md_path)}
+
+    t0 = time.perf_counter()
+    with open(md_path, 'r', encoding='utf-8') as f:
+        data = f.read()
+    stages['read'] = {'seconds': time.perf_counter() - t0}
+
+    con = duckdb.connect(db_path)
+    embed.init_db(con, encoder.get_sentence_embedding_dimension())
+
+    parse_s = encode_s = insert_s = 0.0
+    rows = 0
+    sections = embed.parse_sections(data)
+    while True:
+        t0 = time.perf_counter()
+        chunk = []
+        for meta in sections:
+            chunk.append(meta)
+            if len(chunk) >= PARSE_CHUNK: break
+        parse_s += time.perf_counter() - t0
+        if not chunk: break
+
+        t0 = time.perf_counter()
+        vectors = encoder.encode([m['text'] for m in chunk], batch_size=embed.BATCH_SIZE, show_progress_bar=False)
+        encode_s += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        buffer = [embed._to_row(m, v) for m, v in zip(chunk, vectors)]
+        for i in range(0, len(buffer), embed.DB_INSERT_BATCH):
+            embed.flush_buffer_to_db(con, buffer[i:i + embed.DB_INSERT_BATCH])
+        insert_s += time.perf_counter() - t0
+        rows += len(chunk)
+    del data
+
+    stages['parse_tag'] = {'seconds': parse_s, 'rows_per_sec': rows / parse_s if parse_s else 0.0}
+    stages['encode'] = {'seconds': encode_s, 'rows_per_sec': rows / encode_s if encode_s else 0.0}
+    stages['insert'] = {'seconds': insert_s, 'rows_per_sec': rows / insert_s if insert_s else 0.0}
+
+    t0 = time.perf_counter()
+    try:
+        embed.create_vector_index(con)
+        stages['hnsw_index'] = {'seconds': time.perf_counter() - t0}
+    except duckdb.Error as e:
+        stages['hnsw_index'] = {'skipped': str(e).splitlines()[0]}
+
+    con.execute("CHECKPOINT")
+    con.close()
+    return {'rows': rows, 'db_bytes': os.path.getsize(db_path), 'db_path': db_path, 'stages': stages}
+
+
+# ==========================================
+# 2. 조회 단계 (앱 코드 경로)
+# ==========================================
+def bench_queries(db_path: str, encoder, repeat: int) -> Dict[str, Any]:
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        con.execute("LOAD vss;")
+    except duckdb.Error:
+        pass
+
+    rng = random.Random(SEED)
+    year_months = con.execute("SELECT DISTINCT year, month FROM farm_info ORDER BY 1, 2").fetchall()
+    weeks = [w for y, m in year_months[:12] for w in farm_queries.fetch_week_list(con, y, m)]
+    crops = farm_queries.fetch_all_crops(con)
+    today = datetime(2025, 6, 15)
+
+    def week_list():
+        y, m = rng.choice(year_months)
+        farm_queries.fetch_week_list(con, y, m)
+
+    def briefing_month():
+        rows = farm_queries.fetch_briefing_rows(con, None, rng.randint(1, 12))
+        rows = farm_queries.filter_by_crops(rows, rng.sample(crops, min(2, len(crops))))
+        farm_queries.organize_items_smartly(rows, today)
+
+    def briefing_week():
+        rows = farm_queries.fetch_briefing_rows(con, rng.choice(weeks), today.month)
+        farm_queries.organize_items_smartly(rows, today)
+
+    def search():
+        vector = encoder.encode(rng.choice(SEARCH_QUERIES)).tolist()
+        farm_queries.search_documents(con, vector)
+
+    results = {
+        'get_week_list': time_calls(week_list, repeat),
+        'all_crops': time_calls(lambda: farm_queries.fetch_all_crops(con), repeat),
+        'briefing_month': time_calls(briefing_month, repeat),
+        'briefing_week': time_calls(briefing_week, repeat) if weeks else {},
+        'global_search': time_calls(search, repeat),
+    }
+    con.close()
+    return results
+
+
+# ==========================================
+# 3. 비교
+# ==========================================
+def _flatten(result: Dict[str, Any]) -> Dict[str, float]:
+    flat = {}
+    for scale in result['scales']:
+        key = scale['sections']
+        for name, st in scale['ingest']['stages'].items():
+            if 'seconds' in st: flat[f"{key}/ingest/{name}"] = st['seconds']
+        for name, st in scale['queries'].items():
+            if 'p50_ms' in st: flat[f"{key}/query/{name}"] = st['p50_ms'] / 1000
+    return flat
+
+def compare(base_path: str, new_path: str, tolerance: float) -> int:
+    with open(base_path, 'r', encoding='utf-8') as f: base = _flatten(json.load(f))
+    with open(new_path, 'r', encoding='utf-8') as f: new = _flatten(json.load(f))
+
+    regressions = 0
+    print(f"{'항목':<36} {'기준(s)':>10} {'신규(s)':>10} {'변화':>8}")
+    for key in sorted(set(base) & set(new)):
+        ratio = new[key] / base[key] if base[key] else 1.0
+        mark = ""
+        if ratio > 1 + tolerance and new[key] > NOISE_FLOOR_S:
+            mark = " ❌"
+            regressions += 1
+        print(f"{key:<36} {base[key]:>10.4f} {new[key]:>10.4f} {ratio - 1:>+7.0%}{mark}")
+    print(f"\n{'❌ 성능 저하' if regressions else '✅ 저하 없음'}: {regressions}건 (허용 {tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 코퍼스 기반 재현 가능한 벤치마크")
+    parser.add_argument('--scales', default=",".join(map(str, DEFAULT_SCALES)),
+                        help="섹션 수 목록 (예: 1000,10000,100000,1000000)")
+    parser.add_argument('--repeat', type=int, default=QUERY_REPEAT)
+    parser.add_argument('--encoder', choices=['hash', 'model'], default='hash',
+                        help="hash: 네트워크 없는 결정적 인코더 / model: 실제 임베딩 모델")
+    parser.add_argument('--workdir', default=None, help="임시 파일 위치 (기본: 시스템 임시 폴더)")
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'))
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.tolerance))
+
+    encoder = embed.load_model() if args.encoder == 'model' else HashEncoder()
+    commit = git_commit()
+    report = {
+        'commit': commit, 'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'duckdb': duckdb.__version__, 'encoder': args.encoder, 'seed': SEED, 'scales': []
+    }
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for n in [int(v) for v in args.scales.split(',') if v.strip()]:
+            print(f"⏱️ 규모 {n:,} 섹션")
+            ingest = bench_ingest(workdir, n, encoder)
+            for name, st in ingest['stages'].items():
+                detail = f"{st['seconds']:.2f}s" if 'seconds' in st else f"생략 ({st['skipped']})"
+                print(f"   - {name:<12} {detail}")
+            queries = bench_queries(ingest.pop('db_path'), encoder, args.repeat)
+            for name, st in queries.items():
+                if st: print(f"   - {name:<16} p50 {st['p50_ms']:.2f}ms / p95 {st['p95_ms']:.2f}ms")
+            report['scales'].append({'sections': n, 'ingest': ingest, 'queries': queries})
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = args.output or os.path.join(RESULTS_DIR, f"bench_{commit}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 결과 저장: {out_path}")
+
+if __name__ == "__main__":
+    main()
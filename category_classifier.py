@@ -0,0 +1,102 @@
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+# ==========================================
+# 섹션 헤더 -> 분류 (md_to_json.py / json_con/tojson.py 공용, tojson 은 build_detector 로 이전 분류 맵 유지)
+# - CATEGORY_MAP 의 모든 키워드를 Aho-Corasick 오토마톤 하나로 컴파일해 헤더를 한 번만 훑음
+# - 여러 분류가 걸리면 우선순위(SKIP > 맵 순서)가 가장 높은 분류 (기존 '맵 순서대로 in 검사'와 같은 결과)
+# - 같은 헤더 문자열은 lru_cache 로 재사용 (주차마다 같은 장 제목이 반복됨)
+# ==========================================
+SKIP = 'SKIP'
+DEFAULT_CATEGORY = '기타'
+
+# 목차는 본문이 아니므로 건너뜀 (공백 제거 후 매칭하므로 '목 차' 도 포함)
+SKIP_KEYWORDS = ['목차']
+
+# 키워드는 공백 없이 (detect_category 에서 헤더 공백을 제거하고 매칭)
+CATEGORY_MAP = {
+    '요약': ['요약', '핵심기술', '주간중점'],
+    '기상': ['기상', '전망', '날씨', '저수율', '강수량', '농업정보'],
+    '벼': ['벼', '볍씨', '모내기', '쌀', '식량작물', '이앙', '논'],
+    '밭작물': ['밭작물', '콩', '감자', '고구마', '보리', '밀', '옥수수', '두류', '잡곡', '맥류'],
+    '채소': ['채소', '고추', '마늘', '양파', '배추', '무', '시설하우스', '딸기', '수박', '오이', '토마토', '원예'],
+    '과수': ['과수', '사과', '배', '포도', '복숭아', '감귤', '단감', '자두', '과원', '동해', '꽃눈'],
+    '화훼': ['화훼', '국화', '장미', '프리지아', '카네이션', '꽃'],
+    '특용작물': ['특용작물', '인삼', '오미자', '약용작물', '버섯', '느타리', '당귀'],
+    '축산': ['축산', '한우', '돼지', '닭', 'AI', '구제역', '가축', '방역', '소', '젖소', '양돈', '가금', '돈사', '계사'],
+    '양봉': ['양봉', '벌통', '꿀벌', '벌집', '봉군', '말벌', '응애', '월동벌', '장수말벌', '등검은말벌', '합봉', '사양기']
+}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick. 노드마다 '이 위치에서 끝나는 키워드 중 가장 높은 우선순위'만 보관"""
+    NONE = 1 << 30
+
+    def __init__(self, keyword_priorities: Dict[str, int]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.best: List[int] = [self.NONE]
+
+        for keyword, priority in keyword_priorities.items():
+            node = 0
+            for ch in keyword:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(self.NONE)
+                node = nxt
+            self.best[node] = min(self.best[node], priority)
+
+        # BFS 로 실패 링크 + 접미사 키워드의 우선순위 전파 (깊이 1 노드의 실패 링크는 루트)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.best[child] = min(self.best[child], self.best[self.fail[child]])
+                queue.append(child)
+
+    def scan(self, text: str) -> int:
+        """text 에 나타나는 키워드 중 가장 높은 우선순위 (없으면 NONE)"""
+        goto, fail, best = self.goto, self.fail, self.best
+        node = 0
+        found = self.NONE
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == 0: break   # SKIP 보다 높은 우선순위는 없음
+        return found
+
+
+def build_detector(category_map: Dict[str, List[str]], skip_keywords: List[str] = ()) -> Callable[[str], str]:
+    """분류 맵 -> detect_category 와 같은 규칙의 분류 함수 (맵마다 오토마톤 하나)"""
+    labels = [SKIP] + list(category_map)
+    priorities: Dict[str, int] = {}
+    for priority, label in enumerate(labels):
+        keywords = skip_keywords if label == SKIP else category_map[label]
+        for keyword in keywords:
+            priorities.setdefault(keyword, priority)
+    automaton = KeywordAutomaton(priorities)
+
+    @lru_cache(maxsize=4096)
+    def detect(text: str) -> str:
+        found = automaton.scan(text.replace(" ", ""))
+        return labels[found] if found != KeywordAutomaton.NONE else DEFAULT_CATEGORY
+    return detect
+
+_detect = build_detector(CATEGORY_MAP, SKIP_KEYWORDS)
+
+
+def detect_category(text: str) -> str:
+    """헤더 제목 -> 분류 ('SKIP' = 목차, 매칭 없음 = '기타')"""
+    return _detect(text)
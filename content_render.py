@@ -0,0 +1,135 @@
+import re
+import time
+import argparse
+import duckdb
+from typing import List, Tuple
+from db_publish import clone_current, publish
+
+# ==========================================
+# 화면용 본문 사전 렌더링 (적재 시 1회)
+# - farm_display(id, clean_title, display_md, render_version) 보조 테이블에 저장
+#   (HNSW 인덱스가 있는 farm_info 는 ALTER 불가 -> id 로 잇는 별도 테이블)
+# - 깨진 파이프 표 복구, 도트 리더 제거, '~' 이스케이프 (Streamlit 취소선 방지)
+# - RENDER_VERSION 을 올리면 다음 동기화 때 버전이 다른 행만 다시 렌더링
+# ==========================================
+RENDER_VERSION = 1
+MAX_TABLE_COLS = 5
+RENDER_CHUNK = 2000
+
+DOT_LEADER = re.compile(r'[·…ㆍ]{2,}|\.{3,}')
+SEPARATOR_CELL = re.compile(r'^:?-{2,}:?$')
+
+
+def clean_title(title: str) -> str:
+    """'# [2024-01-01~2024-01-07] 제5장 과수' -> '제5장 과수'"""
+    if not title: return ""
+    return title.split(']')[-1].strip() if ']' in title else title
+
+def _repair_table(block: List[str]) -> List[str]:
+    rows = []
+    for raw in block:
+        processed = DOT_LEADER.sub('', raw.strip())
+        processed = re.sub(r'\|+', '|', processed)  # ||| -> |
+        cells = [c.strip() for c in processed.strip('|').split('|')]
+        while cells and not cells[-1]: cells.pop()
+        # 원문 구분선(|---|)은 버리고 열 수에 맞춰 다시 만듦
+        if not cells or all(SEPARATOR_CELL.match(c) for c in cells if c): continue
+        rows.append(cells)
+    if not rows: return []
+
+    # 열이 너무 많으면(목차 표가 깨진 경우) 앞쪽 열만 두고 나머지는 마지막 열에 합침
+    n_cols = min(max(len(r) for r in rows), MAX_TABLE_COLS)
+    if n_cols < 2:
+        return [" ".join(r) for r in rows]
+
+    out = []
+    for idx, cells in enumerate(rows):
+        if len(cells) > n_cols:
+            cells = cells[:n_cols - 1] + [" ".join(cells[n_cols - 1:])]
+        cells = cells + [""] * (n_cols - len(cells))
+        out.append("| " + " | ".join(cells) + " |")
+        if idx == 0:
+            out.append("|" + " --- |" * n_cols)
+    return out
+
+def render_display(text: str) -> str:
+    """원문 content_md -> 그대로 st.markdown 할 수 있는 본문"""
+    if not text: return ""
+    out: List[str] = []
+    block: List[str] = []
+
+    def flush():
+        if not block: return
+        table = _repair_table(block)
+        # 표 앞뒤에 빈 줄이 없으면 마크다운이 표로 인식하지 않거나 다음 문단을 행으로 붙임
+        if table and out and out[-1].strip(): out.append("")
+        out.extend(table)
+        if table: out.append("")
+        block.clear()
+
+    for line in text.splitlines():
+        if '|' in line:
+            block.append(line)
+            continue
+        flush()
+        out.append(DOT_LEADER.sub('', line))
+    flush()
+    return "\n".join(out).replace('~', r'\~')
+
+
+# ==========================================
+# DB 동기화
+# ==========================================
+def init_display_table(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS farm_display (
+            id INTEGER PRIMARY KEY,
+            clean_title TEXT, display_md TEXT,
+            render_version INTEGER
+        )
+    """)
+
+def sync_display(con: duckdb.DuckDBPyConnection, force: bool = False) -> Tuple[int, int]:
+    """없는 행/버전이 다른 행만 렌더링, 삭제된 행은 정리 (렌더링 수, 정리 수)"""
+    init_display_table(con)
+    removed = con.execute("""
+        SELECT COUNT(*) FROM farm_display WHERE id NOT IN (SELECT id FROM farm_info)
+    """).fetchone()[0]
+    if removed:
+        con.execute("DELETE FROM farm_display WHERE id NOT IN (SELECT id FROM farm_info)")
+
+    pending = [r[0] for r in con.execute("""
+        SELECT f.id FROM farm_info f LEFT JOIN farm_display d USING (id)
+        WHERE ? OR d.id IS NULL OR d.render_version <> ?
+        ORDER BY f.id
+    """, [force, RENDER_VERSION]).fetchall()]
+
+    for i in range(0, len(pending), RENDER_CHUNK):
+        ids = pending[i:i + RENDER_CHUNK]
+        rows = con.execute("SELECT id, title, content_md FROM farm_info WHERE id IN (SELECT unnest(?::INTEGER[]))",
+                           [ids]).fetchall()
+        con.executemany("INSERT OR REPLACE INTO farm_display VALUES (?, ?, ?, ?)", [
+            (rid, clean_title(title), render_display(content), RENDER_VERSION) for rid, title, content in rows
+        ])
+    return len(pending), removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="화면용 본문(farm_display) 렌더링 후 새 버전으로 공개")
+    parser.add_argument('--force', action='store_true', help="버전과 상관없이 전체 다시 렌더링")
+    args = parser.parse_args()
+
+    db_path = clone_current()
+    con = duckdb.connect(db_path)
+    # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    t0 = time.perf_counter()
+    rendered, removed = sync_display(con, force=args.force)
+    con.execute("CHECKPOINT")
+    con.close()
+    print(f"🖋️ 렌더링 {rendered}건 / 정리 {removed}건 (v{RENDER_VERSION}, {time.perf_counter() - t0:.1f}s)")
+    publish(db_path)
+
+if __name__ == "__main__":
+    main()
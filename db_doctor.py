@@ -0,0 +1,240 @@
+import re
+import sys
+import time
+import argparse
+import duckdb
+from typing import Dict, List, Any, Optional
+import farm_queries
+from db_publish import resolve_db_path
+from content_render import RENDER_VERSION
+
+# ==========================================
+# DB 진단 (check-db.py / fts-check.py / check_indices.py 통합)
+# - 읽기 전용으로 열어 확장/인덱스 존재 확인
+# - 앱이 실제로 쓰는 쿼리(farm_queries)를 EXPLAIN 해서 의도한 스캔인지 확인
+#   (검색 = HNSW_INDEX_SCAN, 연/월 조회 = SEQ_SCAN 에 필터 푸시다운)
+# - 실패가 하나라도 있으면 종료 코드 1 -> 배포 전/CI 에서 성능 퇴행 차단
+# ==========================================
+REQUIRED_EXTENSIONS = ['vss']
+OPTIONAL_EXTENSIONS = ['fts']   # 앱은 아직 BM25 를 쓰지 않음 -> 없으면 경고만
+
+EXPECTED_INDEXES = [
+    {'name': 'vss_idx', 'table': 'farm_info', 'using': 'HNSW', 'required': True},
+    {'name': 'weather_series_idx', 'table': 'weather_series', 'using': 'ART', 'required': False},
+    {'name': 'related_docs_idx', 'table': 'related_docs', 'using': 'ART', 'required': False},
+    {'name': 'near_dups_idx', 'table': 'near_dups', 'using': 'ART', 'required': False},
+]
+FTS_SCHEMA = 'fts_main_farm_info'
+
+# 쿼리별 지연 예산 (ms, p50 기준). 넘으면 실패
+QUERY_BUDGET_MS = {
+    'week_list': 50, 'all_crops': 100, 'briefing_week': 100, 'briefing_month': 150, 'search': 50,
+    'weather_yoy': 50, 'trend_seasonal': 50, 'related': 20, 'risk_series': 50, 'near_dups': 20,
+}
+TIMING_REPEAT = 5
+
+
+class Report:
+    def __init__(self):
+        self.failures = 0
+        self.warnings = 0
+
+    def ok(self, msg: str) -> None:
+        print(f"  ✅ {msg}")
+
+    def warn(self, msg: str) -> None:
+        self.warnings += 1
+        print(f"  ⚠️ {msg}")
+
+    def fail(self, msg: str) -> None:
+        self.failures += 1
+        print(f"  ❌ {msg}")
+
+
+def index_method(create_sql: str) -> str:
+    # CREATE INDEX ... USING HNSW (...) / USING 절이 없으면 기본 ART
+    m = re.search(r'USING\s+(\w+)', create_sql, re.IGNORECASE)
+    return m.group(1).upper() if m else 'ART'
+
+def plan_text(con: duckdb.DuckDBPyConnection, sql: str, params: list) -> str:
+    return "\n".join(r[1] for r in con.execute("EXPLAIN " + sql, params).fetchall())
+
+
+# ==========================================
+# 1. 확장 / 테이블 / 인덱스
+# ==========================================
+def check_extensions(con: duckdb.DuckDBPyConnection, rep: Report) -> None:
+    print("🧩 확장")
+    for ext in REQUIRED_EXTENSIONS + OPTIONAL_EXTENSIONS:
+        try:
+            con.execute(f"LOAD {ext};")
+            rep.ok(f"{ext} 로드됨")
+        except duckdb.Error as e:
+            msg = f"{ext} 로드 실패: {str(e).splitlines()[0]}"
+            rep.fail(msg) if ext in REQUIRED_EXTENSIONS else rep.warn(msg)
+
+def check_schema(con: duckdb.DuckDBPyConnection, rep: Report) -> Optional[str]:
+    """farm_info 와 임베딩 컬럼 타입 확인 (검색 쿼리의 ::FLOAT[n] 캐스트와 같아야 인덱스 사용)"""
+    print("📐 스키마")
+    cols = dict(con.execute("""
+        SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = 'farm_info'
+    """).fetchall())
+    if not cols:
+        rep.fail("farm_info 테이블 없음")
+        return None
+    rows = con.execute("SELECT count(*) FROM farm_info").fetchone()[0]
+    rep.ok(f"farm_info {rows:,}행")
+    emb_type = cols.get('embedding')
+    if emb_type and emb_type.upper() in farm_queries.SEARCH_SQL.upper():
+        rep.ok(f"embedding {emb_type} (검색 쿼리 캐스트와 일치)")
+    else:
+        rep.fail(f"embedding 타입 {emb_type} 이(가) 검색 쿼리 캐스트와 다름")
+
+    # 화면용 본문 (없거나 오래되면 앱이 요청마다 렌더링)
+    if con.execute("SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'farm_display'").fetchone()[0]:
+        stale = con.execute("""
+            SELECT COUNT(*) FROM farm_info f LEFT JOIN farm_display d USING (id)
+            WHERE d.id IS NULL OR d.render_version <> ?
+        """, [RENDER_VERSION]).fetchone()[0]
+        if stale:
+            rep.warn(f"farm_display 미렌더링/구버전 {stale:,}행 - python content_render.py")
+        else:
+            rep.ok(f"farm_display v{RENDER_VERSION} 최신")
+    else:
+        rep.warn("farm_display 없음 - python content_render.py")
+    return emb_type
+
+def check_indexes(con: duckdb.DuckDBPyConnection, rep: Report) -> None:
+    print("🗂️ 인덱스")
+    found = {r[0]: (r[1], r[2] or "") for r in con.execute(
+        "SELECT index_name, table_name, sql FROM duckdb_indexes()").fetchall()}
+    for exp in EXPECTED_INDEXES:
+        info = found.get(exp['name'])
+        if info is None:
+            msg = f"{exp['name']} 없음 ({exp['table']}, {exp['using']})"
+            rep.fail(msg) if exp['required'] else rep.warn(msg)
+        elif info[0] != exp['table'] or index_method(info[1]) != exp['using']:
+            rep.fail(f"{exp['name']} 정의가 다름: {info[1]}")
+        else:
+            rep.ok(f"{exp['name']} ({exp['table']}, {exp['using']})")
+    for name in sorted(set(found) - {e['name'] for e in EXPECTED_INDEXES}):
+        rep.ok(f"{name} (추가 인덱스, {found[name][0]})")
+
+    has_fts = con.execute("SELECT count(*) FROM duckdb_schemas() WHERE schema_name = ?", [FTS_SCHEMA]).fetchone()[0]
+    if has_fts:
+        rep.ok(f"FTS 인덱스 ({FTS_SCHEMA})")
+    else:
+        rep.warn(f"FTS 인덱스 없음 ({FTS_SCHEMA}) - 키워드 검색을 추가하면 필요")
+
+
+# ==========================================
+# 2. 운영 쿼리 플랜 / 지연
+# ==========================================
+def query_shapes(con: duckdb.DuckDBPyConnection) -> List[Dict[str, Any]]:
+    """app_dashboard.py 가 farm_queries 로 실행하는 쿼리와 같은 SQL + 실제 데이터에서 고른 파라미터"""
+    year, month = con.execute("SELECT year, month FROM farm_info ORDER BY year DESC, month LIMIT 1").fetchone()
+    week = con.execute(farm_queries.WEEK_LIST_SQL, [year, month]).fetchone()
+    vector = con.execute("SELECT embedding FROM farm_info WHERE embedding IS NOT NULL LIMIT 1").fetchone()
+    shapes = [
+        {'name': 'week_list', 'sql': farm_queries.WEEK_LIST_SQL, 'params': [year, month], 'expect': 'pushdown'},
+        {'name': 'all_crops', 'sql': farm_queries.ALL_CROPS_SQL, 'params': [], 'expect': None},
+        {'name': 'briefing_month', 'sql': farm_queries.display_sql(con, farm_queries.BRIEFING_MONTH_SQL),
+         'params': [month], 'expect': 'pushdown'},
+    ]
+    if farm_queries.has_table(con, 'weather_series'):
+        shapes.append({'name': 'weather_yoy', 'sql': farm_queries.WEATHER_YOY_SQL,
+                       'params': ['temp', None, None], 'expect': 'pushdown'})
+    if farm_queries.has_table(con, 'tag_trend'):
+        shapes.append({'name': 'trend_seasonal', 'sql': farm_queries.TREND_SEASONAL_SQL,
+                       'params': ['pest', ['탄저병']], 'expect': 'pushdown'})
+    if farm_queries.has_table(con, 'risk_series'):
+        shapes.append({'name': 'risk_series', 'sql': farm_queries.RISK_SERIES_SQL,
+                       'params': ['전체'], 'expect': 'pushdown'})
+    if farm_queries.has_table(con, 'near_dups'):
+        canon = con.execute("SELECT canonical_id FROM near_dups LIMIT 1").fetchone()
+        if canon:
+            shapes.append({'name': 'near_dups', 'sql': farm_queries.NEAR_DUPS_SQL, 'params': [canon[0]], 'expect': None})
+    if farm_queries.has_table(con, 'related_docs'):
+        src = con.execute("SELECT src_id FROM related_docs LIMIT 1").fetchone()
+        if src:
+            shapes.append({'name': 'related', 'sql': farm_queries.RELATED_SQL, 'params': [src[0]], 'expect': 'pushdown'})
+    if week and week[0]:
+        shapes.append({'name': 'briefing_week', 'sql': farm_queries.display_sql(con, farm_queries.BRIEFING_WEEK_SQL),
+                       'params': [f'%{week[0]}%'], 'expect': None})
+    if vector:
+        search_sql = farm_queries.display_sql(con, farm_queries.SEARCH_SQL, limit=farm_queries.SEARCH_LIMIT)
+        shapes.append({'name': 'search', 'sql': search_sql,
+                       'params': [list(vector[0])], 'expect': 'HNSW_INDEX_SCAN'})
+    return shapes
+
+def check_plans(con: duckdb.DuckDBPyConnection, rep: Report, shapes: List[Dict[str, Any]], verbose: bool) -> None:
+    print("🔍 쿼리 플랜")
+    for shape in shapes:
+        try:
+            plan = plan_text(con, shape['sql'], shape['params'])
+        except duckdb.Error as e:
+            rep.fail(f"{shape['name']}: EXPLAIN 실패 ({str(e).splitlines()[0]})")
+            continue
+        if verbose: print(plan)
+
+        expect = shape['expect']
+        if expect == 'pushdown':
+            if 'SEQ_SCAN' in plan and 'Filters:' in plan:
+                rep.ok(f"{shape['name']}: SEQ_SCAN + 필터 푸시다운")
+            else:
+                rep.fail(f"{shape['name']}: 필터가 스캔으로 내려가지 않음")
+        elif expect:
+            if expect in plan:
+                rep.ok(f"{shape['name']}: {expect}")
+            else:
+                rep.fail(f"{shape['name']}: {expect} 아님 (전체 스캔) - 쿼리 형태/인덱스 확인")
+        else:
+            rep.ok(f"{shape['name']}: 플랜 확인 (기대 연산자 없음)")
+
+def check_latency(con: duckdb.DuckDBPyConnection, rep: Report, shapes: List[Dict[str, Any]], repeat: int) -> None:
+    print(f"⏱️ 지연 (p50, {repeat}회)")
+    for shape in shapes:
+        latencies = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            con.execute(shape['sql'], shape['params']).fetchall()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        p50 = sorted(latencies)[len(latencies) // 2]
+        budget = QUERY_BUDGET_MS.get(shape['name'])
+        msg = f"{shape['name']}: {p50:.1f}ms" + (f" (예산 {budget}ms)" if budget else "")
+        rep.fail(msg) if budget and p50 > budget else rep.ok(msg)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 인덱스/쿼리 플랜 진단 (실패 시 종료 코드 1)")
+    parser.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    parser.add_argument('--no-timing', action='store_true', help="지연 예산 검사 생략 (플랜만)")
+    parser.add_argument('--repeat', type=int, default=TIMING_REPEAT)
+    parser.add_argument('--strict', action='store_true', help="경고도 실패로 처리")
+    parser.add_argument('-v', '--verbose', action='store_true', help="EXPLAIN 전체 출력")
+    args = parser.parse_args()
+
+    db_path = args.db or resolve_db_path()
+    print(f"🩺 DB 진단: {db_path}")
+    try:
+        con = duckdb.connect(db_path, read_only=True)
+    except duckdb.Error as e:
+        print(f"❌ DB 열기 실패: {e}")
+        sys.exit(1)
+
+    rep = Report()
+    check_extensions(con, rep)
+    if check_schema(con, rep):
+        check_indexes(con, rep)
+        shapes = query_shapes(con)
+        check_plans(con, rep, shapes, args.verbose)
+        if not args.no_timing:
+            check_latency(con, rep, shapes, args.repeat)
+    con.close()
+
+    failed = rep.failures + (rep.warnings if args.strict else 0)
+    print(f"\n{'❌ 문제 발견' if failed else '✅ 정상'}: 실패 {rep.failures}건, 경고 {rep.warnings}건")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
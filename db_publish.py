@@ -0,0 +1,148 @@
+import os
+import sys
+import glob
+import shutil
+import duckdb
+from datetime import datetime
+from typing import List, Optional
+
+# [설정] 블루/그린 배포
+# - 적재(embed.py)는 항상 db_versions/ 아래 새 버전 파일에 쓰고
+# - 완성된 파일을 검증한 뒤 포인터 파일을 원자적으로 교체(os.replace)하여 공개한다.
+# - 앱은 매 실행(rerun)마다 포인터만 읽고, 바뀌었으면 새 파일을 열어 워밍 후 교체한다.
+DB_PATH = "farming_granular.duckdb"        # 포인터가 없을 때 쓰는 기존 단일 파일
+VERSIONS_DIR = "db_versions"
+POINTER_FILE = "farming_granular.current"  # 현재 공개 버전의 경로 한 줄
+KEEP_VERSIONS = 2                          # 현재 + 직전 버전 (열려 있는 앱 세션 보호)
+
+
+def normalize_path(path: str) -> str:
+    """버전 비교용 절대 경로 (상대/절대/심볼릭 링크로 적어도 같은 파일이면 같은 문자열)"""
+    return os.path.realpath(path)
+
+def resolve_db_path() -> str:
+    """현재 공개된 DB 경로 (포인터 -> 없으면 기존 파일)"""
+    try:
+        with open(POINTER_FILE, 'r', encoding='utf-8') as f:
+            target = f.read().strip()
+        if target and os.path.exists(target):
+            return normalize_path(target)
+    except FileNotFoundError:
+        pass
+    return normalize_path(DB_PATH)
+
+def new_version_path() -> str:
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(VERSIONS_DIR, f"farming_granular_{stamp}.duckdb")
+
+def clone_current() -> str:
+    """현재 공개 버전을 새 버전 파일로 복사 (증분 작업은 복사본에서 수행 후 공개)"""
+    src = resolve_db_path()
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"공개된 DB가 없습니다: {src} (python embed.py 로 먼저 적재)")
+    dst = new_version_path()
+    try:
+        shutil.copyfile(src, dst)
+        if os.path.exists(src + ".wal"):
+            shutil.copyfile(src + ".wal", dst + ".wal")
+    except BaseException:
+        # 복사 도중 실패하면 반쯤 쓴 버전 파일을 남기지 않음
+        for target in (dst, dst + ".wal"):
+            if os.path.exists(target): os.remove(target)
+        raise
+    return dst
+
+def list_versions() -> List[str]:
+    """버전 파일 (파일 이름의 시각 순 = 오래된 것부터)"""
+    return sorted(normalize_path(p) for p in glob.glob(os.path.join(VERSIONS_DIR, "farming_granular_*.duckdb")))
+
+def validate_version(db_path: str) -> int:
+    """공개 전 점검: 읽기 전용으로 열리고 farm_info에 행과 HNSW 인덱스(vss_idx)가 있어야 함"""
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        try:
+            con.execute("LOAD vss;")  # HNSW 인덱스가 있는 파일도 정상 인식하도록
+        except duckdb.Error:
+            pass
+        count = con.execute("SELECT COUNT(*) FROM farm_info").fetchone()[0]
+        has_index = con.execute("""
+            SELECT COUNT(*) FROM duckdb_indexes() WHERE table_name = 'farm_info' AND index_name = 'vss_idx'
+        """).fetchone()[0] > 0
+    finally:
+        con.close()
+    if count == 0:
+        raise ValueError(f"farm_info가 비어 있습니다: {db_path}")
+    if not has_index:
+        # 인덱스 없이 공개하면 검색이 전체 스캔으로 떨어짐 -> 포인터를 바꾸지 않음
+        raise ValueError(f"HNSW 인덱스(vss_idx)가 없습니다: {db_path}")
+    return count
+
+def publish(db_path: str) -> None:
+    """포인터 파일을 임시 파일 + os.replace로 원자적으로 교체"""
+    db_path = normalize_path(db_path)
+    count = validate_version(db_path)
+
+    tmp_pointer = POINTER_FILE + ".tmp"
+    with open(tmp_pointer, 'w', encoding='utf-8') as f:
+        f.write(db_path + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, POINTER_FILE)
+    print(f"📢 공개 완료: {db_path} ({count}행)")
+
+    cleanup_old_versions()
+    sync_shards_after_publish(db_path)
+
+def sync_shards_after_publish(db_path: str) -> None:
+    """샤드를 쓰는 배포면 새 공개 버전으로 바뀐 연도 샤드만 다시 씀 (롤백/부가 테이블 갱신 포함 모든 공개 경로)
+    실패해도 공개는 유지 -> 앱은 매니페스트의 source 가 현재 버전과 다르면 단일 DB 로 검색"""
+    import shards   # shards 가 db_publish 를 import 하므로 지연 import
+    if shards.load_manifest() is None: return
+    try:
+        written, total = shards.sync_shards(db_path)
+        if written: print(f"🧩 샤드 {written}/{total}개 갱신")
+    except Exception as e:
+        print(f"⚠️ 샤드 동기화 실패 (단일 DB 검색으로 동작): {e}")
+
+def cleanup_old_versions(keep: int = KEEP_VERSIONS) -> None:
+    current = resolve_db_path()   # 정규화된 경로끼리 비교 -> 포인터가 가리키는 파일은 절대 지우지 않음
+    stale = [p for p in list_versions() if p != current][:-(keep - 1) or None]
+    for path in stale:
+        for target in (path, path + ".wal"):
+            try:
+                if os.path.exists(target): os.remove(target)
+            except OSError as e:
+                # 다른 프로세스가 아직 열고 있는 경우(Windows 등) 다음 정리 때 재시도
+                print(f"⚠️ 이전 버전 삭제 보류: {target} ({e})")
+
+def rollback() -> Optional[str]:
+    """직전 버전으로 포인터 되돌리기"""
+    current = resolve_db_path()
+    versions = list_versions()
+    if current not in versions:
+        # 포인터가 없거나(기존 단일 파일) 버전 폴더 밖의 파일 -> 되돌릴 기준이 없음
+        print(f"⚠️ 현재 DB가 버전 파일이 아니라 되돌릴 수 없습니다: {current}")
+        return None
+    idx = versions.index(current)
+    if idx == 0:
+        print("⚠️ 되돌릴 이전 버전이 없습니다.")
+        return None
+    publish(versions[idx - 1])
+    return versions[idx - 1]
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "status":
+        print(f"현재: {resolve_db_path()}")
+        for path in list_versions():
+            print(f"  - {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    elif cmd == "publish" and len(sys.argv) > 2:
+        publish(sys.argv[2])
+    elif cmd == "rollback":
+        rollback()
+    elif cmd == "cleanup":
+        cleanup_old_versions()
+    else:
+        print("사용법: python db_publish.py [status | publish <db파일> | rollback | cleanup]")
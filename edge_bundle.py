@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import duckdb
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from db_publish import resolve_db_path
+from ingest_report import peak_rss_mb
+
+try:
+    import resource  # 유닉스 전용 (메모리 상한)
+except ImportError:
+    resource = None
+
+# ==========================================
+# 오프라인 엣지 번들 (활용방안 #4 비닐하우스/산간 태블릿)
+# - export: 디렉터리 하나에 모델 + DB + 확장 + manifest.json (네트워크 없이 실행)
+#   * 모델: fp16 으로 저장 (디스크 절반), 실행 시 Linear 를 int8 동적 양자화
+#   * DB: 공개 버전을 새 파일로 다시 써서 빈 블록 없이 압축
+#     vectors='duckdb' -> 임베딩 + HNSW 유지, vss 확장 파일을 번들에 포함
+#     vectors='npy'    -> farm_info 에서 임베딩을 빼고 정규화된 fp16 vectors.npy (mmap 으로 읽음, vss 불필요)
+# - launch: 메모리 상한(RLIMIT_DATA) + DuckDB memory_limit + 오프라인 환경변수로 앱 실행
+# - check: 콜드 스타트(모델/DB 로드 + 첫 검색) 시간과 peak RSS 측정
+# ==========================================
+MANIFEST = "manifest.json"
+BUNDLE_FORMAT = 1
+BUNDLE_ENV = "FARM_BUNDLE"
+MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+
+MEMORY_MB = 1536               # 태블릿 기준 프로세스 전체 상한
+DUCKDB_MEMORY_MB = 384         # 그중 DuckDB 버퍼
+TORCH_THREADS = 2
+BUNDLED_EXTENSIONS = ['vss']
+
+
+# ==========================================
+# 1. export
+# ==========================================
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def export_database(src_path: str, out_dir: str, vectors: str) -> Dict[str, Any]:
+    """공개 버전 -> bundle/farm.duckdb (테이블/뷰/인덱스 재생성). vectors='npy' 면 임베딩은 npy 로 분리"""
+    db_path = os.path.join(out_dir, "farm.duckdb")
+    if os.path.exists(db_path): os.remove(db_path)
+    con = duckdb.connect(db_path)
+    try:
+        con.execute("LOAD vss;")   # 원본에 HNSW 인덱스가 있으면 필요
+        con.execute("SET hnsw_enable_experimental_persistence = true;")
+    except duckdb.Error:
+        pass
+    con.execute(f"ATTACH '{src_path.replace(chr(39), chr(39) * 2)}' AS src (READ_ONLY)")
+
+    tables = [r[0] for r in con.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE database_name = 'src' AND NOT temporary ORDER BY 1").fetchall()]
+    for table in tables:
+        if table == 'farm_info' and vectors == 'npy':
+            con.execute("CREATE TABLE farm_info AS SELECT * EXCLUDE (embedding) FROM src.farm_info ORDER BY id")
+        else:
+            con.execute(f"CREATE TABLE {table} AS SELECT * FROM src.{table}")
+    for (sql,) in con.execute(
+            "SELECT sql FROM duckdb_views() WHERE database_name = 'src' AND NOT internal AND sql IS NOT NULL").fetchall():
+        con.execute(sql)
+    for (sql,) in con.execute("SELECT sql FROM duckdb_indexes() WHERE database_name = 'src'").fetchall():
+        if vectors == 'npy' and 'HNSW' in sql.upper(): continue
+        con.execute(sql)
+
+    info: Dict[str, Any] = {'tables': tables, 'rows': con.execute("SELECT COUNT(*) FROM farm_info").fetchone()[0]}
+    if vectors == 'npy':
+        # 대표 행만 내보냄 (HNSW 검색과 같음, 거의 같은 섹션은 near_dups 로 대표 행 아래에 표시)
+        cols = con.execute(
+            "SELECT id, embedding FROM src.farm_info WHERE embedding IS NOT NULL ORDER BY id").fetchnumpy()
+        matrix = np.stack(cols['embedding']).astype(np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        np.save(os.path.join(out_dir, "vector_ids.npy"), cols['id'].astype(np.int32))
+        np.save(os.path.join(out_dir, "vectors.npy"), matrix.astype(np.float16))
+        info['dim'] = int(matrix.shape[1])
+    else:
+        info['dim'] = int(con.execute(
+            "SELECT array_length(embedding) FROM farm_info WHERE embedding IS NOT NULL LIMIT 1").fetchone()[0])
+
+    con.execute("DETACH src")
+    con.execute("CHECKPOINT")
+    con.close()
+    return info
+
+def export_extensions(out_dir: str) -> List[str]:
+    """설치된 확장 파일을 bundle/extensions/<버전>/<플랫폼>/ 으로 복사 (extension_directory 와 같은 구조)"""
+    con = duckdb.connect()
+    copied = []
+    for ext in BUNDLED_EXTENSIONS:
+        con.execute(f"INSTALL {ext};")
+        path = con.execute("SELECT install_path FROM duckdb_extensions() WHERE extension_name = ?", [ext]).fetchone()[0]
+        # .../extensions/v1.x.y/<플랫폼>/vss.duckdb_extension 의 마지막 세 단계를 그대로 유지
+        rel = os.path.join(*os.path.normpath(path).split(os.sep)[-3:])
+        dst = os.path.join(out_dir, "extensions", rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(path, dst)
+        copied.append(ext)
+    con.close()
+    return copied
+
+def export_model(out_dir: str) -> str:
+    """fp16 가중치로 저장 (실행 시 int8 동적 양자화)"""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(MODEL_NAME, device='cpu')
+    model.half()
+    model_dir = os.path.join(out_dir, "model")
+    model.save(model_dir)
+    return model_dir
+
+def export_bundle(out_dir: str, vectors: str = 'duckdb', db_path: Optional[str] = None) -> Dict[str, Any]:
+    os.makedirs(out_dir, exist_ok=True)
+    src = db_path or resolve_db_path()
+    t0 = time.perf_counter()
+    db_info = export_database(src, out_dir, vectors)
+    extensions = export_extensions(out_dir) if vectors == 'duckdb' else []
+    export_model(out_dir)
+
+    files = {}
+    for root, _, names in os.walk(out_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, out_dir)
+            if rel == MANIFEST: continue
+            files[rel] = {'bytes': os.path.getsize(path), 'sha256': _sha256(path)}
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'source_db': os.path.basename(src),
+        'duckdb_version': duckdb.__version__,
+        'db': 'farm.duckdb', 'vectors': vectors, 'dim': db_info['dim'], 'rows': db_info['rows'],
+        'tables': db_info['tables'], 'extensions': extensions,
+        'model': {'name': MODEL_NAME, 'path': 'model', 'stored_dtype': 'float16', 'runtime': 'int8-dynamic'},
+        'memory_mb': MEMORY_MB, 'duckdb_memory_mb': DUCKDB_MEMORY_MB,
+        'files': files,
+        'export_seconds': round(time.perf_counter() - t0, 1),
+    }
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+# ==========================================
+# 2. 번들에서 실행 (앱/check 공용)
+# ==========================================
+def active_bundle() -> Optional[Dict[str, Any]]:
+    """FARM_BUNDLE 환경변수가 있으면 manifest (+ 'dir')"""
+    bundle_dir = os.environ.get(BUNDLE_ENV)
+    if not bundle_dir: return None
+    with open(os.path.join(bundle_dir, MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['dir'] = os.path.abspath(bundle_dir)
+    return manifest
+
+def bundle_db_path(bundle: Dict[str, Any]) -> str:
+    return os.path.join(bundle['dir'], bundle['db'])
+
+def open_bundle_database(bundle: Dict[str, Any]) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(bundle_db_path(bundle), read_only=True, config={
+        'memory_limit': f"{bundle.get('duckdb_memory_mb', DUCKDB_MEMORY_MB)}MB",
+        'threads': TORCH_THREADS,
+        'extension_directory': os.path.join(bundle['dir'], "extensions"),
+        'autoinstall_known_extensions': False,
+    })
+    for ext in bundle.get('extensions', []):
+        con.execute(f"LOAD {ext};")   # 번들에 포함된 파일에서 로드 (INSTALL 없음)
+    return con
+
+def load_bundle_model(bundle: Dict[str, Any]):
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(TORCH_THREADS)
+    model = SentenceTransformer(os.path.join(bundle['dir'], bundle['model']['path']), device='cpu')
+    model.float()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_bundle_vectors(bundle: Dict[str, Any]):
+    """vectors='npy' 번들: (ids, fp16 행렬) - mmap 이라 실제로 읽은 페이지만 메모리에 올라감"""
+    if bundle.get('vectors') != 'npy': return None
+    return (np.load(os.path.join(bundle['dir'], "vector_ids.npy")),
+            np.load(os.path.join(bundle['dir'], "vectors.npy"), mmap_mode='r'))
+
+def apply_memory_limit(memory_mb: int) -> bool:
+    """RLIMIT_DATA (힙 + 익명 mmap) 상한. 파일 mmap(vectors.npy, DB) 은 페이지 캐시라 포함되지 않음"""
+    if resource is None: return False
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    return True
+
+def launch(bundle_dir: str, memory_mb: int, port: int) -> None:
+    env = dict(os.environ)
+    env.update({
+        BUNDLE_ENV: os.path.abspath(bundle_dir),
+        'HF_HUB_OFFLINE': '1', 'TRANSFORMERS_OFFLINE': '1',
+        'OMP_NUM_THREADS': str(TORCH_THREADS), 'MALLOC_ARENA_MAX': '2',
+    })
+    limited = apply_memory_limit(memory_mb)
+    print(f"🚜 번들 실행: {bundle_dir} (메모리 상한 {memory_mb}MB{'' if limited else ' - 미지원 OS'})")
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_dashboard.py")
+    os.execvpe(sys.executable, [sys.executable, "-m", "streamlit", "run", app,
+                                "--server.headless", "true", "--server.port", str(port),
+                                "--browser.gatherUsageStats", "false"], env)
+
+def check(bundle_dir: str, memory_mb: int) -> None:
+    """콜드 스타트 측정: 무결성 확인 -> DB 열기 -> 모델 로드 -> 첫 검색"""
+    import farm_queries
+    os.environ[BUNDLE_ENV] = bundle_dir
+    apply_memory_limit(memory_mb)
+    bundle = active_bundle()
+
+    t0 = time.perf_counter()
+    bad = [rel for rel, meta in bundle['files'].items()
+           if not os.path.exists(os.path.join(bundle_dir, rel))
+           or os.path.getsize(os.path.join(bundle_dir, rel)) != meta['bytes']]
+    if bad:
+        print(f"❌ 누락/크기 불일치 파일: {bad}")
+        sys.exit(1)
+    timings = {}
+    t = time.perf_counter()
+    con = open_bundle_database(bundle)
+    vectors = load_bundle_vectors(bundle)
+    timings['db'] = time.perf_counter() - t
+    t = time.perf_counter()
+    model = load_bundle_model(bundle)
+    timings['model'] = time.perf_counter() - t
+    t = time.perf_counter()
+    query_vector = model.encode("고추 탄저병 방제", normalize_embeddings=True).tolist()
+    if vectors is None:
+        results = farm_queries.search_documents(con, query_vector)
+    else:
+        results = farm_queries.search_vectors(con, vectors[0], vectors[1], query_vector)
+    timings['first_search'] = time.perf_counter() - t
+    con.close()
+
+    print(f"✅ 콜드 스타트 {time.perf_counter() - t0:.2f}s "
+          + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items())
+          + f" / 결과 {len(results)}건 / peak RSS {peak_rss_mb() or 0:.0f}MB (상한 {memory_mb}MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 엣지 번들 (내보내기/실행/점검)")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_export = sub.add_parser('export', help="번들 디렉터리 생성")
+    p_export.add_argument('out_dir')
+    p_export.add_argument('--vectors', choices=['duckdb', 'npy'], default='duckdb',
+                          help="duckdb: 임베딩+HNSW+vss 포함 / npy: fp16 벡터 파일 (더 작고 확장 불필요)")
+    p_export.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    p_launch = sub.add_parser('launch', help="번들에서 앱 실행 (메모리 상한)")
+    p_launch.add_argument('bundle_dir')
+    p_launch.add_argument('--memory-mb', type=int, default=MEMORY_MB)
+    p_launch.add_argument('--port', type=int, default=8501)
+    p_check = sub.add_parser('check', help="콜드 스타트/메모리 측정")
+    p_check.add_argument('bundle_dir')
+    p_check.add_argument('--memory-mb', type=int, default=MEMORY_MB)
+    args = parser.parse_args()
+
+    if args.cmd == 'export':
+        manifest = export_bundle(args.out_dir, args.vectors, args.db)
+        total_mb = sum(f['bytes'] for f in manifest['files'].values()) / 1024 / 1024
+        print(f"📦 번들 생성: {args.out_dir} ({total_mb:.0f}MB, {manifest['rows']}행, "
+              f"vectors={manifest['vectors']}, {manifest['export_seconds']}s)")
+    elif args.cmd == 'launch':
+        launch(args.bundle_dir, args.memory_mb, args.port)
+    else:
+        check(args.bundle_dir, args.memory_mb)
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,45 @@
 import re
+import argparse
 import duckdb
+import numpy as np
 import torch
 import gc  # [추가] 메모리 청소용
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional, Iterable, Iterator
+from db_publish import new_version_path, publish, resolve_db_path
+from ingest_report import IngestProfiler, NULL_PROFILER, count_tokens, file_size
+from md_to_json import PARQUET_COLUMNS as CONVERTED_COLUMNS
+from content_render import sync_display
+from weather_extract import build_weather_series
+from trend_cube import refresh_trend_cube
+from related_docs import build_related_docs
+from auto_tagger import build_tag_centroids
+from suggest_index import build_suggest_terms
+from typo_index import build_typo_vocab
+from sensor_rules import build_sensor_rules
+from risk_index import DAMAGE_TAGS, build_risk_prototypes, refresh_risk_index
+from near_dup import NearDupIndex, section_signature, link_near_dups
+
+try:
+    import pyarrow as pa  # [선택] 임베딩 배치를 Arrow 로 넘기면 executemany 보다 훨씬 빠름
+except ImportError:
+    pa = None
 
 # [설정 수정됨]
 MODEL_NAME = 'jhgan/ko-sroberta-multitask'
-DB_PATH = "farming_granular.duckdb"
+# [블루/그린] 적재는 항상 새 버전 파일에 하고, 끝나면 포인터를 교체해 공개 (db_publish.py)
 
 # 8GB 램 생존 설정
 BATCH_SIZE = 32           # [중요] 한 번에 하나씩 처리 (RAM 폭증 방지)
 DB_INSERT_BATCH = 50     # DB 저장은 50개씩 모아서
 MAX_TEXT_LENGTH = 512   # [타협] 2048 -> 1536 (약 25% 부하 감소, 여전히 충분히 김)
 
+CONVERTED_CHUNK = 1024   # 변환 결과 경로: staging 테이블에서 한 번에 꺼내 인코딩할 행 수
+
+# [HNSW 인덱스] 앱 검색이 코사인 기준이므로 metric도 cosine (M/ef_construction은 vss 기본값)
+HNSW_PARAMS = {'metric': 'cosine', 'M': 16, 'ef_construction': 128}
+
 # [태그 사전]
 TAG_SETS = {
     "crop": ["벼", "보리", "밀", "콩", "옥수수", "감자", "고구마", "고추", "배추", "무", "마늘", "양파", "오이", "토마토", "딸기", "수박", "복숭아", "사과", "배", "포도", "감", "인삼", "오미자", "깨", "소", "돼지", "닭", "꿀벌"],
@@ -23,6 +48,8 @@ TAG_SETS = {
     "pest": ["탄저병", "도열병", "흰가루병", "과수화상병", "진딧물", "응애", "총채벌레", "멸구", "구제역", "AI", "ASF"],
     "admin": ["PLS", "비료", "보급종", "재해보험", "시범사업", "농약"]
 }
+# 위험 지수의 피해 태그는 tags_env 로 실제 붙는 태그여야 점수에 반영됨
+assert set(DAMAGE_TAGS) <= set(TAG_SETS["env"]), f"TAG_SETS['env'] 에 없는 피해 태그: {set(DAMAGE_TAGS) - set(TAG_SETS['env'])}"
 
 # [정규식 컴파일]
 COMPILED_PATTERNS = {}
@@ -63,8 +90,8 @@ def extract_smart_tags_optimized(text: str) -> Dict[str, List[str]]:
     extracted = {}
     for category, pattern in COMPILED_PATTERNS.items():
         if pattern:
-            matches = pattern.findall(text)
-            cleaned_matches = {next(filter(None, match), '') for match in matches if match}
+            # [수정] findall 은 그룹이 1개면 튜플이 아닌 문자열을 돌려줘 태그가 첫 글자로 잘렸음 -> groups() 사용
+            cleaned_matches = {next(filter(None, m.groups()), '') for m in pattern.finditer(text)}
             if '' in cleaned_matches: cleaned_matches.remove('')
             extracted[category] = sorted(list(cleaned_matches))
         else:
@@ -88,7 +115,7 @@ def flush_buffer_to_db(con: duckdb.DuckDBPyConnection, buffer: List[Tuple]) -> N
     except duckdb.Error as e:
         print(f"❌ DB 저장 중 오류 발생: {e}")
 
-def build_database(md_file_path: str):
+def load_model() -> SentenceTransformer:
     print("📥 모델 로딩 중... (BGE-M3)")
     model = SentenceTransformer(MODEL_NAME, device='cpu')
     
@@ -97,27 +124,14 @@ def build_database(md_file_path: str):
         model, {torch.nn.Linear}, dtype=torch.qint8
     )
     
-    embedding_dimension = model.get_sentence_embedding_dimension()
-    print(f"✅ 모델 로딩 완료 (차원: {embedding_dimension})")
+    print(f"✅ 모델 로딩 완료 (차원: {model.get_sentence_embedding_dimension()})")
+    return model
 
-    con = duckdb.connect(DB_PATH)
-    init_db(con, embedding_dimension)
+def parse_sections(data: str, profiler: IngestProfiler = NULL_PROFILER) -> Iterator[Dict[str, Any]]:
+    """weekly.md 원문을 섹션 단위(메타 + 임베딩용 텍스트)로 분리"""
+    with profiler.stage('split'):
+        raw_sections = re.split(r'\n#\s*(?=\[)', data)
 
-    try:
-        with open(md_file_path, 'r', encoding='utf-8') as f:
-            data = f.read()
-    except FileNotFoundError:
-        print(f"❌ 파일을 찾을 수 없습니다: {md_file_path}")
-        return
-
-    raw_sections = re.split(r'\n#\s*(?=\[)', data)
-    
-    buffer_rows = []
-    batch_texts = []
-    batch_meta = []
-    
-    print("🔄 데이터 처리 및 임베딩 시작 (안전 모드)...")
-    
     for section in tqdm(raw_sections):
         if not section.strip(): continue
         
@@ -132,66 +146,289 @@ def build_database(md_file_path: str):
         if not date_match: continue
         year, month = int(date_match.group(1)), int(date_match.group(2))
         
-        clean_body = clean_markdown(body)
-        full_text = (clean_markdown(header) + ". " + clean_body)[:MAX_TEXT_LENGTH]
+        with profiler.stage('clean_markdown', items=1):
+            clean_body = clean_markdown(body)
+            full_text = (clean_markdown(header) + ". " + clean_body)[:MAX_TEXT_LENGTH]
         
-        search_range = header + " " + body[:1000]
-        tags = extract_smart_tags_optimized(search_range)
+        with profiler.stage('regex_tagging', items=1):
+            search_range = header + " " + body[:1000]
+            tags = extract_smart_tags_optimized(search_range)
         
-        batch_texts.append(full_text)
-        batch_meta.append({
+        yield {
             'year': year, 'month': month, 'title': header,
-            'tags': tags, 'content': body
-        })
+            'tags': tags, 'content': body, 'text': full_text
+        }
+
+def _to_row(meta: Dict[str, Any], emb) -> Tuple:
+    return (
+        meta['year'], meta['month'], meta['title'],
+        meta['tags']['crop'], meta['tags']['task'], meta['tags']['env'],
+        meta['tags']['pest'], meta['tags']['admin'],
+        meta['content'], None if emb is None else emb.tolist()
+    )
+
+def _encode_batch(model: SentenceTransformer, batch_meta: List[Dict[str, Any]],
+                  profiler: IngestProfiler) -> List[Tuple]:
+    # 거의 같은 섹션(near_dup)은 인코딩하지 않고 embedding NULL 로 저장 (near_dup.py)
+    texts = [m['text'] for m in batch_meta if not m.get('near_dup')]
+    embeddings = iter(())
+    if texts:
+        # 토큰 수는 보고서를 만들 때만 계산 (토크나이저를 한 번 더 돌리므로)
+        tokens = count_tokens(model, texts) if profiler is not NULL_PROFILER else 0
+        profiler.batch(len(texts))
+        with profiler.stage('encode', items=len(texts), tokens=tokens):
+            embeddings = iter(model.encode(texts, show_progress_bar=False, batch_size=BATCH_SIZE))
+    return [_to_row(m, None if m.get('near_dup') else next(embeddings)) for m in batch_meta]
+
+def _flush(con: duckdb.DuckDBPyConnection, buffer: List[Tuple], profiler: IngestProfiler) -> None:
+    with profiler.stage('executemany', items=len(buffer)):
+        flush_buffer_to_db(con, buffer)
+
+def mark_near_dup(near_dups: Optional[NearDupIndex], title: str, content: str) -> bool:
+    """이미 적재한 섹션과 거의 같으면 True, 아니면 대표 섹션으로 등록"""
+    if near_dups is None: return False
+    sig = section_signature(title, content)
+    if sig is None: return False
+    if near_dups.find(sig) is not None: return True
+    near_dups.add(len(near_dups), sig)
+    return False
+
+def embed_sections(con: duckdb.DuckDBPyConnection, model: SentenceTransformer,
+                   sections: Iterable[Dict[str, Any]], profiler: IngestProfiler = NULL_PROFILER,
+                   near_dups: Optional[NearDupIndex] = None) -> int:
+    """섹션을 배치 임베딩하여 farm_info에 저장 (저장된 행 수 반환)"""
+    buffer_rows = []
+    batch_meta = []
+    stored = 0
+    
+    print("🔄 데이터 처리 및 임베딩 시작 (안전 모드)...")
+    
+    for meta in sections:
+        with profiler.stage('near_dup', items=1):
+            meta['near_dup'] = mark_near_dup(near_dups, meta['title'], meta['content'])
+        batch_meta.append(meta)
         
-        # BATCH_SIZE = 1 이므로 매번 실행됨
-        if len(batch_texts) >= BATCH_SIZE:
+        if len(batch_meta) >= BATCH_SIZE:
             try:
-                embeddings = model.encode(batch_texts, show_progress_bar=False, batch_size=BATCH_SIZE)
-                for meta, emb in zip(batch_meta, embeddings):
-                    buffer_rows.append((
-                        meta['year'], meta['month'], meta['title'],
-                        meta['tags']['crop'], meta['tags']['task'], meta['tags']['env'],
-                        meta['tags']['pest'], meta['tags']['admin'],
-                        meta['content'], emb.tolist()
-                    ))
+                buffer_rows.extend(_encode_batch(model, batch_meta, profiler))
             except Exception as e:
                 print(f"⚠️ 임베딩 오류: {e}")
             finally:
-                batch_texts = []
                 batch_meta = []
         
         if len(buffer_rows) >= DB_INSERT_BATCH:
-            flush_buffer_to_db(con, buffer_rows)
+            _flush(con, buffer_rows, profiler)
+            stored += len(buffer_rows)
             buffer_rows = []
             
         # [중요] 반복마다 메모리 청소
-        gc.collect()
+        with profiler.stage('gc'):
+            gc.collect()
 
-    if batch_texts:
-        embeddings = model.encode(batch_texts, show_progress_bar=False, batch_size=BATCH_SIZE)
-        for meta, emb in zip(batch_meta, embeddings):
-            buffer_rows.append((
-                meta['year'], meta['month'], meta['title'],
-                meta['tags']['crop'], meta['tags']['task'], meta['tags']['env'],
-                meta['tags']['pest'], meta['tags']['admin'],
-                meta['content'], emb.tolist()
-            ))
+    if batch_meta:
+        buffer_rows.extend(_encode_batch(model, batch_meta, profiler))
 
     if buffer_rows:
-        flush_buffer_to_db(con, buffer_rows)
+        _flush(con, buffer_rows, profiler)
+        stored += len(buffer_rows)
+
+    return stored
+
+# ==========================================
+# 변환 결과(md_to_json.py 의 JSONL/Parquet) 직접 적재
+# - 파싱은 md_to_json.py 한 곳에서만 (주차 x 분류 = 1행, 제목은 '# [주차] 분류')
+# - 메타/태그/임베딩용 텍스트는 DuckDB 에서 집합 연산으로 한 번에 계산 (staged_sections)
+# - 파이썬으로는 text 컬럼만 꺼내 인코딩하고, 임베딩은 n 으로 조인해 INSERT ... SELECT
+# ==========================================
+def _tag_sql(category: str, expr: str) -> str:
+    """extract_smart_tags_optimized 와 같은 규칙의 SQL (RE2 는 lookbehind 가 없어 1글자 태그는 경계를 직접 매칭)"""
+    items = []
+    for tag in TAG_SETS[category]:
+        lit = tag.replace("'", "''")
+        if len(tag) == 1:
+            pattern = f"(?:^|[^가-힣]){re.escape(tag)}{PARTICLES}(?:[^가-힣]|$)"
+            items.append(f"CASE WHEN regexp_matches({expr}, '{pattern}') THEN '{lit}' END")
+        else:
+            items.append(f"CASE WHEN contains({expr}, '{lit}') THEN '{lit}' END")
+    # list_distinct 가 NULL(미일치)을 버림
+    return f"list_sort(list_distinct([{', '.join(items)}]))"
+
+def _clean_sql(expr: str) -> str:
+    """clean_markdown 과 같은 치환을 SQL 로"""
+    for pattern in (r'\[.*?\]\(.*?\)', r'[\|\-]', r'[#*`>]', r'\s+'):
+        expr = f"regexp_replace({expr}, '{pattern}', ' ', 'g')"
+    return f"trim({expr})"
+
+def stage_converted(con: duckdb.DuckDBPyConnection, source_path: str) -> int:
+    src = source_path.replace("'", "''")
+    if source_path.endswith('.parquet'):
+        reader = f"read_parquet('{src}')"
+    else:
+        reader = f"read_json('{src}', format='newline_delimited', columns={CONVERTED_COLUMNS})"
+    tags = ",\n".join(f"{_tag_sql(category, 'search_range')} AS tags_{category}" for category in TAG_SETS)
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE staged_sections AS
+        WITH sections AS (
+            SELECT CAST(substr(id, 1, 4) AS INTEGER) AS year, month,
+                   '# [' || week_range || '] ' || sec.key AS title, sec.value AS content_md
+            FROM (SELECT id, month, week_range, unnest(map_entries(content)) AS sec FROM {reader})
+            WHERE sec.value IS NOT NULL AND trim(sec.value) <> ''
+        )
+        SELECT row_number() OVER (ORDER BY title) AS n, year, month, title, content_md,
+               {tags},
+               left({_clean_sql('title')} || '. ' || {_clean_sql('content_md')}, {MAX_TEXT_LENGTH}) AS text
+        FROM (SELECT *, title || ' ' || left(content_md, 1000) AS search_range FROM sections)
+    """)
+    return con.execute("SELECT count(*) FROM staged_sections").fetchone()[0]
+
+def insert_staged_embeddings(con: duckdb.DuckDBPyConnection, ns: List[int], embeddings: np.ndarray,
+                             dup_ns: List[int] = ()) -> None:
+    """ns 행은 임베딩과 함께, dup_ns 행(거의 같은 섹션)은 embedding NULL 로 n 순서대로 저장"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if pa is not None:
+        batch = pa.table({
+            'n': pa.array(ns, pa.int64()),
+            'embedding': pa.FixedSizeListArray.from_arrays(pa.array(embeddings.ravel()), embeddings.shape[1])
+        })
+        con.register('emb_batch', batch)
+    else:
+        con.execute(f"CREATE OR REPLACE TEMP TABLE emb_batch (n BIGINT, embedding FLOAT[{embeddings.shape[1]}])")
+        con.executemany("INSERT INTO emb_batch VALUES (?, ?)", [(n, e.tolist()) for n, e in zip(ns, embeddings)])
+    con.execute("""
+        INSERT INTO farm_info (year, month, title, tags_crop, tags_task, tags_env, tags_pest, tags_admin, content_md, embedding)
+        SELECT s.year, s.month, s.title, s.tags_crop, s.tags_task, s.tags_env, s.tags_pest, s.tags_admin, s.content_md, e.embedding
+        FROM staged_sections s LEFT JOIN emb_batch e ON e.n = s.n
+        WHERE e.n IS NOT NULL OR list_contains(?::BIGINT[], s.n)
+        ORDER BY s.n
+    """, [list(dup_ns)])
+    if pa is not None:
+        con.unregister('emb_batch')
+
+def embed_converted(con: duckdb.DuckDBPyConnection, model: SentenceTransformer, source_path: str,
+                    profiler: IngestProfiler = NULL_PROFILER, near_dups: Optional[NearDupIndex] = None) -> int:
+    with profiler.stage('stage_sql'):
+        total = stage_converted(con, source_path)
+    print(f"🔄 변환 결과 {total}개 섹션 임베딩 시작...")
+
+    stored = 0
+    for start in tqdm(range(0, total, CONVERTED_CHUNK)):
+        rows = con.execute("SELECT n, text, title, content_md FROM staged_sections WHERE n > ? AND n <= ? ORDER BY n",
+                           [start, start + CONVERTED_CHUNK]).fetchall()
+        with profiler.stage('near_dup', items=len(rows)):
+            dup_flags = [mark_near_dup(near_dups, r[2], r[3]) for r in rows]
+        ns = [r[0] for r, dup in zip(rows, dup_flags) if not dup]
+        dup_ns = [r[0] for r, dup in zip(rows, dup_flags) if dup]
+        texts = [r[1] for r, dup in zip(rows, dup_flags) if not dup]
+        embeddings = np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if texts:
+            tokens = count_tokens(model, texts) if profiler is not NULL_PROFILER else 0
+            profiler.batch(len(texts))
+            with profiler.stage('encode', items=len(texts), tokens=tokens):
+                embeddings = model.encode(texts, show_progress_bar=False, batch_size=BATCH_SIZE)
+        with profiler.stage('insert', items=len(rows)):
+            insert_staged_embeddings(con, ns, embeddings, dup_ns)
+        stored += len(rows)
+        del embeddings
+        gc.collect()
+
+    con.execute("DROP TABLE IF EXISTS staged_sections")
+    return stored
+
+def create_vector_index(con: duckdb.DuckDBPyConnection) -> None:
+    # [✅ 핵심 수정] 디스크 저장 허용 옵션 켜기
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    options = ", ".join(f"{k} = {v!r}" if isinstance(v, str) else f"{k} = {v}" for k, v in HNSW_PARAMS.items())
+    con.execute(f"CREATE INDEX IF NOT EXISTS vss_idx ON farm_info USING HNSW (embedding) WITH ({options});")
+
+def is_converted_source(path: str) -> bool:
+    return path.endswith(('.jsonl', '.parquet'))
+
+def build_database(md_file_path: str, db_path: Optional[str] = None, publish_after: bool = True,
+                   report: bool = True):
+    """md_file_path 가 .jsonl/.parquet 이면 md_to_json.py 변환 결과를 직접 적재, 아니면 weekly.md 원문 파싱"""
+    db_path = db_path or new_version_path()
+    profiler = IngestProfiler(source=md_file_path, db_path=db_path) if report else NULL_PROFILER
+    if report:
+        # 새 버전 파일은 비어 있으므로 '이전 크기'는 현재 공개된 DB 기준
+        profiler.db_bytes_before = file_size(resolve_db_path())
+
+    with profiler.stage('load_model'):
+        model = load_model()
+
+    con = duckdb.connect(db_path)
+    init_db(con, model.get_sentence_embedding_dimension())
+
+    # 적재 중 이미 본 섹션과 거의 같으면 인코딩 생략 (near_dup.py)
+    near_dups = NearDupIndex()
+    if is_converted_source(md_file_path):
+        try:
+            embed_converted(con, model, md_file_path, profiler, near_dups)
+        except duckdb.IOException as e:
+            print(f"❌ 파일을 읽을 수 없습니다: {e}")
+            con.close()
+            return
+    else:
+        try:
+            with profiler.stage('read'), open(md_file_path, 'r', encoding='utf-8') as f:
+                data = f.read()
+        except FileNotFoundError:
+            print(f"❌ 파일을 찾을 수 없습니다: {md_file_path}")
+            con.close()
+            return
+
+        embed_sections(con, model, parse_sections(data, profiler), profiler, near_dups)
+        del data
+
+    with profiler.stage('near_dups'):
+        n_dups = link_near_dups(con)
+    print(f"📑 거의 같은 섹션 {n_dups}개는 인코딩 생략 (대표 섹션 {len(near_dups)}개)")
+    # 화면용 본문/제목은 적재 시 한 번만 렌더링 (앱은 요청마다 가공하지 않음)
+    with profiler.stage('render_display'):
+        sync_display(con)
+    with profiler.stage('weather_extract'):
+        build_weather_series(con)
+    with profiler.stage('trend_cube'):
+        refresh_trend_cube(con, full=True)
+    with profiler.stage('related_docs'):
+        build_related_docs(con)
+    with profiler.stage('tag_centroids'):
+        build_tag_centroids(con)
+    with profiler.stage('suggest_terms'):
+        build_suggest_terms(con)
+    with profiler.stage('typo_vocab'):
+        build_typo_vocab(con)
+    with profiler.stage('sensor_rules'):
+        build_sensor_rules(con)
+    with profiler.stage('risk_index'):
+        build_risk_prototypes(con, model)   # 원형 문장 인코딩은 적재 시 한 번
+        refresh_risk_index(con, full=True)
 
     print("⏳ VSS 인덱스 생성 중... (HNSW)")
     try:
-        # [✅ 핵심 수정] 디스크 저장 허용 옵션 켜기
-        con.execute("SET hnsw_enable_experimental_persistence = true;")
-        
-        con.execute("CREATE INDEX IF NOT EXISTS vss_idx ON farm_info USING HNSW (embedding);")
-        print(f"🚀 성공: {DB_PATH} 생성 완료!")
+        with profiler.stage('hnsw_index'):
+            create_vector_index(con)
+        print(f"🚀 성공: {db_path} 생성 완료!")
     except Exception as e:
         print(f"❌ 인덱스 생성 실패: {e}")
 
+    with profiler.stage('checkpoint'):
+        con.execute("CHECKPOINT")
     con.close()
 
+    # [블루/그린] 파일을 닫은 뒤에만 공개 -> 앱은 완성된 파일만 보게 됨
+    if publish_after:
+        publish(db_path)   # 샤드를 쓰는 배포면 바뀐 연도 샤드도 다시 씀 (새 연도 = 새 파일)
+
+    if report:
+        profiler.print_summary()
+        print(f"📝 적재 보고서 저장: {profiler.save()}")
+
 if __name__ == "__main__":
-    build_database("weekly.md")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="주간농사정보 임베딩 DB 생성 (새 버전으로 만들고 공개)")
+    parser.add_argument('source', nargs='?', default="weekly.md",
+                        help="weekly.md 원문 또는 md_to_json.py 결과 (.jsonl / .parquet)")
+    parser.add_argument('--no-publish', action='store_true', help="만들기만 하고 공개하지 않음")
+    parser.add_argument('--no-report', action='store_true', help="적재 보고서 생략")
+    args = parser.parse_args()
+    build_database(args.source, publish_after=not args.no_publish, report=not args.no_report)
@@ -0,0 +1,276 @@
+import duckdb
+import numpy as np
+from datetime import datetime
+from typing import List, Tuple, Optional
+from perf_metrics import timed_query
+from content_render import RENDER_VERSION
+
+# ==========================================
+# 대시보드/검색 쿼리 (Streamlit 비의존)
+# - app_dashboard.py 와 벤치마크/부하테스트가 같은 코드 경로를 쓰도록 분리
+# ==========================================
+WEEK_LIST_SQL = """
+    SELECT DISTINCT regexp_extract(title, '\\[(.*?)\\]', 1) as week_range
+    FROM farm_info
+    WHERE year = ? AND month = ?
+    ORDER BY week_range
+"""
+
+ALL_CROPS_SQL = "SELECT DISTINCT unnest(tags_crop) FROM farm_info ORDER BY 1"
+
+# 브리핑 행: (year, title, content_md, tags_crop, w_range, clean_title, display_md, id)
+# clean_title/display_md 는 적재 시 렌더링된 farm_display (content_render.py) 에서 가져오고,
+# 표시 버전이 다르거나 없으면 NULL -> 앱이 그 자리에서 렌더링
+BRIEFING_WEEK_SQL = """
+    SELECT f.year, f.title, f.content_md, f.tags_crop, regexp_extract(f.title, '\\[(.*?)\\]', 1) as w_range,
+           {display_cols}, f.id
+    FROM farm_info f {display_join}
+    WHERE f.title LIKE ?
+    ORDER BY f.year DESC
+"""
+
+BRIEFING_MONTH_SQL = """
+    SELECT f.year, f.title, f.content_md, f.tags_crop, regexp_extract(f.title, '\\[(.*?)\\]', 1) as w_range,
+           {display_cols}, f.id
+    FROM farm_info f {display_join}
+    WHERE f.month = ?
+    AND f.content_md NOT LIKE '%목 차%'
+    ORDER BY f.year DESC
+"""
+
+# [HNSW] vss 인덱스는 'ORDER BY array_cosine_distance(컬럼, 상수) LIMIT k' 형태에서만 사용됨
+# (similarity 로 정렬하면 전체 스캔) -> 거리로 정렬하고 점수는 1 - 거리 (= 코사인 유사도)
+# 인덱스 사용 여부는 db_doctor.py 가 EXPLAIN 으로 확인
+# 검색 행: (year, month, title, content_md, score, clean_title, display_md, id)
+# farm_display 조인은 top-k 바깥에서 (조인이 안쪽에 있으면 HNSW 재작성이 안 됨)
+# 거의 같은 섹션(near_dup.py)은 embedding 이 NULL 이라 대표 행만 결과에 나옴
+SEARCH_SQL = """
+    SELECT f.year, f.month, f.title, f.content_md, f.score, {display_cols}, f.id
+    FROM (
+        SELECT id, year, month, title, content_md, 1 - array_cosine_distance(embedding, $1::FLOAT[768]) as score
+        FROM farm_info ORDER BY array_cosine_distance(embedding, $1::FLOAT[768]) LIMIT {limit}
+    ) f {display_join}
+    ORDER BY f.score DESC
+"""
+
+DISPLAY_COLS = f"""d.clean_title,
+           CASE WHEN d.render_version = {RENDER_VERSION} THEN d.display_md END as display_md"""
+DISPLAY_JOIN = "LEFT JOIN farm_display d ON d.id = f.id"
+NO_DISPLAY_COLS = "NULL as clean_title, NULL as display_md"
+
+def week_no_sql(date_expr: str) -> str:
+    """연도 안의 주차 번호 SQL (1월 1일부터 7일 단위, 1~53)
+    weekofyear 는 ISO 주차라 2024-12-30 이 1주, 2021-01-01 이 53주가 되어 연도별 x축/첫 주차가 어긋남"""
+    return f"((dayofyear({date_expr}) - 1) // 7 + 1)"
+
+def week_no(d) -> int:
+    """week_no_sql 과 같은 주차 번호 (date/datetime)"""
+    return (d.timetuple().tm_yday - 1) // 7 + 1
+
+# 기상 연도별 비교: (주차 번호, 연도, 값). weather_series 는 (metric, week_start) 순으로 저장됨 (weather_extract.py)
+WEATHER_YOY_SQL = f"""
+    SELECT {week_no_sql('week_start')} as week, year, round(avg(value), 1) as value
+    FROM weather_series
+    WHERE metric = ? AND (? IS NULL OR region = ?)
+    GROUP BY ALL
+    ORDER BY week, year
+"""
+
+WEATHER_REGIONS_SQL = "SELECT DISTINCT region FROM weather_series WHERE metric = ? ORDER BY 1"
+
+# 태그 트렌드: 미리 집계된 tag_trend 큐브만 읽음 (trend_cube.py)
+TREND_TOP_TAGS_SQL = """
+    SELECT tag, sum(mentions) as total FROM tag_trend WHERE tag_type = ?
+    GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT ?
+"""
+
+TREND_SEASONAL_SQL = """
+    SELECT week, tag, sum(mentions) as mentions
+    FROM tag_trend
+    WHERE tag_type = ? AND list_contains(?, tag)
+    GROUP BY ALL
+    ORDER BY week, tag
+"""
+
+TREND_FIRST_SQL = """
+    SELECT tag, year, min(first_week) as first_week
+    FROM tag_first_mention
+    WHERE tag_type = ? AND list_contains(?, tag)
+    GROUP BY ALL
+    ORDER BY tag, year
+"""
+
+# 피해/위험 지수: (주차 번호, 연도, 위험도 0~100, 주 피해 유형) (risk_index.py, crop 순 저장)
+RISK_SERIES_SQL = """
+    SELECT week, year, round(avg(risk), 1) as risk, mode(top_type) as top_type
+    FROM risk_series
+    WHERE crop = ?
+    GROUP BY week, year
+    ORDER BY week, year
+"""
+
+RISK_CROPS_SQL = "SELECT crop FROM risk_series GROUP BY 1 ORDER BY sum(n_docs) DESC"
+
+# 다른 연도 유사 문서: related_docs 간선 테이블 조회 1번 (related_docs.py, src_id 순 저장 + 인덱스)
+# 행: (연도, 주차, 제목, 유사도)
+RELATED_SQL = """
+    SELECT dst_year, dst_week, dst_title, score
+    FROM related_docs
+    WHERE src_id = ?
+    ORDER BY dst_year DESC, rank
+"""
+
+# 검색 결과 대표 행과 거의 같은 다른 주차: (연도, 주차, 유사도) (near_dup.py, canonical_id 순 저장 + 인덱스)
+NEAR_DUPS_SQL = """
+    SELECT f.year, regexp_extract(f.title, '\\[(.*?)\\]', 1) as week_range, n.similarity
+    FROM near_dups n JOIN farm_info f ON f.id = n.id
+    WHERE n.canonical_id = ?
+    ORDER BY f.year DESC, f.id DESC
+"""
+
+# 엣지 번들(vectors='npy')의 검색: numpy 로 고른 상위 id 의 행만 조회 (edge_bundle.py)
+SEARCH_BY_IDS_SQL = """
+    SELECT f.year, f.month, f.title, f.content_md, s.score, {display_cols}, f.id
+    FROM (SELECT unnest($1::INTEGER[]) as id, unnest($2::DOUBLE[]) as score) s
+    JOIN farm_info f ON f.id = s.id {display_join}
+    ORDER BY s.score DESC
+"""
+
+SEARCH_LIMIT = 10
+MIN_SCORE = 0.40
+
+
+def has_table(con: duckdb.DuckDBPyConnection, name: str) -> bool:
+    """적재 시 만드는 보조 테이블 존재 여부 (이전 버전 DB 호환용)
+    카탈로그 조회라 매번 물어도 싸고, 연결 단위로 캐시하면 닫힌 연결의 id() 를 재사용한 새 연결이 예전 답을 받음"""
+    return con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [name]).fetchone()[0] > 0
+
+def display_sql(con: duckdb.DuckDBPyConnection, sql: str, **kwargs) -> str:
+    """farm_display 가 없는 이전 버전 DB 에서도 같은 행 모양이 나오도록 SQL 완성"""
+    if has_table(con, 'farm_display'):
+        return sql.format(display_cols=DISPLAY_COLS, display_join=DISPLAY_JOIN, **kwargs)
+    return sql.format(display_cols=NO_DISPLAY_COLS, display_join="", **kwargs)
+
+def fetch_week_list(con: duckdb.DuckDBPyConnection, year: int, month: int) -> List[str]:
+    return [row[0] for row in timed_query(con, 'week_list', WEEK_LIST_SQL, [int(year), int(month)]) if row[0]]
+
+def fetch_all_crops(con: duckdb.DuckDBPyConnection) -> List[str]:
+    return [r[0] for r in timed_query(con, 'all_crops', ALL_CROPS_SQL) if r[0]]
+
+def fetch_briefing_rows(con: duckdb.DuckDBPyConnection, week_range: Optional[str], month: int) -> List[Tuple]:
+    """주차를 골랐으면 해당 주차, 아니면 같은 달 전체 (목차 제외)"""
+    if week_range:
+        return timed_query(con, 'briefing_week', display_sql(con, BRIEFING_WEEK_SQL), [f'%{week_range}%'])
+    return timed_query(con, 'briefing_month', display_sql(con, BRIEFING_MONTH_SQL), [month])
+
+def fetch_weather_yoy(con: duckdb.DuckDBPyConnection, metric: str, region: Optional[str] = None) -> List[Tuple]:
+    if not has_table(con, 'weather_series'): return []
+    return timed_query(con, 'weather_yoy', WEATHER_YOY_SQL, [metric, region, region])
+
+def fetch_weather_regions(con: duckdb.DuckDBPyConnection, metric: str) -> List[str]:
+    if not has_table(con, 'weather_series'): return []
+    return [r[0] for r in timed_query(con, 'weather_regions', WEATHER_REGIONS_SQL, [metric])]
+
+def fetch_trend_top_tags(con: duckdb.DuckDBPyConnection, tag_type: str, limit: int = 30) -> List[str]:
+    if not has_table(con, 'tag_trend'): return []
+    return [r[0] for r in timed_query(con, 'trend_top_tags', TREND_TOP_TAGS_SQL, [tag_type, limit])]
+
+def fetch_trend_seasonal(con: duckdb.DuckDBPyConnection, tag_type: str, tags: List[str]) -> List[Tuple]:
+    """(주차 번호, 태그, 전체 연도 합계 언급 수)"""
+    if not tags or not has_table(con, 'tag_trend'): return []
+    return timed_query(con, 'trend_seasonal', TREND_SEASONAL_SQL, [tag_type, list(tags)])
+
+def fetch_trend_first_mentions(con: duckdb.DuckDBPyConnection, tag_type: str, tags: List[str]) -> List[Tuple]:
+    """(태그, 연도, 첫 언급 주차 번호)"""
+    if not tags or not has_table(con, 'tag_trend'): return []
+    return timed_query(con, 'trend_first', TREND_FIRST_SQL, [tag_type, list(tags)])
+
+def fetch_risk_series(con: duckdb.DuckDBPyConnection, crop: str) -> List[Tuple]:
+    if not has_table(con, 'risk_series'): return []
+    return timed_query(con, 'risk_series', RISK_SERIES_SQL, [crop])
+
+def fetch_risk_crops(con: duckdb.DuckDBPyConnection) -> List[str]:
+    if not has_table(con, 'risk_series'): return []
+    return [r[0] for r in timed_query(con, 'risk_crops', RISK_CROPS_SQL)]
+
+def fetch_related(con: duckdb.DuckDBPyConnection, doc_id: int) -> List[Tuple]:
+    if not has_table(con, 'related_docs'): return []
+    return timed_query(con, 'related', RELATED_SQL, [int(doc_id)])
+
+def fetch_near_dups(con: duckdb.DuckDBPyConnection, doc_id: int) -> List[Tuple]:
+    if not has_table(con, 'near_dups'): return []
+    return timed_query(con, 'near_dups', NEAR_DUPS_SQL, [int(doc_id)])
+
+def filter_by_crops(rows: List[Tuple], crops: List[str]) -> List[Tuple]:
+    # 선택하지 않았다면(비어있으면) -> 전체 데이터 표시 (All)
+    if not crops: return rows
+    return [r for r in rows if any(crop in (r[3] or []) for crop in crops)]
+
+def organize_items_smartly(items, target_date_obj):
+    if not items: return []
+
+    weeks_group = {}
+    for item in items:
+        w_range = item[4]
+        if not w_range: continue
+        if w_range not in weeks_group: weeks_group[w_range] = []
+        weeks_group[w_range].append(item)
+
+    if not weeks_group: return []
+
+    best_week = None
+    min_diff_days = 9999
+
+    for w_str in weeks_group.keys():
+        try:
+            start_str = w_str.split('~')[0]
+            w_date = datetime.strptime(start_str, "%Y-%m-%d")
+            w_date_adj = w_date.replace(year=target_date_obj.year)
+
+            diff = abs((target_date_obj - w_date_adj).days)
+            if diff < min_diff_days:
+                min_diff_days = diff
+                best_week = w_str
+        except:
+            continue
+
+    if not best_week:
+        best_week = list(weeks_group.keys())[0]
+
+    target_items = weeks_group[best_week]
+
+    summary_list = []
+    weather_list = []
+    others_list = []
+
+    for item in target_items:
+        title = item[1]
+        if '요약' in title or '요 약' in title:
+            summary_list.append(item)
+        elif '기상' in title:
+            weather_list.append(item)
+        else:
+            others_list.append(item)
+
+    final_list = summary_list[:1] + weather_list[:1] + others_list
+    return final_list[:4]
+
+def search_documents(con: duckdb.DuckDBPyConnection, query_vector: List[float],
+                     limit: int = SEARCH_LIMIT, min_score: float = MIN_SCORE) -> List[Tuple]:
+    results = timed_query(con, 'search', display_sql(con, SEARCH_SQL, limit=int(limit)), [query_vector])
+    return [r for r in results if r[4] is not None and r[4] >= min_score]
+
+def search_vectors(con: duckdb.DuckDBPyConnection, ids: np.ndarray, matrix: np.ndarray, query_vector: List[float],
+                   limit: int = SEARCH_LIMIT, min_score: float = MIN_SCORE) -> List[Tuple]:
+    """정규화된 벡터 행렬(fp16 가능)에서 상위 k -> search_documents 와 같은 행 모양"""
+    q = np.asarray(query_vector, dtype=np.float32)
+    q /= max(np.linalg.norm(q), 1e-12)
+    scores = matrix @ q.astype(matrix.dtype)
+    k = min(int(limit), len(scores))
+    if k == 0: return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[scores[top] >= min_score]
+    if len(top) == 0: return []
+    return timed_query(con, 'search', display_sql(con, SEARCH_BY_IDS_SQL),
+                       [ids[top].tolist(), scores[top].astype(np.float64).tolist()])
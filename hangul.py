@@ -0,0 +1,42 @@
+from typing import List
+
+# ==========================================
+# 한글 자모 분해 (입력 중 검색어 매칭용)
+# - '곷' (고추를 치는 중) / '달' (닭을 치는 중) 처럼 조합 중인 글자도 접두어로 맞도록
+#   음절을 초성/중성/종성 호환 자모로 풀고, 겹받침/겹모음은 입력 순서대로 한 번 더 나눔
+# ==========================================
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+
+CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+
+# 두 번 눌러 만드는 겹자모 -> 키 입력 순서
+COMPOUND = {
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ', 'ㄽ': 'ㄹㅅ',
+    'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+}
+
+
+def decompose(text: str) -> str:
+    """'닭 고추' -> 'ㄷㅏㄹㄱ ㄱㅗㅊㅜ' (한글 외 문자는 소문자로 그대로)"""
+    out: List[str] = []
+    for ch in text.lower():
+        code = ord(ch)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            code -= HANGUL_BASE
+            cho, rest = divmod(code, 21 * 28)
+            jung, jong = divmod(rest, 28)
+            out.append(CHO[cho])
+            out.append(COMPOUND.get(JUNG[jung], JUNG[jung]))
+            if jong:
+                out.append(COMPOUND.get(JONG[jong], JONG[jong]))
+        else:
+            out.append(COMPOUND.get(ch, ch))
+    return "".join(out)
+
+def normalize_query(text: str) -> str:
+    """공백 정리 (제안어 키/검색어 로그 집계 공용)"""
+    return " ".join(text.split())
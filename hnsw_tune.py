@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import time
+import random
+import argparse
+import duckdb
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Any, Tuple
+from db_publish import resolve_db_path
+
+# [설정] HNSW 파라미터 튜닝 하네스
+# - 정답: 인덱스 없는 상태에서 array_cosine_similarity 정확 검색 top-k
+# - 후보: M x ef_construction 별로 vss_idx를 새로 만들고, ef_search를 바꿔가며 같은 질의 재생
+# - 질의: 앱 검색 로그(QUERY_LOG) + 인덱스에서 제외(hold-out)한 문서 제목
+MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+QUERY_LOG = os.path.join("logs", "query_log.jsonl")
+
+DEFAULT_M = [8, 16, 32]
+DEFAULT_EF_CONSTRUCTION = [64, 128, 256]
+DEFAULT_EF_SEARCH = [16, 64, 128]
+TOP_K = 10
+HOLDOUT_TITLES = 200
+MAX_LOGGED_QUERIES = 300
+SEED = 42
+
+
+def parse_grid(text: str) -> List[int]:
+    return [int(v) for v in text.split(',') if v.strip()]
+
+def load_logged_queries(limit: int) -> List[str]:
+    if not os.path.exists(QUERY_LOG): return []
+    seen = []
+    with open(QUERY_LOG, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                q = json.loads(line).get('query', '').strip()
+            except json.JSONDecodeError:
+                continue
+            if q and q not in seen: seen.append(q)
+    return seen[-limit:]
+
+def percentile(values: List[float], p: float) -> float:
+    return float(np.percentile(values, p)) if values else 0.0
+
+
+# ==========================================
+# 1. 작업용 복사본 준비 (원본 DB는 읽기만)
+# ==========================================
+def prepare_workspace(db_path: str, holdout: int) -> Tuple[duckdb.DuckDBPyConnection, int, List[str]]:
+    con = duckdb.connect()  # 메모리 DB에서 변형 인덱스를 만들었다 지웠다 반복
+    con.execute("LOAD vss;")
+    safe_path = db_path.replace("'", "''")
+    con.execute(f"ATTACH '{safe_path}' AS src (READ_ONLY)")
+    con.execute("CREATE TABLE docs AS SELECT id, title, embedding FROM src.farm_info WHERE embedding IS NOT NULL")
+    con.execute("DETACH src")
+
+    dim = con.execute("SELECT len(embedding) FROM docs LIMIT 1").fetchone()[0]
+
+    # 제목 hold-out: 해당 문서를 인덱스에서 빼야 '자기 자신 찾기'가 되지 않음
+    rng = random.Random(SEED)
+    ids = [r[0] for r in con.execute("SELECT id FROM docs ORDER BY id").fetchall()]
+    held = rng.sample(ids, min(holdout, len(ids) // 10))
+    titles = []
+    if held:
+        rows = con.execute("SELECT title FROM docs WHERE id IN (SELECT unnest(?::INTEGER[]))", [held]).fetchall()
+        titles = [re.sub(r'^#\s*\[.*?\]\s*', '', r[0]).strip() for r in rows]
+        con.execute("DELETE FROM docs WHERE id IN (SELECT unnest(?::INTEGER[]))", [held])
+    return con, dim, [t for t in titles if t]
+
+def exact_topk(con: duckdb.DuckDBPyConnection, vectors: np.ndarray, dim: int, k: int) -> Tuple[List[set], List[float]]:
+    sql = f"""
+        SELECT id FROM docs
+        ORDER BY array_cosine_similarity(embedding, ?::FLOAT[{dim}]) DESC LIMIT {k}
+    """
+    truth, latencies = [], []
+    for vec in vectors:
+        t0 = time.perf_counter()
+        ids = {r[0] for r in con.execute(sql, [vec.tolist()]).fetchall()}
+        latencies.append(time.perf_counter() - t0)
+        truth.append(ids)
+    return truth, latencies
+
+
+# ==========================================
+# 2. 변형 인덱스 빌드 + 재생
+# ==========================================
+def build_variant(con: duckdb.DuckDBPyConnection, m: int, ef_construction: int) -> Dict[str, Any]:
+    con.execute("DROP INDEX IF EXISTS vss_idx")
+    t0 = time.perf_counter()
+    con.execute(f"""
+        CREATE INDEX vss_idx ON docs USING HNSW (embedding)
+        WITH (metric = 'cosine', M = {m}, ef_construction = {ef_construction})
+    """)
+    build_seconds = time.perf_counter() - t0
+    try:
+        size = con.execute("SELECT approx_memory_usage FROM pragma_hnsw_index_info() WHERE index_name = 'vss_idx'").fetchone()[0]
+    except duckdb.Error:
+        size = None
+    return {'build_seconds': build_seconds, 'index_bytes': size}
+
+def replay(con: duckdb.DuckDBPyConnection, vectors: np.ndarray, truth: List[set], dim: int, k: int) -> Dict[str, Any]:
+    # 운영 쿼리와 같은 형태 (ORDER BY array_cosine_distance ... LIMIT) 여야 인덱스가 사용됨
+    sql = f"""
+        SELECT id FROM docs
+        ORDER BY array_cosine_distance(embedding, ?::FLOAT[{dim}]) LIMIT {k}
+    """
+    plan = con.execute("EXPLAIN " + sql, [vectors[0].tolist()]).fetchall()
+    uses_index = any('HNSW_INDEX_SCAN' in row[1] for row in plan)
+
+    latencies, recalls = [], []
+    for vec, expected in zip(vectors, truth):
+        t0 = time.perf_counter()
+        found = {r[0] for r in con.execute(sql, [vec.tolist()]).fetchall()}
+        latencies.append(time.perf_counter() - t0)
+        recalls.append(len(found & expected) / max(len(expected), 1))
+    return {
+        'recall': float(np.mean(recalls)) if recalls else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+        'uses_index': uses_index
+    }
+
+
+def print_table(rows: List[Dict[str, Any]], k: int) -> None:
+    header = f"{'M':>4} {'ef_c':>5} {'ef_s':>5} | {f'recall@{k}':>9} {'p50(ms)':>8} {'p95(ms)':>8} | {'build(s)':>8} {'size(MB)':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        size = f"{r['index_bytes'] / 1024 / 1024:8.1f}" if r.get('index_bytes') else f"{'-':>8}"
+        flag = "" if r.get('uses_index', True) else "  ⚠️ 인덱스 미사용"
+        print(f"{r['M']!s:>4} {r['ef_construction']!s:>5} {r['ef_search']!s:>5} | "
+              f"{r['recall']:9.3f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} | "
+              f"{r['build_seconds']:8.2f} {size}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW(M, ef_construction, ef_search) 튜닝 벤치마크")
+    parser.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    parser.add_argument('--m', type=parse_grid, default=DEFAULT_M)
+    parser.add_argument('--ef-construction', type=parse_grid, default=DEFAULT_EF_CONSTRUCTION)
+    parser.add_argument('--ef-search', type=parse_grid, default=DEFAULT_EF_SEARCH)
+    parser.add_argument('-k', '--top-k', type=int, default=TOP_K)
+    parser.add_argument('--holdout', type=int, default=HOLDOUT_TITLES)
+    parser.add_argument('--out', default=None, help="결과 저장 (.json 또는 .csv)")
+    args = parser.parse_args()
+
+    db_path = args.db or resolve_db_path()
+    print(f"📂 원본: {db_path}")
+    con, dim, titles = prepare_workspace(db_path, args.holdout)
+    logged = load_logged_queries(MAX_LOGGED_QUERIES)
+    queries = logged + titles
+    if not queries:
+        print("❌ 재생할 질의가 없습니다.")
+        return
+    print(f"❓ 질의 {len(queries)}건 (검색 로그 {len(logged)} + hold-out 제목 {len(titles)})")
+
+    model = SentenceTransformer(MODEL_NAME, device='cpu')
+    vectors = model.encode(queries, batch_size=64, show_progress_bar=False, convert_to_numpy=True)
+
+    print("🎯 정답 계산 중 (정확 검색)...")
+    truth, exact_lat = exact_topk(con, vectors, dim, args.top_k)
+    rows = [{
+        'M': 'exact', 'ef_construction': '-', 'ef_search': '-', 'recall': 1.0,
+        'p50_ms': percentile(exact_lat, 50) * 1000, 'p95_ms': percentile(exact_lat, 95) * 1000,
+        'build_seconds': 0.0, 'index_bytes': None
+    }]
+
+    for m in args.m:
+        for ef_c in args.ef_construction:
+            print(f"⏳ 인덱스 빌드: M={m}, ef_construction={ef_c}")
+            built = build_variant(con, m, ef_c)
+            for ef_s in args.ef_search:
+                con.execute(f"SET hnsw_ef_search = {ef_s}")
+                result = replay(con, vectors, truth, dim, args.top_k)
+                rows.append({'M': m, 'ef_construction': ef_c, 'ef_search': ef_s, **built, **result})
+    con.close()
+
+    print()
+    print_table(rows, args.top_k)
+
+    if args.out:
+        if args.out.endswith('.csv'):
+            keys = ['M', 'ef_construction', 'ef_search', 'recall', 'p50_ms', 'p95_ms', 'build_seconds', 'index_bytes', 'uses_index']
+            with open(args.out, 'w', encoding='utf-8') as f:
+                f.write(",".join(keys) + "\n")
+                for r in rows:
+                    f.write(",".join("" if r.get(k) is None else str(r.get(k)) for k in keys) + "\n")
+        else:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump({'db': db_path, 'top_k': args.top_k, 'queries': len(queries), 'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"💾 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import re
+import time
+import argparse
+import duckdb
+from typing import Dict, List, Any, Iterable, Tuple
+from db_publish import resolve_db_path, clone_current, publish
+import embed
+from content_render import sync_display
+from weather_extract import build_weather_series
+from trend_cube import refresh_trend_cube
+from related_docs import build_related_docs
+from auto_tagger import build_tag_centroids
+from suggest_index import build_suggest_terms
+from typo_index import build_typo_vocab
+from sensor_rules import build_sensor_rules
+from risk_index import refresh_risk_index
+from near_dup import seed_index, link_near_dups, promote_before_delete
+
+# [설정] HNSW 증분 유지보수
+# - 새 주차는 기존 vss_idx에 그대로 INSERT (DuckDB가 인덱스를 증분 갱신)
+# - 삭제/재게시된 주차는 인덱스에 묘비(tombstone)로 남으므로 개수를 직접 추적
+# - 묘비 비율이 임계값을 넘을 때만 PRAGMA hnsw_compact_index (또는 --rebuild 시 재생성)
+# - 모든 작업은 현재 공개 버전의 복사본에서 수행하고 끝나면 공개 (검색 중단 없음)
+INDEX_NAME = 'vss_idx'
+TOMBSTONE_THRESHOLD = 0.20
+
+
+def open_for_maintenance(db_path: str) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(db_path)
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS index_maint_state (
+            index_name VARCHAR PRIMARY KEY,
+            tombstones BIGINT, last_compacted TIMESTAMP
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS index_maint_log (
+            ts TIMESTAMP DEFAULT current_timestamp, action VARCHAR,
+            inserted BIGINT, deleted BIGINT, tombstones BIGINT, live_rows BIGINT,
+            seconds DOUBLE, index_seconds DOUBLE, index_bytes BIGINT, file_bytes BIGINT
+        )
+    """)
+    con.execute("INSERT OR IGNORE INTO index_maint_state VALUES (?, 0, NULL)", [INDEX_NAME])
+    return con
+
+def has_index(con: duckdb.DuckDBPyConnection) -> bool:
+    return con.execute(
+        "SELECT COUNT(*) FROM duckdb_indexes() WHERE index_name = ?", [INDEX_NAME]
+    ).fetchone()[0] > 0
+
+def index_info(con: duckdb.DuckDBPyConnection) -> Dict[str, Any]:
+    """vss가 제공하는 인덱스 통계 (지원하지 않는 버전이면 빈 dict)"""
+    try:
+        cur = con.execute("SELECT * FROM pragma_hnsw_index_info() WHERE index_name = ?", [INDEX_NAME])
+        row = cur.fetchone()
+        if not row: return {}
+        return dict(zip([d[0] for d in cur.description], row))
+    except duckdb.Error:
+        return {}
+
+def tombstone_stats(con: duckdb.DuckDBPyConnection) -> Tuple[int, int, float]:
+    tombstones = con.execute(
+        "SELECT tombstones FROM index_maint_state WHERE index_name = ?", [INDEX_NAME]
+    ).fetchone()[0]
+    live = con.execute("SELECT COUNT(embedding) FROM farm_info").fetchone()[0]
+    ratio = tombstones / (live + tombstones) if (live + tombstones) else 0.0
+    return tombstones, live, ratio
+
+def add_tombstones(con: duckdb.DuckDBPyConnection, n: int) -> None:
+    con.execute("UPDATE index_maint_state SET tombstones = tombstones + ? WHERE index_name = ?", [n, INDEX_NAME])
+
+
+# ==========================================
+# 1. 증분 작업
+# ==========================================
+def delete_weeks(con: duckdb.DuckDBPyConnection, week_ranges: Iterable[str]) -> int:
+    weeks = sorted(set(week_ranges))
+    if not weeks: return 0
+    # 남는 중복 행의 대표가 삭제되면 임베딩을 넘겨받음 (NULL 임베딩 행은 인덱스에 없으므로 묘비 아님)
+    promote_before_delete(con, weeks)
+    deleted, tombstones = con.execute("""
+        SELECT COUNT(*), COUNT(embedding) FROM farm_info
+        WHERE regexp_extract(title, '\\[(.*?)\\]', 1) IN (SELECT unnest(?::VARCHAR[]))
+    """, [weeks]).fetchone()
+    if deleted:
+        con.execute("""
+            DELETE FROM farm_info
+            WHERE regexp_extract(title, '\\[(.*?)\\]', 1) IN (SELECT unnest(?::VARCHAR[]))
+        """, [weeks])
+        add_tombstones(con, tombstones)
+    return deleted
+
+def append_sections(con: duckdb.DuckDBPyConnection, sections: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """같은 주차가 이미 있으면 교체(삭제 후 삽입), 새 벡터는 기존 인덱스에 증분 삽입"""
+    weeks = set()
+    for meta in sections:
+        m = re.search(r'\[(.*?)\]', meta['title'])
+        if m: weeks.add(m.group(1))
+    deleted = delete_weeks(con, weeks)
+
+    model = embed.load_model()
+    inserted = embed.embed_sections(con, model, sections, near_dups=seed_index(con))
+    if not has_index(con):
+        embed.create_vector_index(con)
+    return inserted, deleted
+
+def compact(con: duckdb.DuckDBPyConnection, rebuild: bool = False) -> float:
+    t0 = time.perf_counter()
+    if rebuild or not has_index(con):
+        con.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+        embed.create_vector_index(con)
+    else:
+        con.execute(f"PRAGMA hnsw_compact_index('{INDEX_NAME}')")
+    con.execute("UPDATE index_maint_state SET tombstones = 0, last_compacted = current_timestamp WHERE index_name = ?", [INDEX_NAME])
+    return time.perf_counter() - t0
+
+def maybe_compact(con: duckdb.DuckDBPyConnection, threshold: float, force: bool = False, rebuild: bool = False) -> float:
+    _, _, ratio = tombstone_stats(con)
+    if not force and ratio < threshold:
+        print(f"🧹 묘비 비율 {ratio:.1%} < 임계값 {threshold:.0%} -> 압축 생략")
+        return 0.0
+    print(f"🧹 묘비 비율 {ratio:.1%} -> {'재생성' if rebuild else '압축'} 실행")
+    return compact(con, rebuild)
+
+
+# ==========================================
+# 2. 보고
+# ==========================================
+def log_and_report(con: duckdb.DuckDBPyConnection, db_path: str, action: str,
+                   inserted: int, deleted: int, seconds: float, index_seconds: float) -> None:
+    con.execute("CHECKPOINT")
+    tombstones, live, ratio = tombstone_stats(con)
+    info = index_info(con)
+    index_bytes = info.get('approx_memory_usage')
+    file_bytes = os.path.getsize(db_path)
+    con.execute("""
+        INSERT INTO index_maint_log (action, inserted, deleted, tombstones, live_rows, seconds, index_seconds, index_bytes, file_bytes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [action, inserted, deleted, tombstones, live, seconds, index_seconds, index_bytes, file_bytes])
+
+    print(f"📊 [{action}] 삽입 {inserted} / 삭제 {deleted} / 소요 {seconds:.2f}s (인덱스 압축/생성 {index_seconds:.2f}s)")
+    print(f"   -> 살아있는 벡터 {live}, 묘비 {tombstones} ({ratio:.1%})")
+    if info:
+        print(f"   -> 인덱스 {info.get('count')}개 노드, 약 {(index_bytes or 0) / 1024 / 1024:.1f} MB")
+    print(f"   -> DB 파일 {file_bytes / 1024 / 1024:.1f} MB ({db_path})")
+
+def print_status(db_path: str) -> None:
+    con = duckdb.connect(db_path, read_only=True)
+    con.execute("LOAD vss;")
+    try:
+        tombstones, _, _ = tombstone_stats(con)
+    except duckdb.Error:
+        tombstones = 0  # 유지보수 이력이 없는 파일
+    live = con.execute("SELECT COUNT(embedding) FROM farm_info").fetchone()[0]
+    ratio = tombstones / (live + tombstones) if (live + tombstones) else 0.0
+    info = index_info(con)
+    print(f"📦 {db_path} ({os.path.getsize(db_path) / 1024 / 1024:.1f} MB)")
+    print(f"   -> 살아있는 벡터 {live}, 묘비 {tombstones} ({ratio:.1%}), 임계값 {TOMBSTONE_THRESHOLD:.0%}")
+    for k, v in info.items():
+        print(f"   -> {k}: {v}")
+    try:
+        for row in con.execute("SELECT ts, action, inserted, deleted, seconds FROM index_maint_log ORDER BY ts DESC LIMIT 5").fetchall():
+            print(f"   · {row[0]:%Y-%m-%d %H:%M} {row[1]} +{row[2]} -{row[3]} ({row[4]:.2f}s)")
+    except duckdb.Error:
+        pass
+    con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW 인덱스 증분 유지보수")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p_append = sub.add_parser('append', help="주간 마크다운을 기존 DB/인덱스에 추가 (같은 주차는 교체)")
+    p_append.add_argument('md_file')
+    p_delete = sub.add_parser('delete', help="주차 삭제 (예: 2024-01-01~2024-01-07)")
+    p_delete.add_argument('weeks', nargs='+')
+    p_compact = sub.add_parser('compact', help="묘비 비율이 임계값 이상이면 압축")
+    p_compact.add_argument('--force', action='store_true')
+    sub.add_parser('status')
+
+    for p in (p_append, p_delete, p_compact):
+        p.add_argument('--threshold', type=float, default=TOMBSTONE_THRESHOLD)
+        p.add_argument('--rebuild', action='store_true', help="압축 대신 인덱스를 새로 생성")
+    args = parser.parse_args()
+
+    if args.cmd == 'status':
+        print_status(resolve_db_path())
+        return
+
+    db_path = clone_current()
+    con = open_for_maintenance(db_path)
+    inserted = deleted = 0
+    index_seconds = 0.0
+    t0 = time.perf_counter()
+
+    if args.cmd == 'append':
+        with open(args.md_file, 'r', encoding='utf-8') as f:
+            sections = list(embed.parse_sections(f.read()))
+        inserted, deleted = append_sections(con, sections)
+        index_seconds = maybe_compact(con, args.threshold, rebuild=args.rebuild)
+    elif args.cmd == 'delete':
+        deleted = delete_weeks(con, args.weeks)
+        index_seconds = maybe_compact(con, args.threshold, rebuild=args.rebuild)
+    elif args.cmd == 'compact':
+        index_seconds = maybe_compact(con, args.threshold, force=args.force, rebuild=args.rebuild)
+
+    if args.cmd in ('append', 'delete'):
+        link_near_dups(con)   # NULL 임베딩 행 -> 대표 행 재연결
+        sync_display(con)   # 새 행 렌더링 + 삭제된 행 정리
+        build_weather_series(con)
+        refresh_trend_cube(con)   # 바뀐 주차만 재집계
+        build_related_docs(con)   # 새 주차가 기존 문서의 이웃이 될 수 있으므로 전체 재계산
+        build_tag_centroids(con)
+        build_suggest_terms(con)
+        build_typo_vocab(con)
+        build_sensor_rules(con)
+        refresh_risk_index(con)   # 저장된 원형 벡터로 바뀐 주차만 재계산
+    log_and_report(con, db_path, args.cmd, inserted, deleted, time.perf_counter() - t0, index_seconds)
+    con.close()
+    publish(db_path)   # 샤드를 쓰는 배포면 바뀐 연도 샤드만 다시 씀
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import platform
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource  # 유닉스 전용 (peak RSS)
+except ImportError:
+    resource = None
+
+# ==========================================
+# 적재 실행 보고서
+# - 단계별 wall/CPU 시간, items/sec, tokens/sec, peak RSS, 인코딩 배치 크기 이력,
+#   DB 파일 크기(전/후), 인덱스 생성 시간
+# - ingest_reports/ 에 실행별 JSON + history.jsonl 에 요약 누적 (데이터 증가에 따른 추이 비교)
+# ==========================================
+REPORT_DIR = "ingest_reports"
+HISTORY_FILE = os.path.join(REPORT_DIR, "history.jsonl")
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 리눅스는 KB, macOS 는 byte 단위
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def file_size(path: Optional[str]) -> int:
+    if not path: return 0
+    total = 0
+    for p in (path, path + ".wal"):
+        if os.path.exists(p): total += os.path.getsize(p)
+    return total
+
+def stored_rows(report: Dict[str, Any]) -> int:
+    # 텍스트 경로는 executemany, 변환 결과(JSONL/Parquet) 경로는 insert 단계에서 저장
+    return sum(report['stages'].get(name, {}).get('items', 0) for name in ('executemany', 'insert'))
+
+def count_tokens(model, texts: List[str]) -> int:
+    """모델 토크나이저 기준 토큰 수 (토크나이저가 없으면 글자 수)"""
+    try:
+        features = model.tokenize(texts)
+        return int(features['attention_mask'].sum())
+    except Exception:
+        return sum(len(t) for t in texts)
+
+
+class IngestProfiler:
+    def __init__(self, source: str = "", db_path: str = ""):
+        self.source = source
+        self.db_path = db_path
+        self.started = datetime.now()
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.batch_sizes: List[List[int]] = []   # [크기, 연속 횟수] (run-length)
+        self.db_bytes_before = file_size(db_path)
+        self.extra: Dict[str, Any] = {}
+
+    def _stage(self, name: str) -> Dict[str, float]:
+        if name not in self.stages:
+            self.stages[name] = {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0, 'items': 0, 'tokens': 0, 'errors': 0}
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, tokens: int = 0):
+        st = self._stage(name)
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield st
+        except BaseException:
+            st['errors'] += 1   # 실패한 단계의 시간은 성공한 작업 시간으로 보고하지 않음
+            raise
+        finally:
+            st['wall_s'] += time.perf_counter() - w0
+            st['cpu_s'] += time.process_time() - c0
+            st['calls'] += 1
+            st['items'] += items
+            st['tokens'] += tokens
+
+    def batch(self, size: int) -> None:
+        if self.batch_sizes and self.batch_sizes[-1][0] == size:
+            self.batch_sizes[-1][1] += 1
+        else:
+            self.batch_sizes.append([size, 1])
+
+    # ------------------------------------------
+    def report(self) -> Dict[str, Any]:
+        stages = {}
+        for name, st in self.stages.items():
+            wall = st['wall_s']
+            stages[name] = {
+                **st,
+                'items_per_s': st['items'] / wall if wall and st['items'] else None,
+                'tokens_per_s': st['tokens'] / wall if wall and st['tokens'] else None,
+            }
+        index = self.stages.get('hnsw_index')
+        index_ok = bool(index) and index['errors'] == 0
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'source': self.source, 'db_path': self.db_path,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'total_wall_s': time.perf_counter() - self.t0,
+            'total_cpu_s': time.process_time(),
+            'peak_rss_mb': peak_rss_mb(),
+            'db_bytes_before': self.db_bytes_before, 'db_bytes_after': file_size(self.db_path),
+            'index_ok': index_ok,
+            'index_build_s': index['wall_s'] if index_ok else None,
+            'batch_sizes': self.batch_sizes,
+            'stages': stages, **self.extra
+        }
+
+    def save(self) -> str:
+        report = self.report()
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f"ingest_{self.started:%Y%m%d_%H%M%S}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        rows = stored_rows(report)
+        summary = {
+            'started': report['started'], 'source': self.source, 'rows': rows,
+            'total_wall_s': round(report['total_wall_s'], 3), 'peak_rss_mb': report['peak_rss_mb'],
+            'db_bytes_after': report['db_bytes_after'], 'index_build_s': report['index_build_s'],
+            'index_ok': report['index_ok'],
+            'stage_wall_s': {k: round(v['wall_s'], 3) for k, v in report['stages'].items()},
+        }
+        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+        return path
+
+    def print_summary(self) -> None:
+        report = self.report()
+        total = report['total_wall_s'] or 1.0
+        print("\n📋 적재 실행 보고서")
+        print(f"{'단계':<16} {'wall(s)':>9} {'cpu(s)':>9} {'비중':>6} {'items/s':>10} {'tokens/s':>10}")
+        for name, st in report['stages'].items():
+            ips = f"{st['items_per_s']:10.1f}" if st['items_per_s'] else f"{'-':>10}"
+            tps = f"{st['tokens_per_s']:10.0f}" if st['tokens_per_s'] else f"{'-':>10}"
+            print(f"{name:<16} {st['wall_s']:9.2f} {st['cpu_s']:9.2f} {st['wall_s'] / total:6.0%} {ips} {tps}")
+        print(f"⏱️ 전체 {report['total_wall_s']:.1f}s (CPU {report['total_cpu_s']:.1f}s)"
+              + (f", peak RSS {report['peak_rss_mb']:.0f} MB" if report['peak_rss_mb'] else ""))
+        print(f"💽 DB {report['db_bytes_before'] / 1024 / 1024:.1f} MB -> {report['db_bytes_after'] / 1024 / 1024:.1f} MB")
+        if report['index_build_s'] is not None:
+            print(f"🧭 HNSW 인덱스 생성 {report['index_build_s']:.2f}s")
+        elif 'hnsw_index' in report['stages']:
+            print("❌ HNSW 인덱스 생성 실패 (인덱스 없음)")
+
+        previous = load_history()[-1:]
+        rows = stored_rows(report)
+        if previous and previous[0].get('rows') and rows:
+            prev = previous[0]
+            prev_rate = prev['rows'] / prev['total_wall_s'] if prev['total_wall_s'] else 0
+            rate = rows / report['total_wall_s']
+            print(f"📈 직전 실행 대비: {prev['rows']}행 {prev_rate:.1f} rows/s -> {rows}행 {rate:.1f} rows/s")
+
+
+class _NullProfiler(IngestProfiler):
+    """보고서를 만들지 않을 때 쓰는 빈 프로파일러"""
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, tokens: int = 0):
+        yield {}
+
+    def batch(self, size: int) -> None:
+        pass
+
+NULL_PROFILER = _NullProfiler()
+
+
+def load_history() -> List[Dict[str, Any]]:
+    if not os.path.exists(HISTORY_FILE): return []
+    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+if __name__ == "__main__":
+    history = load_history()
+    if not history:
+        print("기록이 없습니다.")
+    for h in history:
+        rate = h['rows'] / h['total_wall_s'] if h.get('total_wall_s') else 0
+        index = f"{h['index_build_s']:.1f}s" if h.get('index_build_s') is not None else "없음"
+        print(f"{h['started']}  {h['rows']:>8}행  {h['total_wall_s']:>8.1f}s  {rate:>7.1f} rows/s  "
+              f"index {index}  RSS {h.get('peak_rss_mb') or 0:.0f}MB")
@@ -0,0 +1,194 @@
+import json
+import time
+import random
+import argparse
+import threading
+import duckdb
+import numpy as np
+from datetime import datetime
+from contextlib import nullcontext
+from typing import Dict, List, Any
+import farm_queries
+from db_publish import resolve_db_path
+
+# ==========================================
+# 동시 사용자 부하 테스트 (브라우저 없이 앱의 데이터 함수를 직접 호출)
+# - 세션 = 스레드. 실제 사용 패턴 비율로 월 탐색/주차 선택/작목 필터/검색을 반복
+# - 동시 세션 수를 단계적으로 올리며 작업별 p50/p95/p99 와 처리량을 측정하고
+#   처리량/지연 비(power)가 최대가 되는 지점을 '무릎(knee)'으로 보고
+# - connection 모드
+#   shared: 앱처럼 연결 1개를 모든 세션이 공유 (DuckDB 연결은 스레드 안전하지 않아 잠금으로 직렬화)
+#   cursor: 세션마다 con.cursor() (같은 DB, 독립 실행)
+# ==========================================
+MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+
+OPERATION_MIX = {
+    'browse_month': 0.40,   # 연/월 선택 -> 주차 목록 + 월 브리핑
+    'select_week': 0.25,    # 주차 선택 -> 주차 브리핑
+    'crop_filter': 0.15,    # 작목 필터 변경
+    'search': 0.20,         # 하단 전체 검색
+}
+DEFAULT_LEVELS = [1, 2, 4, 8, 16, 32]
+LEVEL_SECONDS = 20.0
+SEARCH_QUERIES = ["봄배추 육묘", "꿀벌 월동관리", "고추 탄저병 방제", "장마 대비 배수로", "사과 적과 시기",
+                  "벼 이앙 물관리", "폭염 시설하우스 환기", "마늘 웃거름", "딸기 흰가루병", "태풍 대비 과수"]
+
+
+class Session:
+    """가상 사용자 1명 (앱의 한 브라우저 탭에 해당)"""
+    def __init__(self, con, lock, model, catalog: Dict[str, Any], seed: int):
+        self.con = con
+        self.lock = lock
+        self.model = model
+        self.catalog = catalog
+        self.rng = random.Random(seed)
+        self.year, self.month = self.rng.choice(catalog['year_months'])
+        self.crops: List[str] = []
+        self.today = datetime.now()
+
+    def _briefing(self, week_range):
+        with self.lock:
+            rows = farm_queries.fetch_briefing_rows(self.con, week_range, self.month)
+        rows = farm_queries.filter_by_crops(rows, self.crops)
+        by_year = {}
+        for r in rows: by_year.setdefault(r[0], []).append(r)
+        return [farm_queries.organize_items_smartly(items, self.today) for items in by_year.values()]
+
+    def browse_month(self):
+        self.year, self.month = self.rng.choice(self.catalog['year_months'])
+        with self.lock:
+            farm_queries.fetch_week_list(self.con, self.year, self.month)
+        self._briefing(None)
+
+    def select_week(self):
+        with self.lock:
+            weeks = farm_queries.fetch_week_list(self.con, self.year, self.month)
+        self._briefing(self.rng.choice(weeks) if weeks else None)
+
+    def crop_filter(self):
+        with self.lock:
+            crops = farm_queries.fetch_all_crops(self.con)
+        self.crops = self.rng.sample(crops, min(self.rng.randint(0, 2), len(crops)))
+        self._briefing(None)
+
+    def search(self):
+        vector = self.model.encode(self.rng.choice(SEARCH_QUERIES)).tolist()
+        with self.lock:
+            farm_queries.search_documents(self.con, vector)
+
+    def pick(self) -> str:
+        return self.rng.choices(list(OPERATION_MIX), weights=list(OPERATION_MIX.values()))[0]
+
+
+def run_level(base_con, model, catalog: Dict[str, Any], n_sessions: int, seconds: float,
+              mode: str, think_ms: float) -> Dict[str, Any]:
+    shared_lock = threading.Lock()
+    records: List[tuple] = []
+    records_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    errors = [0]
+
+    def worker(i: int):
+        cursor = None
+        if mode == 'shared':
+            session = Session(base_con, shared_lock, model, catalog, seed=i)
+        else:
+            cursor = base_con.cursor()
+            session = Session(cursor, nullcontext(), model, catalog, seed=i)
+        local, local_errors = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                op = session.pick()
+                t0 = time.perf_counter()
+                try:
+                    getattr(session, op)()
+                    local.append((op, time.perf_counter() - t0))
+                except Exception:
+                    # 쿼리 오류뿐 아니라 데이터 함수의 예외도 세고 계속 (스레드가 조용히 죽지 않도록)
+                    local_errors += 1
+                if think_ms: time.sleep(session.rng.expovariate(1000.0 / think_ms))
+        finally:
+            with records_lock:
+                records.extend(local)
+                errors[0] += local_errors
+            if cursor is not None: cursor.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(n_sessions)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+
+    per_op = {}
+    for op in OPERATION_MIX:
+        lat = np.asarray([r[1] for r in records if r[0] == op]) * 1000
+        if lat.size == 0: continue
+        per_op[op] = {
+            'n': int(lat.size), 'p50_ms': float(np.percentile(lat, 50)),
+            'p95_ms': float(np.percentile(lat, 95)), 'p99_ms': float(np.percentile(lat, 99))
+        }
+    all_lat = np.asarray([r[1] for r in records]) * 1000
+    p95 = float(np.percentile(all_lat, 95)) if all_lat.size else 0.0
+    throughput = len(records) / elapsed if elapsed else 0.0
+    return {
+        'sessions': n_sessions, 'ops': len(records), 'errors': errors[0],
+        'throughput': throughput, 'p95_ms': p95,
+        'power': throughput / p95 if p95 else 0.0, 'per_op': per_op
+    }
+
+def find_knee(levels: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """처리량/지연(power)이 최대인 단계 = 더 늘려도 지연만 커지기 시작하는 지점"""
+    return max(levels, key=lambda lv: lv['power']) if levels else {}
+
+def print_level(lv: Dict[str, Any]) -> None:
+    print(f"👥 {lv['sessions']:>3} 세션 | {lv['throughput']:8.1f} ops/s | 전체 p95 {lv['p95_ms']:8.1f}ms | 오류 {lv['errors']}")
+    for op, st in lv['per_op'].items():
+        print(f"     {op:<13} n={st['n']:<6} p50 {st['p50_ms']:8.1f}  p95 {st['p95_ms']:8.1f}  p99 {st['p99_ms']:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드/검색 동시 사용자 부하 테스트 (헤드리스)")
+    parser.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    parser.add_argument('--levels', default=",".join(map(str, DEFAULT_LEVELS)), help="동시 세션 수 단계")
+    parser.add_argument('--seconds', type=float, default=LEVEL_SECONDS, help="단계별 측정 시간")
+    parser.add_argument('--connection', choices=['shared', 'cursor'], default='shared')
+    parser.add_argument('--think-ms', type=float, default=0.0, help="작업 사이 평균 대기 (지수분포)")
+    parser.add_argument('--encoder', choices=['model', 'hash'], default='model')
+    parser.add_argument('-o', '--output', default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.encoder == 'hash':
+        from synth_corpus import HashEncoder
+        model = HashEncoder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME, device='cpu')
+
+    db_path = args.db or resolve_db_path()
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        con.execute("LOAD vss;")
+    except duckdb.Error:
+        pass
+    catalog = {'year_months': con.execute("SELECT DISTINCT year, month FROM farm_info ORDER BY 1, 2").fetchall()}
+
+    print(f"🚜 부하 테스트: {db_path} (연결 모드: {args.connection}, 단계당 {args.seconds:.0f}s)")
+    levels = []
+    for n in [int(v) for v in args.levels.split(',') if v.strip()]:
+        lv = run_level(con, model, catalog, n, args.seconds, args.connection, args.think_ms)
+        print_level(lv)
+        levels.append(lv)
+    con.close()
+
+    knee = find_knee(levels)
+    if knee:
+        print(f"\n📈 무릎 지점: {knee['sessions']} 세션 ({knee['throughput']:.1f} ops/s, p95 {knee['p95_ms']:.1f}ms)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'db': db_path, 'connection': args.connection, 'mix': OPERATION_MIX,
+                       'levels': levels, 'knee_sessions': knee.get('sessions')}, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,126 +1,159 @@
 import re
-import json
-import glob
 import os
+import sys
+import glob
+import json
+import heapq
+import shutil
+import argparse
+import tempfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Any, Iterator, Tuple
+from category_classifier import detect_category
 
-# 1. 키워드 맵 (목차 관련 키워드 제거됨, 공백 제거된 매칭 키워드로 수정)
-CATEGORY_MAP = {
-    '요약': ['요약', '핵심기술', '주간중점'], # [수정] '요 약'->'요약' (detect_category에서 공백 제거하므로)
-    '기상': ['기상', '전망', '날씨', '저수율', '강수량', '농업정보', '농업정보'],
-    '벼': ['벼', '볍씨', '모내기', '쌀', '식량작물', '이앙', '논'],
-    '밭작물': ['밭작물', '콩', '감자', '고구마', '보리', '밀', '옥수수', '두류', '잡곡', '맥류'],
-    '채소': ['채소', '고추', '마늘', '양파', '배추', '무', '시설하우스', '딸기', '수박', '오이', '토마토', '원예'],
-    '과수': ['과수', '사과', '배', '포도', '복숭아', '감귤', '단감', '자두', '과원', '동해', '꽃눈'],
-    '화훼': ['화훼', '국화', '장미', '프리지아', '카네이션', '꽃'],
-    '특용작물': ['특용작물', '인삼', '오미자', '약용작물', '버섯', '느타리', '당귀'],
-    '축산': ['축산', '한우', '돼지', '닭', 'AI', '구제역', '가축', '방역', '소', '젖소', '양돈', '가금', '돈사', '계사'],
-    '양봉': ['양봉', '벌통', '꿀벌', '벌집', '봉군', '말벌', '응애', '월동벌', '장수말벌', '등검은말벌', '합봉', '사양기']
-}
-
-def detect_category(text):
-    """텍스트에서 카테고리 키워드 찾기 (목차 필터링 포함)"""
-    # 0. 목차 필터링 우선 적용
-    if '목차' in text or '목 차' in text:
-        return 'SKIP'
-        
-    clean_text = text.replace(" ", "")
-    for category, keywords in CATEGORY_MAP.items():
-        for keyword in keywords:
-            if keyword in clean_text:
-                return category
-    return '기타'
-
-def parse_md_to_jsonl_robust(directory_path):
+# ==========================================
+# 병렬 + 스트리밍 변환
+# - 파일 단위로 프로세스 풀에서 파싱 (readlines 없이 한 줄씩)
+# - 파일이 끝나는 즉시 id 순으로 정렬된 런(run) 파일로 내보내고 메모리에서 버림
+# - 마지막에 런들을 id 기준 k-way 병합 (heapq.merge) 하며 출력에 한 줄씩 기록
+#   -> 메인 프로세스 메모리는 '런 개수 x 1줄' 수준, 파일 수가 늘면 코어 수만큼 빨라짐
+# - 출력 확장자가 .parquet 이면 병합 결과를 DuckDB COPY 로 Parquet 변환
+# ==========================================
+HEADER_PATTERN = re.compile(r'^#\s*\[(\d{4}-\d{2}-\d{2}~\d{4}-\d{2}-\d{2})\]\s*(.*)')
+OUTPUT_FILE = 'optimized_farming_data_v2.jsonl'
+PARQUET_COLUMNS = "{'id': 'VARCHAR', 'year': 'VARCHAR', 'month': 'INTEGER', 'week_range': 'VARCHAR', 'content': 'MAP(VARCHAR, VARCHAR)'}"
+
+
+def find_md_files(directory_path: str) -> List[str]:
     # json_con 폴더 내의 md 파일만 타겟팅 (유저 요청에 따라)
-    target_path = os.path.join(directory_path, "json_con", "*.md")
-    md_files = glob.glob(target_path)
-    
+    md_files = glob.glob(os.path.join(directory_path, "json_con", "*.md"))
+
     # 만약 json_con에 없으면 현재 디렉토리도 검색
     if not md_files:
         md_files = glob.glob(os.path.join(directory_path, "*.md"))
+    return sorted(md_files)
 
-    all_weeks_data = []
+def parse_md_file(file_path: str, detect: Callable[[str], str] = detect_category) -> Iterator[Dict[str, Any]]:
+    """md 파일 1개 -> 주차 엔트리 (id 순). 한 파일 안에서 같은 주차가 흩어져 있을 수 있어 파일 단위로만 모음"""
+    temp_storage = defaultdict(lambda: defaultdict(list))
+    current_date_key = None
+    current_category = '기타'
+    skip_current_section = False
 
-    # 헤더 패턴: # [2024-01-01~2024-01-07] 제목
-    header_pattern = re.compile(r'^#\s*\[(\d{4}-\d{2}-\d{2}~\d{4}-\d{2}-\d{2})\]\s*(.*)')
-
-    print(f"📂 발견된 파일: {len(md_files)}개")
-
-    for file_path in md_files:
-        print(f"   -> 처리 중: {os.path.basename(file_path)}")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-        except Exception as e:
-            print(f"   ⚠️ 파일 읽기 오류: {e}")
-            continue
-
-        temp_storage = defaultdict(lambda: defaultdict(list))
-        
-        current_date_key = None
-        current_category = '기타'
-        skip_current_section = False
-
-        for line in lines:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
             stripped_line = line.strip()
             if not stripped_line: continue
 
             # 1. 헤더 라인인지 확인
-            match = header_pattern.match(stripped_line)
-            
+            match = HEADER_PATTERN.match(stripped_line)
+
             if match:
-                date_range = match.group(1)
-                title_content = match.group(2)
-                
-                current_date_key = date_range
-                detected_cat = detect_category(title_content)
-                
+                current_date_key = match.group(1)
+                detected_cat = detect(match.group(2))
+
                 if detected_cat == 'SKIP':
                     skip_current_section = True
                     current_category = None
                 else:
                     skip_current_section = False
                     current_category = detected_cat
-            
-            else:
-                # 2. 본문 라인
-                if not skip_current_section and current_date_key and current_category:
-                    temp_storage[current_date_key][current_category].append(line.strip())
-
-        # 3. 임시 저장소를 리스트 구조로 반환 (JSONL용)
-        for date_key, cat_data in temp_storage.items():
-            start_date, end_date = date_key.split('~')
-            
-            week_entry = {
-                "id": date_key,
-                "year": start_date[:4],
-                "month": int(start_date[5:7]),
-                "week_range": date_key,
-                "content": {}
-            }
-            
-            for cat, texts in cat_data.items():
-                week_entry["content"][cat] = "\n".join(texts)
-                
-            all_weeks_data.append(week_entry)
-
-    # 날짜순 정렬
-    all_weeks_data.sort(key=lambda x: x['id'])
-    
-    return all_weeks_data
 
-if __name__ == "__main__":
-    current_dir = "."
+            # 2. 본문 라인
+            elif not skip_current_section and current_date_key and current_category:
+                temp_storage[current_date_key][current_category].append(stripped_line)
+
+    # 3. 임시 저장소를 리스트 구조로 반환 (JSONL용)
+    for date_key in sorted(temp_storage):
+        start_date, end_date = date_key.split('~')
+        yield {
+            "id": date_key,
+            "year": start_date[:4],
+            "month": int(start_date[5:7]),
+            "week_range": date_key,
+            "content": {cat: "\n".join(texts) for cat, texts in temp_storage[date_key].items()}
+        }
+
+def convert_file(file_path: str, spill_dir: str, run_no: int) -> Tuple[str, str, int]:
+    """[워커] 파일 1개를 파싱해 정렬된 런 파일로 기록 (줄 형식: id<TAB>json)"""
+    run_path = os.path.join(spill_dir, f"run_{run_no:05d}.tsv")
+    count = 0
+    with open(run_path, 'w', encoding='utf-8') as out:
+        for entry in parse_md_file(file_path):
+            out.write(entry['id'] + '\t' + json.dumps(entry, ensure_ascii=False) + '\n')
+            count += 1
+    return file_path, run_path, count
+
+def _iter_run(run_path: str) -> Iterator[Tuple[str, str]]:
+    with open(run_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            key, _, payload = line.partition('\t')
+            yield key, payload
+
+def merge_runs(run_paths: List[str], output_path: str) -> int:
+    """런 파일들을 id 순으로 k-way 병합하며 JSONL 로 기록"""
+    written = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for _, payload in heapq.merge(*(_iter_run(p) for p in run_paths), key=lambda kv: kv[0]):
+            out.write(payload)
+            written += 1
+    return written
+
+def write_parquet(jsonl_path: str, parquet_path: str) -> None:
+    import duckdb
+    con = duckdb.connect()
+    src = jsonl_path.replace("'", "''")
+    dst = parquet_path.replace("'", "''")
+    con.execute(f"""
+        COPY (SELECT * FROM read_json('{src}', format='newline_delimited', columns={PARQUET_COLUMNS}))
+        TO '{dst}' (FORMAT PARQUET, COMPRESSION ZSTD)
+    """)
+    con.close()
+
+def convert(md_files: List[str], output_path: str, workers: int = None) -> int:
+    spill_dir = tempfile.mkdtemp(prefix="md_to_json_")
+    try:
+        run_paths = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert_file, path, spill_dir, i) for i, path in enumerate(md_files)]
+            for future in as_completed(futures):
+                try:
+                    file_path, run_path, count = future.result()
+                except Exception as e:
+                    print(f"   ⚠️ 파일 처리 오류: {e}")
+                    continue
+                run_paths.append(run_path)
+                print(f"   -> 처리 완료: {os.path.basename(file_path)} ({count}주차)")
+        # 같은 id 가 여러 파일에 있으면 파일 순서대로 나오도록 (결정적 출력)
+        run_paths.sort()
+
+        if output_path.endswith('.parquet'):
+            jsonl_path = os.path.join(spill_dir, "merged.jsonl")
+            written = merge_runs(run_paths, jsonl_path)
+            write_parquet(jsonl_path, output_path)
+        else:
+            written = merge_runs(run_paths, output_path)
+        return written
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="주간농사정보 MD -> JSONL/Parquet 변환 (병렬, 스트리밍)")
+    parser.add_argument('inputs', nargs='*', help="md 파일들 (기본: ./json_con/*.md, 없으면 ./*.md)")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE, help=".jsonl 또는 .parquet")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    args = parser.parse_args()
+
+    md_files = sorted(args.inputs) if args.inputs else find_md_files(".")
+    if not md_files:
+        print("❌ 변환할 md 파일이 없습니다.")
+        sys.exit(1)
+
     print(f"🚀 MD -> JSONL 변환 시작 (TOC 제거 로직 적용)")
-    
-    data = parse_md_to_jsonl_robust(current_dir)
-    
-    # JSONL 파일로 저장 (embed.py 입력용)
-    output_file = 'optimized_farming_data_v2.jsonl'
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for entry in data:
-            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
-            
-    print(f"✅ 변환 완료: {len(data)}주차 데이터 생성됨 -> {output_file}")
+    print(f"📂 발견된 파일: {len(md_files)}개")
+    written = convert(md_files, args.output, args.workers)
+    print(f"✅ 변환 완료: {written}주차 데이터 생성됨 -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import re
+import time
+import zlib
+import argparse
+import duckdb
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from db_publish import clone_current, publish, resolve_db_path
+from category_classifier import detect_category
+
+# ==========================================
+# 거의 같은 섹션 접기 (매주/매년 반복되는 월동관리, 방역 상용문 등)
+# - 섹션 본문 문자 SHINGLE_CHARS-gram 집합의 MinHash 서명(NUM_PERM 개) + LSH (BANDS 개 띠)
+# - 적재 시: 이미 적재한 섹션과 추정 자카드 유사도가 DUP_THRESHOLD 이상이면 인코딩하지 않고
+#   embedding 을 NULL 로 저장 -> HNSW 인덱스/인코딩 비용이 중복 비율만큼 줄어듦
+# - 적재 후: near_dups(id, canonical_id, similarity) 로 임베딩이 있는 대표 행에 연결
+#   (같은 title/content_md 로 다시 서명하므로 적재 시 판단과 같은 결과)
+# - 검색: 대표 행만 결과에 나오고, 앱은 대표 행 아래에 같은 내용의 다른 주차를 표시
+# - 문서별 점수/연결을 만드는 곳(related_docs, auto_tagger, risk_index)은
+#   canonical_embedding_sql 로 중복 행도 대표 행의 임베딩으로 읽음
+#   (검색 후보를 만드는 batch_search, edge_bundle npy 는 HNSW 와 같이 대표 행만)
+# - 기상 섹션은 주차마다 관측값이 달라 대상에서 제외 (표 틀이 같아 유사도가 높게 나옴)
+# ==========================================
+SHINGLE_CHARS = 4
+SIGNATURE_CHARS = 2000     # 본문 앞부분만 서명 (상용문 판단에는 충분)
+NUM_PERM = 64
+BANDS = 16                 # 띠당 4행 -> 유사도 0.85 쌍은 거의 항상 같은 버킷을 공유
+DUP_THRESHOLD = 0.85
+EXCLUDED_CATEGORIES = {'기상'}
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(20240101)   # 고정 시드: 적재/유지보수/CLI 가 같은 서명
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+
+def dedup_text(title: str, content: str) -> str:
+    """분류명 + 본문 (주차 날짜가 들어간 제목 앞부분은 제외, 마크다운 기호/공백 정리)"""
+    text = title.split(']')[-1] + ' ' + (content or '')[:SIGNATURE_CHARS]
+    return re.sub(r'[\s#*`>|\-]+', ' ', text).strip().lower()
+
+def signature(text: str) -> np.ndarray:
+    if not text: return _EMPTY
+    shingles = {text[i:i + SHINGLE_CHARS] for i in range(max(len(text) - SHINGLE_CHARS + 1, 1))}
+    h = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_PERM_A[:, None] * h[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+def section_signature(title: str, content: str) -> Optional[np.ndarray]:
+    """접기 대상이 아닌 섹션(기상)은 None -> 항상 자기 임베딩을 가짐"""
+    if detect_category(title.split(']')[-1]) in EXCLUDED_CATEGORIES: return None
+    return signature(dedup_text(title, content))
+
+class NearDupIndex:
+    """대표 섹션의 서명을 LSH 버킷에 보관, find 는 유사도 DUP_THRESHOLD 이상인 대표 키"""
+    def __init__(self):
+        self.keys: List = []
+        self.sigs: List[np.ndarray] = []
+        self.buckets: Dict[bytes, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def _bands(sig: np.ndarray):
+        for b, band in enumerate(np.split(sig, BANDS)):
+            yield bytes([b]) + band.tobytes()
+
+    def add(self, key, sig: np.ndarray) -> None:
+        pos = len(self.keys)
+        self.keys.append(key)
+        self.sigs.append(sig)
+        for band in self._bands(sig):
+            self.buckets.setdefault(band, []).append(pos)
+
+    def best(self, sig: np.ndarray, threshold: float = DUP_THRESHOLD) -> Optional[Tuple[object, float]]:
+        candidates = {pos for band in self._bands(sig) for pos in self.buckets.get(band, ())}
+        best = None
+        for pos in candidates:
+            sim = float(np.mean(self.sigs[pos] == sig))
+            if sim >= threshold and (best is None or sim > best[1]):
+                best = (self.keys[pos], sim)
+        return best
+
+    def find(self, sig: np.ndarray):
+        hit = self.best(sig)
+        return hit[0] if hit else None
+
+def seed_index(con: duckdb.DuckDBPyConnection) -> NearDupIndex:
+    """기존 행(임베딩이 있는 대표 행)으로 채운 인덱스 (증분 추가용)"""
+    index = NearDupIndex()
+    for id_, title, content in con.execute(
+            "SELECT id, title, content_md FROM farm_info WHERE embedding IS NOT NULL ORDER BY id").fetchall():
+        sig = section_signature(title, content)
+        if sig is not None: index.add(id_, sig)
+    return index
+
+def canonical_embedding_sql(con: duckdb.DuckDBPyConnection, alias: str = 'f') -> Tuple[str, str]:
+    """(임베딩 식, 조인 SQL): 중복 행(embedding NULL)은 near_dups 로 대표 행의 임베딩
+    ARRAY 는 coalesce 미지원 -> near_dups 가 있으면 FLOAT[] 로 읽힘"""
+    has_dups = con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'near_dups' AND database_name = current_database()").fetchone()[0]
+    if not has_dups:
+        return f"{alias}.embedding", ""
+    return (f"coalesce({alias}.embedding::FLOAT[], canon.embedding::FLOAT[])",
+            f"LEFT JOIN near_dups nd ON nd.id = {alias}.id LEFT JOIN farm_info canon ON canon.id = nd.canonical_id")
+
+
+# ==========================================
+# 적재 후: 중복 행 -> 대표 행 연결
+# ==========================================
+def link_near_dups(con: duckdb.DuckDBPyConnection) -> int:
+    """near_dups 전체 재생성 (연결한 중복 행 수). embedding 이 NULL 인 행마다 유사도 DUP_THRESHOLD 이상인 가장 비슷한 대표 행
+    기준을 넘는 대표 행이 없으면(인코딩 실패 등) 연결하지 않음"""
+    rows = con.execute(
+        "SELECT id, title, content_md, embedding IS NULL FROM farm_info ORDER BY id").fetchall()
+    index = NearDupIndex()
+    dups = []
+    for id_, title, content, is_dup in rows:
+        sig = section_signature(title, content)
+        if sig is None: continue
+        if is_dup: dups.append((id_, sig))
+        else: index.add(id_, sig)
+
+    links = []
+    canon_sigs = np.stack(index.sigs) if index.sigs else None
+    for id_, sig in dups:
+        hit = index.best(sig)
+        if hit is None and canon_sigs is not None:
+            # LSH 버킷을 하나도 공유하지 않으면 전체 비교 (적재 시 판단과 같은 서명이므로 드묾)
+            sims = (canon_sigs == sig).mean(axis=1)
+            if sims.max() >= DUP_THRESHOLD:
+                hit = (index.keys[int(sims.argmax())], float(sims.max()))
+        if hit is not None:
+            links.append((id_, hit[0], hit[1]))
+    if len(links) < len(dups):
+        print(f"⚠️ 대표 행을 찾지 못한 NULL 임베딩 행 {len(dups) - len(links)}개 (연결하지 않음)")
+
+    con.execute("CREATE OR REPLACE TABLE near_dups (id INTEGER, canonical_id INTEGER, similarity DOUBLE)")
+    if links:
+        con.executemany("INSERT INTO near_dups VALUES (?, ?, ?)", sorted(links, key=lambda l: (l[1], l[0])))
+    con.execute("CREATE INDEX IF NOT EXISTS near_dups_idx ON near_dups (canonical_id)")
+    return len(links)
+
+def promote_before_delete(con: duckdb.DuckDBPyConnection, week_ranges: List[str]) -> int:
+    """삭제될 주차의 대표 행에 남은 중복 행이 있으면 대표 행의 임베딩을 첫 중복 행에 옮김 (검색에서 사라지지 않도록)"""
+    if not con.execute("SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'near_dups'").fetchone()[0]:
+        return 0
+    promoted = con.execute("""
+        SELECT min(n.id) as id, any_value(c.embedding) as embedding
+        FROM near_dups n
+        JOIN farm_info c ON c.id = n.canonical_id
+        JOIN farm_info d ON d.id = n.id
+        WHERE list_contains($weeks, regexp_extract(c.title, '\\[(.*?)\\]', 1))
+          AND NOT list_contains($weeks, regexp_extract(d.title, '\\[(.*?)\\]', 1))
+        GROUP BY n.canonical_id
+    """, {'weeks': list(week_ranges)}).fetchall()
+    if promoted:
+        con.executemany("UPDATE farm_info SET embedding = ? WHERE id = ?", [(emb, id_) for id_, emb in promoted])
+    return len(promoted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="거의 같은 섹션 접기")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('collapse', help="기존 DB 의 중복 행 임베딩을 비우고 near_dups 연결 후 인덱스 재생성, 새 버전으로 공개")
+    p_stats = sub.add_parser('stats', help="중복 비율만 확인 (DB 변경 없음)")
+    p_stats.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    if args.cmd == 'stats':
+        con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+        t0 = time.perf_counter()
+        rows = con.execute("SELECT id, title, content_md FROM farm_info ORDER BY id").fetchall()
+        index = NearDupIndex()
+        dups = 0
+        for id_, title, content in rows:
+            sig = section_signature(title, content)
+            if sig is None: continue
+            if index.find(sig) is None: index.add(id_, sig)
+            else: dups += 1
+        con.close()
+        print(f"📑 {len(rows)}행 중 중복 {dups}행 ({dups / max(len(rows), 1):.1%}), "
+              f"대표 {len(index)}행 ({time.perf_counter() - t0:.1f}s)")
+        return
+
+    import embed
+    db_path = clone_current()
+    con = duckdb.connect(db_path)
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    t0 = time.perf_counter()
+    # 대표 행은 적재 순서(id)로 먼저 나온 행 -> 나머지 중복 행의 임베딩을 비움
+    index = NearDupIndex()
+    dup_ids = []
+    for id_, title, content in con.execute(
+            "SELECT id, title, content_md FROM farm_info WHERE embedding IS NOT NULL ORDER BY id").fetchall():
+        sig = section_signature(title, content)
+        if sig is None: continue
+        if index.find(sig) is None: index.add(id_, sig)
+        else: dup_ids.append(id_)
+    con.execute("DROP INDEX IF EXISTS vss_idx")
+    if dup_ids:
+        con.execute("UPDATE farm_info SET embedding = NULL WHERE id IN (SELECT unnest(?::INTEGER[]))", [dup_ids])
+    n = link_near_dups(con)
+    embed.create_vector_index(con)
+    con.execute("CHECKPOINT")
+    con.close()
+    print(f"📑 중복 {len(dup_ids)}행 임베딩 비움, 연결 {n}행 ({time.perf_counter() - t0:.1f}s)")
+    publish(db_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import duckdb
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Any, Optional
+
+# ==========================================
+# 단계별 지연 계측 (프로세스 내 히스토그램)
+# - stage('encode') 같은 컨텍스트로 감싸면 누적 히스토그램 + 최근 샘플(백분위용)에 기록
+# - Prometheus 텍스트 형식으로 파일 출력 (python perf_metrics.py serve 로 /metrics 제공)
+# - SQL 은 timed_query 로 실행하면 느린 쿼리(sql, params)를 보관 -> 관리자 패널에서 EXPLAIN ANALYZE
+# ==========================================
+BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 1000
+SLOW_QUERY_KEEP = 5
+METRICS_FILE = os.path.join("logs", "metrics.prom")
+METRICS_PORT = 9108
+WRITE_INTERVAL_S = 10.0   # 앱은 rerun 마다 호출하므로 파일 쓰기는 이 간격으로만
+
+
+class StageHistogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_S)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+        for i, bound in enumerate(BUCKETS_S):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+    def percentile(self, p: float) -> float:
+        if not self.recent: return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+_lock = threading.Lock()
+_stages: Dict[str, StageHistogram] = {}
+_slow_queries: Dict[str, List[Dict[str, Any]]] = {}
+_last_write = 0.0
+
+
+def record(name: str, seconds: float) -> None:
+    with _lock:
+        hist = _stages.get(name)
+        if hist is None:
+            hist = _stages[name] = StageHistogram()
+        hist.observe(seconds)
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+def timed_query(con: duckdb.DuckDBPyConnection, name: str, sql: str, params: Optional[list] = None) -> List[tuple]:
+    """SQL 실행 + 'sql:<name>' 단계 기록 + 느린 실행 보관 (EXPLAIN ANALYZE 는 요청 시에만 실행)"""
+    t0 = time.perf_counter()
+    rows = con.execute(sql, params or []).fetchall()
+    seconds = time.perf_counter() - t0
+    record(f"sql:{name}", seconds)
+
+    with _lock:
+        slowest = _slow_queries.setdefault(name, [])
+        if len(slowest) < SLOW_QUERY_KEEP or seconds > slowest[-1]['seconds']:
+            slowest.append({'name': name, 'seconds': seconds, 'sql': sql, 'params': params or [],
+                            'ts': time.time(), 'plan': None})
+            slowest.sort(key=lambda q: q['seconds'], reverse=True)
+            del slowest[SLOW_QUERY_KEEP:]
+    return rows
+
+def explain_analyze(con: duckdb.DuckDBPyConnection, entry: Dict[str, Any]) -> str:
+    rows = con.execute("EXPLAIN ANALYZE " + entry['sql'], entry['params']).fetchall()
+    entry['plan'] = "\n".join(r[1] for r in rows)
+    return entry['plan']
+
+
+# ==========================================
+# 조회 / 출력
+# ==========================================
+def snapshot() -> List[Dict[str, Any]]:
+    with _lock:
+        return [{
+            'stage': name, 'count': h.count,
+            'mean_ms': h.total / h.count * 1000 if h.count else 0.0,
+            'p50_ms': h.percentile(50) * 1000, 'p95_ms': h.percentile(95) * 1000,
+            'max_ms': h.max * 1000
+        } for name, h in sorted(_stages.items())]
+
+def slow_queries() -> List[Dict[str, Any]]:
+    with _lock:
+        entries = [q for qs in _slow_queries.values() for q in qs]
+    return sorted(entries, key=lambda q: q['seconds'], reverse=True)
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP farm_stage_seconds Latency of dashboard stages",
+        "# TYPE farm_stage_seconds histogram",
+    ]
+    with _lock:
+        for name, h in sorted(_stages.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            for bound, n in zip(BUCKETS_S, h.buckets):
+                lines.append(f'farm_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {n}')
+            lines.append(f'farm_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {h.count}')
+            lines.append(f'farm_stage_seconds_sum{{stage="{label}"}} {h.total:.6f}')
+            lines.append(f'farm_stage_seconds_count{{stage="{label}"}} {h.count}')
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path: str = METRICS_FILE, min_interval: float = WRITE_INTERVAL_S) -> bool:
+    """metrics 파일 교체 (직전 쓰기 후 min_interval 이 안 지났으면 건너뜀, 쓴 경우 True)
+    세션(스레드)마다 다른 임시 파일에 쓰고 os.replace -> 동시에 불려도 서로의 임시 파일을 건드리지 않음"""
+    global _last_write
+    now = time.monotonic()
+    with _lock:
+        if now - _last_write < min_interval: return False
+        _last_write = now
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".metrics_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(render_prometheus())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return True
+
+
+def serve(path: str = METRICS_FILE, port: int = METRICS_PORT) -> None:
+    """앱이 기록한 metrics 파일을 /metrics 로 제공 (Prometheus 스크랩용)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            try:
+                with open(path, 'rb') as f: body = f.read()
+            except FileNotFoundError:
+                body = b""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    print(f"📡 http://0.0.0.0:{port}/metrics ({path})")
+    HTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(port=int(sys.argv[2]) if len(sys.argv) > 2 else METRICS_PORT)
+    else:
+        print("사용법: python perf_metrics.py serve [포트]")
@@ -0,0 +1,137 @@
+import time
+import argparse
+import duckdb
+import numpy as np
+from typing import List
+from db_publish import clone_current, publish
+from category_classifier import SKIP, detect_category
+from near_dup import canonical_embedding_sql
+
+try:
+    import pyarrow as pa  # [선택] 간선 배열을 Arrow 로 넘기면 executemany 보다 훨씬 빠름
+except ImportError:
+    pa = None
+
+# ==========================================
+# 다른 연도 유사 문서 그래프 (related_docs)
+# - 적재 시 저장된 임베딩끼리 행렬곱으로 k-최근접 이웃 계산 (쿼리 시 인코딩/벡터 스캔 없음)
+# - 같은 연도는 제외, 다른 연도마다 상위 RELATED_PER_YEAR 개 (기본: 같은 분류끼리만)
+# - 간선 테이블은 src_id 순으로 저장 + ART 인덱스 -> 팝오버마다 인덱스 조회 1번
+#   (상대 문서의 연도/주차/제목도 같이 저장해 farm_info 조인 불필요)
+# ==========================================
+RELATED_PER_YEAR = 2
+RELATED_MIN_SCORE = 0.40   # 검색 MIN_SCORE 와 같은 기준
+SIM_BATCH = 1024           # 한 번에 곱하는 원본 행 수 (유사도 행렬 메모리 = SIM_BATCH x 대상 연도 행 수)
+
+
+def _load_embeddings(con: duckdb.DuckDBPyConnection):
+    # 거의 같은 섹션(near_dup.py)은 대표 행의 임베딩으로 (팝오버가 사라지지 않도록)
+    embedding, dup_join = canonical_embedding_sql(con)
+    cols = con.execute(f"""
+        SELECT f.id, f.year, f.title, {embedding} as embedding FROM farm_info f {dup_join}
+        WHERE {embedding} IS NOT NULL
+        ORDER BY f.id
+    """).fetchnumpy()
+    if len(cols['id']) == 0:
+        return cols, np.zeros((0, 0), dtype=np.float32)
+    emb = np.stack(cols['embedding']).astype(np.float32)
+    emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+    return cols, emb
+
+def _store_edges(con: duckdb.DuckDBPyConnection, edges: dict) -> None:
+    if pa is not None:
+        con.register('related_edges', pa.table(edges))
+    else:
+        con.execute("""
+            CREATE OR REPLACE TEMP TABLE related_edges (
+                src_id INTEGER, rank INTEGER, dst_id INTEGER, score FLOAT
+            )
+        """)
+        con.executemany("INSERT INTO related_edges VALUES (?, ?, ?, ?)",
+                        list(zip(*(edges[k].tolist() for k in ('src_id', 'rank', 'dst_id', 'score')))))
+    con.execute("""
+        CREATE OR REPLACE TABLE related_docs AS
+        SELECT e.src_id::INTEGER as src_id, e.rank::INTEGER as rank, e.dst_id::INTEGER as dst_id,
+               f.year as dst_year, regexp_extract(f.title, '\\[(.*?)\\]', 1) as dst_week, f.title as dst_title,
+               e.score::FLOAT as score
+        FROM related_edges e JOIN farm_info f ON f.id = e.dst_id
+        ORDER BY src_id, dst_year DESC, rank
+    """)
+    if pa is not None:
+        con.unregister('related_edges')
+    else:
+        con.execute("DROP TABLE related_edges")
+    con.execute("CREATE INDEX IF NOT EXISTS related_docs_idx ON related_docs (src_id)")
+
+def build_related_docs(con: duckdb.DuckDBPyConnection, per_year: int = RELATED_PER_YEAR,
+                       same_category: bool = True, min_score: float = RELATED_MIN_SCORE) -> int:
+    """related_docs 전체 재생성 (간선 수)"""
+    cols, emb = _load_embeddings(con)
+    ids, years = cols['id'], cols['year']
+    cats = np.array([detect_category(t.split(']')[-1]) for t in cols['title']])
+    keep = cats != SKIP   # 목차 섹션은 원본/대상 모두 제외
+
+    src_ids: List[np.ndarray] = []
+    dst_ids: List[np.ndarray] = []
+    ranks: List[np.ndarray] = []
+    scores: List[np.ndarray] = []
+    year_rows = {y: np.flatnonzero((years == y) & keep) for y in np.unique(years)}
+
+    for src_year, src_rows in year_rows.items():
+        for dst_year, dst_rows in year_rows.items():
+            if dst_year == src_year or len(dst_rows) == 0: continue
+            k = min(per_year, len(dst_rows))
+            dst_emb = emb[dst_rows].T
+            for i in range(0, len(src_rows), SIM_BATCH):
+                batch = src_rows[i:i + SIM_BATCH]
+                sims = emb[batch] @ dst_emb
+                if same_category:
+                    sims[cats[batch][:, None] != cats[dst_rows][None, :]] = -np.inf
+
+                # 상위 k 만 부분 정렬 후 k 개 안에서 정렬
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                top_sims = np.take_along_axis(sims, top, axis=1)
+                order = np.argsort(-top_sims, axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+                top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+                mask = top_sims >= min_score
+                src_ids.append(np.repeat(ids[batch], k).reshape(-1, k)[mask])
+                dst_ids.append(ids[dst_rows][top][mask])
+                ranks.append(np.broadcast_to(np.arange(1, k + 1), top.shape)[mask])
+                scores.append(top_sims[mask])
+
+    if not src_ids:
+        src_ids, dst_ids, ranks, scores = ([np.zeros(0, dtype=np.int64)] for _ in range(4))
+    edges = {
+        'src_id': np.concatenate(src_ids).astype(np.int32),
+        'rank': np.concatenate(ranks).astype(np.int32),
+        'dst_id': np.concatenate(dst_ids).astype(np.int32),
+        'score': np.concatenate(scores).astype(np.float32),
+    }
+    _store_edges(con, edges)
+    return len(edges['src_id'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="다른 연도 유사 문서 그래프(related_docs) 생성 후 새 버전으로 공개")
+    parser.add_argument('-k', '--per-year', type=int, default=RELATED_PER_YEAR, help="다른 연도마다 이웃 수")
+    parser.add_argument('--any-category', action='store_true', help="분류가 달라도 이웃으로 허용")
+    parser.add_argument('--min-score', type=float, default=RELATED_MIN_SCORE)
+    args = parser.parse_args()
+
+    db_path = clone_current()
+    con = duckdb.connect(db_path)
+    # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    t0 = time.perf_counter()
+    n = build_related_docs(con, args.per_year, same_category=not args.any_category, min_score=args.min_score)
+    sources = con.execute("SELECT COUNT(DISTINCT src_id) FROM related_docs").fetchone()[0]
+    con.execute("CHECKPOINT")
+    con.close()
+    print(f"🔗 유사 문서 간선 {n}개 (문서 {sources}개, {time.perf_counter() - t0:.1f}s)")
+    publish(db_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import time
+import argparse
+import duckdb
+import numpy as np
+from typing import Tuple
+from db_publish import clone_current, publish
+from trend_cube import WEEK_EXPR, init_week_fingerprints, stage_changed_weeks, save_week_fingerprints
+from farm_queries import week_no_sql
+from near_dup import canonical_embedding_sql
+
+try:
+    import pyarrow as pa  # [선택] 문서 점수를 Arrow 로 넘기면 executemany 보다 훨씬 빠름
+except ImportError:
+    pa = None
+
+# ==========================================
+# 피해/위험 밀도 지수 (활용방안 #9 작황 변수)
+# - '피해' 원형 질의(냉해, 태풍 등)를 한 번 인코딩해 risk_prototypes 에 저장 (적재 시 모델이 있을 때만)
+# - 문서 점수 = 저장된 임베딩 x 원형 벡터 행렬곱 한 번 -> 원형 중 최대 유사도 + 가장 가까운 피해 유형
+# - (주차, 작목) 별 risk_series: 평균 의미 점수, 피해 태그 문서 비율, 둘을 합친 risk (0~100)
+#   작목이 없는 문서는 '전체' 에만 포함, '전체' 는 주차의 모든 문서
+# - 증분: trend_cube 와 같은 주차 지문 -> 바뀐 주차만 다시 계산 (모델 호출 없음)
+# ==========================================
+DAMAGE_PROTOTYPES = {
+    '냉해': '저온 냉해 동해 서리 피해로 생육이 멈추고 고사',
+    '태풍': '태풍 강풍 집중호우로 쓰러짐 침수 낙과 피해',
+    '가뭄': '가뭄 고온 건조로 시들음 물 부족 생육 부진',
+    '폭염': '폭염 고온 스트레스 일소 피해 폐사',
+    '병해충': '병해충 확산 방제 실패 피해 면적 증가',
+    '작황부진': '작황 부진 생육 불량 수량 감소 품질 저하',
+}
+DAMAGE_TAGS = [   # embed.TAG_SETS['env'] 중 피해 관련 (tags_pest 는 전부 피해로 봄, embed 가 적재 시 부분집합인지 확인)
+   '냉해', '동해', '태풍', '집중호우', '장마', '가뭄', '폭염']
+ALL_CROPS = '전체'
+SEMANTIC_WEIGHT = 0.7
+TAG_WEIGHT = 0.3
+SCORE_CHUNK = 4096
+
+
+def init_risk_tables(con: duckdb.DuckDBPyConnection, dim: int) -> None:
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS risk_prototypes (name VARCHAR PRIMARY KEY, text VARCHAR, vector FLOAT[{dim}])
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS risk_series (
+            crop VARCHAR, year INTEGER, week INTEGER, week_range VARCHAR, week_start DATE,
+            n_docs INTEGER, semantic DOUBLE, tag_share DOUBLE, risk DOUBLE, top_type VARCHAR
+        )
+    """)
+    con.execute("CREATE TABLE IF NOT EXISTS risk_damage_tags (tag VARCHAR)")
+    init_week_fingerprints(con, 'risk_weeks')
+
+def build_risk_prototypes(con: duckdb.DuckDBPyConnection, model) -> int:
+    """원형 문장이 바뀌었거나 없을 때만 인코딩 (인코딩한 원형 수)"""
+    init_risk_tables(con, model.get_sentence_embedding_dimension())
+    stored = dict(con.execute("SELECT name, text FROM risk_prototypes").fetchall())
+    if stored == DAMAGE_PROTOTYPES: return 0
+
+    names = list(DAMAGE_PROTOTYPES)
+    vectors = model.encode([DAMAGE_PROTOTYPES[n] for n in names], show_progress_bar=False,
+                           convert_to_numpy=True, normalize_embeddings=True)
+    con.execute("DELETE FROM risk_prototypes")
+    con.executemany("INSERT INTO risk_prototypes VALUES (?, ?, ?)",
+                    [(n, DAMAGE_PROTOTYPES[n], v.tolist()) for n, v in zip(names, vectors)])
+    # 원형이 바뀌면 이전 점수는 모두 무효
+    con.execute("DELETE FROM risk_weeks")
+    return len(names)
+
+def _score_documents(con: duckdb.DuckDBPyConnection, names, prototypes: np.ndarray) -> None:
+    """바뀐 주차 문서 x 원형 행렬곱 -> TEMP doc_risk(id, semantic, top_type)"""
+    con.execute("CREATE OR REPLACE TEMP TABLE doc_risk (id INTEGER, semantic DOUBLE, top_type VARCHAR)")
+    # 거의 같은 섹션(near_dup.py)은 embedding 이 NULL -> 대표 행의 임베딩으로 점수
+    embedding, dup_join = canonical_embedding_sql(con)
+    cols = con.execute(f"""
+        SELECT f.id, {embedding} as embedding FROM farm_info f {dup_join}
+        WHERE {embedding} IS NOT NULL
+          AND {WEEK_EXPR.replace('title', 'f.title')} IN (SELECT week_range FROM risk_changed WHERE n_rows IS NOT NULL)
+    """).fetchnumpy()
+    if len(cols['id']) == 0: return
+    ids = cols['id'].astype(np.int32)
+    emb = np.stack(cols['embedding']).astype(np.float32)
+    emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+
+    semantic = np.empty(len(ids), dtype=np.float64)
+    best = np.empty(len(ids), dtype=np.int64)
+    for start in range(0, len(ids), SCORE_CHUNK):
+        sims = emb[start:start + SCORE_CHUNK] @ prototypes.T      # (문서 x 원형)
+        best[start:start + SCORE_CHUNK] = sims.argmax(axis=1)
+        semantic[start:start + SCORE_CHUNK] = sims.max(axis=1)
+    top_type = [names[i] for i in best]
+    if pa is not None:
+        con.register('risk_batch', pa.table({'id': ids, 'semantic': semantic, 'top_type': top_type}))
+        con.execute("INSERT INTO doc_risk SELECT * FROM risk_batch")
+        con.unregister('risk_batch')
+    else:
+        con.executemany("INSERT INTO doc_risk VALUES (?, ?, ?)",
+                        list(zip(ids.tolist(), semantic.tolist(), top_type)))
+
+def refresh_risk_index(con: duckdb.DuckDBPyConnection, full: bool = False) -> Tuple[int, int]:
+    """지문이 바뀐 주차만 다시 계산 (다시 계산한 주차 수, 전체 행 수). 원형이 없으면 (0, 0)"""
+    has_protos = con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'risk_prototypes'").fetchone()[0]
+    if not has_protos: return 0, 0
+    protos = con.execute("SELECT name, vector FROM risk_prototypes ORDER BY name").fetchall()
+    if not protos: return 0, 0
+    names = [p[0] for p in protos]
+    prototypes = np.asarray([p[1] for p in protos], dtype=np.float32)
+    init_risk_tables(con, prototypes.shape[1])
+    # 피해 태그 목록이 바뀌면 tag_share 가 모두 무효 -> 전체 다시 계산
+    stored_tags = sorted(r[0] for r in con.execute("SELECT tag FROM risk_damage_tags").fetchall())
+    if stored_tags != sorted(DAMAGE_TAGS):
+        full = True
+        con.execute("DELETE FROM risk_damage_tags")
+        con.executemany("INSERT INTO risk_damage_tags VALUES (?)", [(t,) for t in DAMAGE_TAGS])
+    if full:
+        con.execute("DELETE FROM risk_series")
+        con.execute("DELETE FROM risk_weeks")
+
+    changed = stage_changed_weeks(con, 'risk_weeks', 'risk_changed')
+    if changed:
+        _score_documents(con, names, prototypes)
+        damage_tags = "[" + ", ".join(f"'{t}'" for t in DAMAGE_TAGS) + "]"
+        con.execute("DELETE FROM risk_series WHERE week_range IN (SELECT week_range FROM risk_changed)")
+        con.execute(f"""
+            INSERT INTO risk_series
+            WITH docs AS (
+                SELECT f.id, f.year, {WEEK_EXPR} as week_range, r.semantic, r.top_type,
+                       coalesce(list_has_any(f.tags_env, {damage_tags}) OR len(f.tags_pest) > 0, false) as damage_tagged,
+                       list_concat(coalesce(f.tags_crop, []), ['{ALL_CROPS}']) as crops
+                FROM farm_info f JOIN doc_risk r USING (id)
+                WHERE f.content_md NOT LIKE '%목 차%'
+            ),
+            per_crop AS (
+                SELECT unnest(crops) as crop, year, week_range, semantic, top_type, damage_tagged FROM docs
+            )
+            SELECT crop, year, {week_no_sql('w.week_start')} as week, week_range, w.week_start,
+                   COUNT(*) as n_docs,
+                   avg(semantic) as semantic,
+                   avg(damage_tagged::INTEGER) as tag_share,
+                   round(100 * ({SEMANTIC_WEIGHT} * greatest(avg(semantic), 0) + {TAG_WEIGHT} * avg(damage_tagged::INTEGER)), 1) as risk,
+                   mode(top_type) as top_type
+            FROM per_crop,
+                 LATERAL (SELECT try_strptime(split_part(week_range, '~', 1), '%Y-%m-%d')::DATE as week_start) w
+            GROUP BY ALL
+            ORDER BY crop, week_start
+        """)
+        save_week_fingerprints(con, 'risk_weeks', 'risk_changed')
+        con.execute("DROP TABLE doc_risk")
+    con.execute("DROP TABLE IF EXISTS risk_changed")
+    return changed, con.execute("SELECT COUNT(*) FROM risk_series").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="피해/위험 지수(risk_series) 갱신 후 새 버전으로 공개")
+    parser.add_argument('--full', action='store_true', help="전체 다시 계산")
+    parser.add_argument('--prototypes', action='store_true', help="원형 문장을 모델로 다시 인코딩 (모델 로드 필요)")
+    args = parser.parse_args()
+
+    db_path = clone_current()
+    con = duckdb.connect(db_path)
+    # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    t0 = time.perf_counter()
+    if args.prototypes:
+        import embed
+        print(f"🧪 원형 {build_risk_prototypes(con, embed.load_model())}개 인코딩")
+    changed, rows = refresh_risk_index(con, full=args.full)
+    con.execute("CHECKPOINT")
+    con.close()
+    if not rows:
+        print("⚠️ risk_prototypes 없음 - python risk_index.py --prototypes")
+    else:
+        print(f"⚠️ 위험 지수: {changed}개 주차 재계산, 전체 {rows}행 ({time.perf_counter() - t0:.2f}s)")
+    publish(db_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import re
+import sys
+import json
+import time
+import argparse
+import duckdb
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from db_publish import clone_current, publish, resolve_db_path
+from category_classifier import detect_category
+
+try:
+    import pyarrow as pa  # [선택] 규칙 행을 Arrow 로 넘기면 executemany 보다 훨씬 빠름
+except ImportError:
+    pa = None
+
+# ==========================================
+# 센서 이벤트 -> 관련 지침 (활용방안 #8 스마트팜 참조 데이터)
+# - 적재 시: content_md 문장에서 수치 기준을 뽑아 sensor_rules 에 저장
+#   '28℃ 이상 오르면' -> temp >= 28 / '3℃ 이하로 내려가지' -> temp <= 3
+#   '적정 15~25℃' -> 범위 밖 두 규칙 (temp < 15, temp > 25), 범위 규칙은 적정/유지/범위 문장만
+#   ('1~2도 높여' 같은 변화량, '기온 -3~-1℃' 같은 예보는 기준이 아님). 기상 섹션(관측/전망)은 제외
+#   키: (작목, 계절, 지표). 문장에 작목이 나오면 그 작목, 아니면 문서의 tags_crop, 없으면 '*'
+# - 매칭: 규칙이 모두 한쪽이 열린 구간 -> 키마다 하한 정렬 배열 / 상한 정렬 배열
+#   이벤트 값 v 에 대해 bisect 한 번으로 'lo <= v' 접두 구간, 'hi >= v' 접미 구간 (모델/DB 호출 없음)
+#   기준값이 v 에 가까운 규칙(가장 구체적인 경고)부터 MAX_MATCHES 개
+# ==========================================
+SEASONS = {12: 'winter', 1: 'winter', 2: 'winter', 3: 'spring', 4: 'spring', 5: 'spring',
+           6: 'summer', 7: 'summer', 8: 'summer', 9: 'autumn', 10: 'autumn', 11: 'autumn'}
+ANY_CROP = '*'
+MAX_MATCHES = 5
+SNIPPET_LEN = 120
+
+# 지표별 (단위, 문장에 있어야 하는 단어)
+METRICS = {
+    'temp': (r'℃|°C|도', r'기온|온도|지온|수온|영하|영상|℃|°C'),
+    'humidity': (r'%', r'습도'),
+    'precip': (r'mm', r'강수|강우|비가|비 '),
+    'wind': (r'm/s', r'풍속|바람'),
+}
+NUM = r'(영하\s*)?(-?\d+(?:\.\d+)?)'
+ABOVE = re.compile(r'^\s*(이상|초과|넘|을 넘|를 넘|보다 높|이 넘|가 넘|[^.,]{0,6}(오르|올라|높아|상승))')
+BELOW = re.compile(r'^\s*(이하|미만|아래|보다 낮|[^.,]{0,6}(내려|떨어|낮아|하강))')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?。])\s+|\n')
+BAND_WORDS = re.compile(r'적정|유지|범위')
+SKIP_CATEGORIES = {'기상'}
+
+_patterns = {
+    metric: (re.compile(rf'{NUM}\s*(?:{unit})?\s*[~∼\-–]\s*{NUM}\s*(?:{unit})'),
+             re.compile(rf'{NUM}\s*(?:{unit})'),
+             re.compile(context))
+    for metric, (unit, context) in METRICS.items()
+}
+
+
+# ==========================================
+# 1. 적재 시: 규칙 추출
+# ==========================================
+def _value(sign: Optional[str], num: str) -> float:
+    value = float(num)
+    return -abs(value) if sign else value
+
+def extract_rules(text: str) -> Iterator[Tuple[str, float, float, str, str]]:
+    """(지표, lo, hi, 종류, 문장) - 매칭 구간은 lo <= v <= hi (한쪽은 ±inf)"""
+    for sentence in SENTENCE_SPLIT.split(text or ""):
+        sentence = sentence.strip(' -*|')
+        if not sentence or not any(ch.isdigit() for ch in sentence): continue
+        for metric, (range_re, single_re, context_re) in _patterns.items():
+            if not context_re.search(sentence): continue
+            covered = []
+            is_band = BAND_WORDS.search(sentence) is not None
+            for m in range_re.finditer(sentence):
+                # 범위 숫자는 단일 기준으로도 읽지 않음 (적정 범위 문장이 아니면 규칙 없음)
+                covered.append(m.span())
+                if not is_band: continue
+                lo, hi = sorted((_value(m.group(1), m.group(2)), _value(m.group(3), m.group(4))))
+                yield metric, float('-inf'), lo, 'below_range', sentence
+                yield metric, hi, float('inf'), 'above_range', sentence
+            for m in single_re.finditer(sentence):
+                if any(s <= m.start() < e for s, e in covered): continue
+                value = _value(m.group(1), m.group(2))
+                tail = sentence[m.end():m.end() + 16]
+                if ABOVE.match(tail):
+                    yield metric, value, float('inf'), 'above', sentence
+                elif BELOW.match(tail):
+                    yield metric, float('-inf'), value, 'below', sentence
+
+def build_sensor_rules(con: duckdb.DuckDBPyConnection) -> int:
+    """sensor_rules 전체 재생성 (규칙 수)"""
+    con.execute("""
+        CREATE OR REPLACE TABLE sensor_rules (
+            doc_id INTEGER, crop VARCHAR, season VARCHAR, metric VARCHAR,
+            lo DOUBLE, hi DOUBLE, kind VARCHAR, snippet VARCHAR
+        )
+    """)
+    # 수치+단위가 있는 섹션만 파이썬으로 넘김
+    rows = con.execute("""
+        SELECT id, month, title, tags_crop, content_md FROM farm_info
+        WHERE content_md NOT LIKE '%목 차%' AND regexp_matches(content_md, '[0-9]\\s*(℃|°C|도|%|mm|m/s)')
+        ORDER BY id
+    """).fetchall()
+    rules = []
+    for doc_id, month, title, tags_crop, content in rows:
+        if detect_category(title.split(']')[-1]) in SKIP_CATEGORIES: continue
+        season = SEASONS.get(month, 'any')
+        crops = list(tags_crop or [])
+        for metric, lo, hi, kind, sentence in extract_rules(content):
+            mentioned = [c for c in crops if c in sentence]
+            for crop in (mentioned or crops or [ANY_CROP]):
+                rules.append((doc_id, crop, season, metric, lo, hi, kind, sentence[:SNIPPET_LEN]))
+    if not rules: return 0
+
+    if pa is not None:
+        names = ['doc_id', 'crop', 'season', 'metric', 'lo', 'hi', 'kind', 'snippet']
+        con.register('rule_batch', pa.table({n: [r[i] for r in rules] for i, n in enumerate(names)}))
+        con.execute("INSERT INTO sensor_rules SELECT * FROM rule_batch")
+        con.unregister('rule_batch')
+    else:
+        con.executemany("INSERT INTO sensor_rules VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rules)
+    return len(rules)
+
+
+# ==========================================
+# 2. 메모리 구간 인덱스
+# ==========================================
+class ThresholdIndex:
+    """한쪽이 열린 구간 전용: above(lo) 오름차순, below(hi) 오름차순"""
+    def __init__(self):
+        self.above: List[Tuple[float, int]] = []
+        self.below: List[Tuple[float, int]] = []
+
+    def add(self, lo: float, hi: float, rule_no: int) -> None:
+        if hi == float('inf'): self.above.append((lo, rule_no))
+        else: self.below.append((hi, rule_no))
+
+    def freeze(self) -> None:
+        self.above.sort()
+        self.below.sort()
+        self.above_keys = [a[0] for a in self.above]
+        self.below_keys = [b[0] for b in self.below]
+
+    def stab(self, value: float, k: int) -> List[Tuple[float, int]]:
+        """value 를 포함하는 규칙 중 기준값이 가까운 순서 (거리, 규칙 번호)"""
+        end = bisect_right(self.above_keys, value)
+        hit_above = self.above[max(0, end - k):end]
+        start = bisect_left(self.below_keys, value)
+        hit_below = self.below[start:start + k]
+        hits = [(value - lo, no) for lo, no in hit_above] + [(hi - value, no) for hi, no in hit_below]
+        hits.sort()
+        return hits[:k]
+
+class SensorRuleMatcher:
+    def __init__(self, rules: List[Tuple]):
+        # rules: (doc_id, crop, season, metric, lo, hi, kind, snippet)
+        self.rules = rules
+        self.index: Dict[Tuple[str, str, str], ThresholdIndex] = {}
+        for no, (_, crop, season, metric, lo, hi, _, _) in enumerate(rules):
+            self.index.setdefault((metric, season, crop), ThresholdIndex()).add(lo, hi, no)
+        for idx in self.index.values():
+            idx.freeze()
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, metric: str, value: float, crop: Optional[str] = None, month: Optional[int] = None,
+              k: int = MAX_MATCHES) -> List[Dict[str, Any]]:
+        season = SEASONS.get(month, 'any') if month else None
+        seasons = [season] if season else sorted({key[1] for key in self.index})
+        crops = [crop, ANY_CROP] if crop else sorted({key[2] for key in self.index})
+        hits = []
+        for s in seasons:
+            for c in crops:
+                idx = self.index.get((metric, s, c))
+                if idx: hits.extend(idx.stab(value, k))
+        hits.sort()
+
+        out, seen = [], set()
+        for _, no in hits:
+            doc_id, r_crop, _, _, lo, hi, kind, snippet = self.rules[no]
+            if doc_id in seen: continue
+            seen.add(doc_id)
+            out.append({'doc_id': doc_id, 'crop': r_crop, 'kind': kind,
+                        'threshold': lo if hi == float('inf') else hi, 'snippet': snippet})
+            if len(out) >= k: break
+        return out
+
+def load_matcher(con: duckdb.DuckDBPyConnection) -> SensorRuleMatcher:
+    return SensorRuleMatcher(con.execute("SELECT * FROM sensor_rules").fetchall())
+
+
+# ==========================================
+# 3. 이벤트 스트림
+# ==========================================
+def parse_event(line: str) -> Optional[Dict[str, Any]]:
+    """JSONL {"metric", "value", "crop", "month"|"ts"} 또는 'metric,value[,crop[,month]]'"""
+    line = line.strip()
+    if not line or line.startswith('#'): return None
+    if line.startswith('{'):
+        event = json.loads(line)
+    else:
+        cols = [c.strip() for c in line.split(',')] + [''] * 3
+        event = {'metric': cols[0], 'value': cols[1], 'crop': cols[2] or None, 'month': cols[3] or None}
+    if event.get('month') is None and event.get('ts'):
+        event['month'] = datetime.fromisoformat(str(event['ts'])).month
+    event['value'] = float(event['value'])
+    event['month'] = int(event['month']) if event.get('month') else None
+    return event
+
+def run_stream(matcher: SensorRuleMatcher, stream, out, k: int = MAX_MATCHES) -> Tuple[int, int]:
+    events = matched = 0
+    for line in stream:
+        try:
+            event = parse_event(line)
+        except (ValueError, KeyError, TypeError, IndexError):
+            continue
+        if event is None: continue
+        events += 1
+        hits = matcher.match(event['metric'], event['value'], event.get('crop'), event.get('month'), k)
+        if hits:
+            matched += 1
+            out.write(json.dumps({**event, 'matches': hits}, ensure_ascii=False) + '\n')
+    return events, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="센서 이벤트 -> 관련 지침 규칙 매칭")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('build', help="sensor_rules 재생성 후 새 버전으로 공개")
+    p_match = sub.add_parser('match', help="이벤트 스트림 매칭 -> JSONL (표준출력)")
+    p_match.add_argument('events', nargs='?', default='-', help="이벤트 파일 ('-'는 표준입력)")
+    p_match.add_argument('-k', type=int, default=MAX_MATCHES)
+    p_match.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        db_path = clone_current()
+        con = duckdb.connect(db_path)
+        # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+        con.execute("LOAD vss;")
+        con.execute("SET hnsw_enable_experimental_persistence = true;")
+        t0 = time.perf_counter()
+        n = build_sensor_rules(con)
+        summary = con.execute("SELECT metric, COUNT(*), COUNT(DISTINCT doc_id) FROM sensor_rules GROUP BY 1 ORDER BY 1").fetchall()
+        con.execute("CHECKPOINT")
+        con.close()
+        print(f"📏 센서 규칙 {n}개 ({time.perf_counter() - t0:.1f}s)")
+        for metric, rules, docs in summary:
+            print(f"   - {metric}: 규칙 {rules}개, 문서 {docs}개")
+        publish(db_path)
+        return
+
+    con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+    t0 = time.perf_counter()
+    matcher = load_matcher(con)
+    con.close()
+    print(f"📚 규칙 {len(matcher)}개 로드 ({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+
+    stream = sys.stdin if args.events == '-' else open(args.events, 'r', encoding='utf-8')
+    try:
+        t0 = time.perf_counter()
+        events, matched = run_stream(matcher, stream, sys.stdout, args.k)
+        elapsed = time.perf_counter() - t0
+    finally:
+        if stream is not sys.stdin: stream.close()
+    eps = events / elapsed if elapsed > 0 else 0.0
+    print(f"✅ 이벤트 {events}건 (매칭 {matched}건): {elapsed:.2f}s, {eps:,.0f} events/sec", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
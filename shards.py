@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import heapq
+import hashlib
+import argparse
+import duckdb
+import numpy as np
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from db_publish import resolve_db_path
+import farm_queries
+
+# ==========================================
+# 연도별 샤드 (검색 전용 파일)
+# - 공개된 DB 의 farm_info(+ farm_display) 를 연도마다 db_shards/farm_<연도>.duckdb 로 복사하고
+#   샤드마다 HNSW(원본과 같은 설정) / FTS(확장이 있으면) 인덱스를 따로 만듦
+# - 연도별 지문(행 수 + id/제목/본문/임베딩/표시본 해시)이 같으면 그 샤드는 다시 쓰지 않음 -> 새 연도 = 새 파일 하나
+# - 검색: 메모리 연결 하나에 샤드를 READ_ONLY 로 ATTACH, 샤드마다 스레드에서 같은 검색 SQL 을 돌려
+#   샤드별 top-k 를 힙으로 병합 (DuckDB 는 실행 중 GIL 을 놓으므로 샤드가 늘어도 지연이 거의 일정)
+# - id 는 원본 DB 와 같으므로 near_dups / related_docs 등 나머지 조회는 원본 DB 그대로
+# - 메타/보조 테이블은 원본 DB 에만 있음 (샤드는 검색만)
+# ==========================================
+SHARD_DIR = "db_shards"
+MANIFEST_NAME = "manifest.json"
+MAX_WORKERS = 8
+
+# 샤드에 복사되는 값 전부 (본문/임베딩만 바뀌는 재적재, 모델 교체, 렌더링 수정, 중복 접기도 감지)
+FINGERPRINT_SQL = """
+    SELECT f.year, COUNT(*) as n_rows, bit_xor(hash(f.id, f.title, f.content_md, f.embedding{display_cols})) as digest
+    FROM farm_info f {display_join} GROUP BY f.year ORDER BY f.year
+"""
+
+
+def manifest_path(shard_dir: str = SHARD_DIR) -> str:
+    return os.path.join(shard_dir, MANIFEST_NAME)
+
+def load_manifest(shard_dir: str = SHARD_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path(shard_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def manifest_version(shard_dir: str = SHARD_DIR) -> Optional[str]:
+    """앱 캐시 키: 매니페스트 내용 해시 (샤드가 바뀌면 새 연결)"""
+    try:
+        with open(manifest_path(shard_dir), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except FileNotFoundError:
+        return None
+
+def _write_manifest(manifest: Dict[str, Any], shard_dir: str) -> None:
+    tmp = manifest_path(shard_dir) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_path(shard_dir))
+
+
+# ==========================================
+# 1. 샤드 만들기
+# ==========================================
+def _write_shard(src_path: str, year: int, path: str) -> Dict[str, Any]:
+    """연도 하나를 임시 파일에 쓰고 os.replace 로 교체 (열려 있는 앱은 이전 파일을 계속 읽음)"""
+    tmp = path + ".tmp"
+    for stale in (tmp, tmp + ".wal"):
+        if os.path.exists(stale): os.remove(stale)
+    con = duckdb.connect(tmp)
+    indexes = []
+    try:
+        try:
+            con.execute("LOAD vss;")
+            con.execute("SET hnsw_enable_experimental_persistence = true;")
+        except duckdb.Error:
+            pass
+        con.execute(f"ATTACH '{src_path.replace(chr(39), chr(39) * 2)}' AS src (READ_ONLY)")
+        con.execute("CREATE TABLE farm_info AS SELECT * FROM src.farm_info WHERE year = ? ORDER BY id", [year])
+        has_display = con.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE database_name = 'src' AND table_name = 'farm_display'").fetchone()[0]
+        if has_display:
+            con.execute("""
+                CREATE TABLE farm_display AS
+                SELECT d.* FROM src.farm_display d JOIN farm_info f USING (id) ORDER BY id
+            """)
+        # 원본과 같은 HNSW 설정 (vss 가 없으면 인덱스 없이 전체 스캔)
+        for (sql,) in con.execute("""
+                SELECT sql FROM duckdb_indexes()
+                WHERE database_name = 'src' AND table_name = 'farm_info' AND sql ILIKE '%HNSW%'
+            """).fetchall():
+            con.execute(sql)
+            indexes.append('hnsw')
+        try:
+            con.execute("LOAD fts;")
+            con.execute("PRAGMA create_fts_index('farm_info', 'id', 'title', 'content_md', overwrite=1)")
+            indexes.append('fts')
+        except duckdb.Error:
+            pass
+        rows, vectors = con.execute("SELECT COUNT(*), COUNT(embedding) FROM farm_info").fetchone()
+        con.execute("DETACH src")
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+    os.replace(tmp, path)
+    if os.path.exists(tmp + ".wal"): os.replace(tmp + ".wal", path + ".wal")
+    return {'year': year, 'file': os.path.basename(path), 'rows': rows, 'vectors': vectors, 'indexes': indexes}
+
+def sync_shards(src_path: str, shard_dir: str = SHARD_DIR, years: Optional[List[int]] = None,
+                force: bool = False) -> Tuple[int, int]:
+    """지문이 바뀐 연도만 다시 쓰고 매니페스트 교체 (다시 쓴 샤드 수, 전체 샤드 수)"""
+    os.makedirs(shard_dir, exist_ok=True)
+    con = duckdb.connect(src_path, read_only=True)
+    try:
+        try:
+            con.execute("LOAD vss;")
+        except duckdb.Error:
+            pass
+        has_display = farm_queries.has_table(con, 'farm_display')
+        sql = FINGERPRINT_SQL.format(
+            display_cols=", d.clean_title, d.display_md, d.render_version" if has_display else "",
+            display_join="LEFT JOIN farm_display d ON d.id = f.id" if has_display else "")
+        fingerprints = {y: (n, str(d)) for y, n, d in con.execute(sql).fetchall()}
+    finally:
+        con.close()
+
+    old_manifest = load_manifest(shard_dir) or {}
+    old = {s['year']: s for s in old_manifest.get('shards', [])}
+    shards = []
+    written = 0
+    up_to_date = True   # --years 로 건너뛴 연도까지 모두 src_path 와 같아야 source 를 바꿈
+    for year, (n_rows, digest) in sorted(fingerprints.items()):
+        path = os.path.join(shard_dir, f"farm_{year}.duckdb")
+        prev = old.get(year)
+        unchanged = prev and prev.get('digest') == digest and os.path.exists(path)
+        if years is not None and year not in years:
+            if prev: shards.append(prev)
+            if not unchanged: up_to_date = False
+            continue
+        if unchanged and not force:
+            shards.append(prev)
+            continue
+        t0 = time.perf_counter()
+        info = _write_shard(src_path, year, path)
+        info['digest'] = digest
+        shards.append(info)
+        written += 1
+        print(f"🧩 {year}년 샤드 {info['rows']}행 ({', '.join(info['indexes']) or '인덱스 없음'}, {time.perf_counter() - t0:.1f}s)")
+
+    # 원본에서 사라진 연도는 매니페스트에서 빼고 파일 삭제
+    for year, prev in old.items():
+        if year not in fingerprints:
+            for target in (os.path.join(shard_dir, prev['file']), os.path.join(shard_dir, prev['file']) + ".wal"):
+                if os.path.exists(target): os.remove(target)
+
+    # 건너뛴 연도가 src_path 와 다르면 source 를 src_path 로 바꾸지 않음 -> serves() 가 현재 버전으로 오인하지 않음
+    # (아무것도 다시 쓰지 않았으면 이전 source 그대로, 일부만 다시 썼으면 어느 버전과도 다르므로 None)
+    if up_to_date: source = src_path
+    elif written == 0 and old_manifest.get('source') != src_path: source = old_manifest.get('source')
+    else: source = None
+    _write_manifest({'source': source, 'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'shards': shards}, shard_dir)
+    return written, len(shards)
+
+
+# ==========================================
+# 2. 팬아웃 검색
+# ==========================================
+class ShardSet:
+    def __init__(self, shard_dir: str = SHARD_DIR, manifest: Optional[Dict[str, Any]] = None):
+        manifest = manifest or load_manifest(shard_dir)
+        if not manifest or not manifest.get('shards'):
+            raise FileNotFoundError(f"샤드 매니페스트 없음: {manifest_path(shard_dir)}")
+        self.con = duckdb.connect()
+        try:
+            self.con.execute("LOAD vss;")   # 샤드의 HNSW 인덱스를 쓰려면 ATTACH 전에 필요
+        except duckdb.Error:
+            pass
+        self.source: Optional[str] = manifest.get('source')
+        self.shards: Dict[int, str] = {}
+        self.sql: Dict[str, str] = {}
+        for s in manifest['shards']:
+            alias = f"shard_{s['year']}"
+            path = os.path.join(shard_dir, s['file']).replace("'", "''")
+            self.con.execute(f"ATTACH '{path}' AS {alias} (READ_ONLY)")
+            self.shards[int(s['year'])] = alias
+            # 샤드마다 검색 SQL 을 한 번만 완성 (farm_display 유무는 샤드별)
+            has_display = self.con.execute(
+                "SELECT COUNT(*) FROM duckdb_tables() WHERE database_name = ? AND table_name = 'farm_display'",
+                [alias]).fetchone()[0]
+            self.sql[alias] = farm_queries.SEARCH_SQL.format(
+                display_cols=farm_queries.DISPLAY_COLS if has_display else farm_queries.NO_DISPLAY_COLS,
+                display_join=farm_queries.DISPLAY_JOIN if has_display else "",
+                limit='{limit}')
+        self.pool = ThreadPoolExecutor(max_workers=min(len(self.shards), MAX_WORKERS),
+                                       thread_name_prefix='shard')
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def serves(self, db_path: str) -> bool:
+        """샤드가 db_path 버전에서 만들어졌는지 (롤백/동기화 실패 시 다른 버전 -> 단일 DB 검색)"""
+        return bool(self.source) and os.path.abspath(self.source) == os.path.abspath(db_path)
+
+    def _search_shard(self, alias: str, query_vector: List[float], limit: int) -> List[Tuple]:
+        # 스레드마다 별도 커서 (같은 인스턴스라 ATTACH 는 공유), USE 로 샤드를 기본 카탈로그로
+        cursor = self.con.cursor()
+        try:
+            cursor.execute(f"USE {alias}")
+            return farm_queries.timed_query(cursor, 'search_shard', self.sql[alias].format(limit=int(limit)), [query_vector])
+        finally:
+            cursor.close()
+
+    def search(self, query_vector: List[float], limit: int = farm_queries.SEARCH_LIMIT,
+               min_score: float = farm_queries.MIN_SCORE, years: Optional[List[int]] = None) -> List[Tuple]:
+        """search_documents 와 같은 행 모양. years 를 주면 그 연도 샤드만"""
+        aliases = [a for y, a in self.shards.items() if years is None or y in years]
+        futures = [self.pool.submit(self._search_shard, a, query_vector, limit) for a in aliases]
+        merged = heapq.nlargest(int(limit), (r for r in chain.from_iterable(f.result() for f in futures)
+                                             if r[4] is not None), key=lambda r: r[4])
+        return [r for r in merged if r[4] >= min_score]
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False)
+        self.con.close()
+
+def open_shard_set(shard_dir: str = SHARD_DIR) -> Optional[ShardSet]:
+    """매니페스트가 없으면 None (단일 DB 검색 사용)"""
+    if load_manifest(shard_dir) is None: return None
+    return ShardSet(shard_dir)
+
+
+def bench(shard_dir: str, db_path: str, n_queries: int, limit: int) -> None:
+    """저장된 임베딩을 질의로 써서 단일 DB 검색과 팬아웃 검색 비교 (모델 불필요)"""
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        con.execute("LOAD vss;")
+    except duckdb.Error:
+        pass
+    vectors = [r[0] for r in con.execute(
+        f"SELECT embedding FROM farm_info WHERE embedding IS NOT NULL USING SAMPLE {int(n_queries)} ROWS").fetchall()]
+    shard_set = ShardSet(shard_dir)
+
+    single, fanout, overlap = [], [], []
+    for v in vectors:
+        t0 = time.perf_counter()
+        a = farm_queries.search_documents(con, v, limit=limit, min_score=-1.0)
+        single.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        b = shard_set.search(v, limit=limit, min_score=-1.0)
+        fanout.append(time.perf_counter() - t0)
+        overlap.append(len({r[7] for r in a} & {r[7] for r in b}) / max(len(a), 1))
+    con.close()
+    shard_set.close()
+    ms = lambda xs: np.percentile(np.asarray(xs) * 1000, [50, 95])
+    print(f"🔎 질의 {len(vectors)}개, 샤드 {len(shard_set)}개")
+    print(f"   단일 DB : p50 {ms(single)[0]:.1f}ms / p95 {ms(single)[1]:.1f}ms")
+    print(f"   팬아웃  : p50 {ms(fanout)[0]:.1f}ms / p95 {ms(fanout)[1]:.1f}ms")
+    print(f"   상위 {limit}건 일치율 {np.mean(overlap):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="연도별 검색 샤드")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_build = sub.add_parser('build', help="공개된 DB 에서 바뀐 연도 샤드만 다시 쓰기")
+    p_build.add_argument('--years', type=int, nargs='*', default=None, help="이 연도만 (기본: 전체)")
+    p_build.add_argument('--force', action='store_true', help="지문이 같아도 다시 쓰기")
+    p_bench = sub.add_parser('bench', help="단일 DB 검색과 팬아웃 검색 지연/일치율 비교")
+    p_bench.add_argument('-n', '--queries', type=int, default=50)
+    p_bench.add_argument('-k', '--limit', type=int, default=farm_queries.SEARCH_LIMIT)
+    for p in (p_build, p_bench):
+        p.add_argument('--dir', default=SHARD_DIR)
+        p.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    db_path = args.db or resolve_db_path()
+    if args.cmd == 'build':
+        t0 = time.perf_counter()
+        written, total = sync_shards(db_path, args.dir, years=args.years, force=args.force)
+        print(f"🧩 샤드 {written}/{total}개 갱신 ({time.perf_counter() - t0:.1f}s) -> {manifest_path(args.dir)}")
+    else:
+        bench(args.dir, db_path, args.queries, args.limit)
+
+if __name__ == "__main__":
+    main()
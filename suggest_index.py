@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import heapq
+import argparse
+import duckdb
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Tuple
+from db_publish import clone_current, publish, resolve_db_path
+from hangul import decompose, normalize_query
+import farm_queries
+
+# ==========================================
+# 입력 중 검색어 제안 (활용방안 #10 유사 질문 추천)
+# - 적재 시: 섹션 제목 / 태그 사전 / 검색어 로그 -> suggest_terms(term, kind, weight)
+# - 앱: 메모리의 정렬 배열(자모 분해 키)에서 bisect 로 접두어 구간을 찾고 가중치 상위 k 개
+#   단어 시작 위치마다 키를 하나씩 넣어 '탄저' 로 '고추 탄저병' 도 찾음
+#   짧은 접두어(자모 PRECOMPUTE_DEPTH 개 이하)는 구간이 커서 상위 k 를 미리 계산
+# - 제안을 고른 경우에만 임베딩 + 벡터 검색
+# ==========================================
+QUERY_LOG = os.path.join("logs", "query_log.jsonl")
+
+SUGGEST_K = 8
+PRECOMPUTE_DEPTH = 2
+MIN_TERM_LEN = 2
+KIND_WEIGHT = {'query': 3.0, 'tag': 1.0, 'title': 0.5}   # 실제 검색어를 가장 우대
+
+TERMS_SQL = """
+    WITH titles AS (
+        SELECT trim(regexp_replace({title_expr}, '^제\\s*[0-9]+\\s*장\\s*', '')) as term, COUNT(*) as n
+        FROM farm_info f {title_join}
+        WHERE f.content_md NOT LIKE '%목 차%'
+        GROUP BY 1
+    ),
+    tags AS (
+        SELECT tag as term, COUNT(*) as n FROM (
+            SELECT unnest(list_concat(tags_crop, tags_task, tags_env, tags_pest, tags_admin)) as tag FROM farm_info
+        ) GROUP BY 1
+    ),
+    queries AS (
+        SELECT term, n FROM suggest_query_log
+    ),
+    weighted AS (
+        SELECT term, 'title' as kind, n * {w_title} as weight FROM titles
+        UNION ALL SELECT term, 'tag', n * {w_tag} FROM tags
+        UNION ALL SELECT term, 'query', n * {w_query} FROM queries
+    )
+    SELECT term, arg_max(kind, weight) as kind, sum(weight) as weight
+    FROM weighted
+    WHERE length(term) >= {min_len}
+    GROUP BY term
+    ORDER BY weight DESC, term
+"""
+
+
+# ==========================================
+# 1. 적재 시: 제안어 테이블
+# ==========================================
+def count_logged_queries(path: str = QUERY_LOG) -> Counter:
+    counts: Counter = Counter()
+    if not os.path.exists(path): return counts
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                query = normalize_query(json.loads(line).get('query', ''))
+            except (json.JSONDecodeError, AttributeError):
+                continue
+            if query: counts[query] += 1
+    return counts
+
+def build_suggest_terms(con: duckdb.DuckDBPyConnection, query_log: str = QUERY_LOG) -> int:
+    """suggest_terms 전체 재생성 (제안어 수)"""
+    con.execute("CREATE OR REPLACE TEMP TABLE suggest_query_log (term VARCHAR, n INTEGER)")
+    counts = count_logged_queries(query_log)
+    if counts:
+        con.executemany("INSERT INTO suggest_query_log VALUES (?, ?)", list(counts.items()))
+
+    has_display = farm_queries.has_table(con, 'farm_display')
+    sql = TERMS_SQL.format(
+        title_expr="coalesce(d.clean_title, split_part(f.title, ']', 2))" if has_display else "split_part(f.title, ']', 2)",
+        title_join="LEFT JOIN farm_display d USING (id)" if has_display else "",
+        w_title=KIND_WEIGHT['title'], w_tag=KIND_WEIGHT['tag'], w_query=KIND_WEIGHT['query'],
+        min_len=MIN_TERM_LEN,
+    )
+    con.execute(f"CREATE OR REPLACE TABLE suggest_terms AS {sql}")
+    con.execute("DROP TABLE suggest_query_log")
+    return con.execute("SELECT COUNT(*) FROM suggest_terms").fetchone()[0]
+
+
+# ==========================================
+# 2. 메모리 인덱스
+# ==========================================
+class SuggestIndex:
+    def __init__(self, entries: List[Tuple[str, str, float]], depth: int = PRECOMPUTE_DEPTH, k: int = SUGGEST_K):
+        self.terms = [e[0] for e in entries]
+        self.kinds = [e[1] for e in entries]
+        self.weights = [float(e[2]) for e in entries]
+
+        # 단어 시작 위치마다 (자모 키, 제안어 번호)
+        keyed = []
+        for idx, term in enumerate(self.terms):
+            words = term.split(' ')
+            for w in range(len(words)):
+                keyed.append((decompose(" ".join(words[w:])), idx))
+        keyed.sort()
+        self.keys = [k_ for k_, _ in keyed]
+        self.ids = [i for _, i in keyed]
+
+        # 짧은 접두어는 미리 상위 k 개
+        buckets: Dict[str, set] = {}
+        for key, idx in keyed:
+            for n in range(1, min(depth, len(key)) + 1):
+                buckets.setdefault(key[:n], set()).add(idx)
+        self.depth = depth
+        self.top = {p: self._rank(ids, k) for p, ids in buckets.items()}
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _rank(self, ids, k: int) -> List[int]:
+        return heapq.nlargest(k, ids, key=lambda i: (self.weights[i], -len(self.terms[i])))
+
+    def suggest(self, text: str, k: int = SUGGEST_K) -> List[Tuple[str, str, float]]:
+        """입력 중인 문자열 -> [(제안어, 종류, 가중치), ...]"""
+        key = decompose(normalize_query(text))
+        if not key: return []
+        if len(key) <= self.depth:
+            ids = self.top.get(key, [])[:k]
+        else:
+            lo = bisect_left(self.keys, key)
+            hi = bisect_left(self.keys, key + '\uffff')
+            ids = self._rank(set(self.ids[lo:hi]), k)
+        return [(self.terms[i], self.kinds[i], self.weights[i]) for i in ids]
+
+def load_suggest_index(con: duckdb.DuckDBPyConnection) -> SuggestIndex:
+    if not farm_queries.has_table(con, 'suggest_terms'):
+        return SuggestIndex([])
+    return SuggestIndex(con.execute("SELECT term, kind, weight FROM suggest_terms").fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색어 제안 인덱스")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_build = sub.add_parser('build', help="suggest_terms 재생성 후 새 버전으로 공개")
+    p_build.add_argument('--query-log', default=QUERY_LOG)
+    p_try = sub.add_parser('try', help="제안 결과/지연 확인")
+    p_try.add_argument('prefixes', nargs='+')
+    p_try.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        db_path = clone_current()
+        con = duckdb.connect(db_path)
+        # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+        con.execute("LOAD vss;")
+        con.execute("SET hnsw_enable_experimental_persistence = true;")
+        t0 = time.perf_counter()
+        n = build_suggest_terms(con, args.query_log)
+        con.execute("CHECKPOINT")
+        con.close()
+        print(f"💡 제안어 {n}개 ({time.perf_counter() - t0:.1f}s)")
+        publish(db_path)
+        return
+
+    con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+    t0 = time.perf_counter()
+    index = load_suggest_index(con)
+    con.close()
+    print(f"📚 제안어 {len(index)}개, 키 {len(index.keys)}개 로드 ({time.perf_counter() - t0:.2f}s)")
+    for prefix in args.prefixes:
+        t0 = time.perf_counter()
+        result = index.suggest(prefix)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        print(f"'{prefix}' ({elapsed_ms:.3f}ms): " + ", ".join(f"{t}[{k}]" for t, k, _ in result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import sys
+import random
+import hashlib
+import argparse
+import numpy as np
+from datetime import date, timedelta
+from typing import Iterator, List, Union
+
+# ==========================================
+# 합성 주간농사정보 코퍼스 생성기 (결정적)
+# - 실제 weekly.md 와 같은 모양: '# [YYYY-MM-DD~YYYY-MM-DD] 제n장 ...' 헤더,
+#   태그 사전 단어가 섞인 한국어 본문, 기상 표, 도트 리더가 있는 요약 표
+# - 같은 seed/scale 이면 바이트 단위로 같은 파일 -> 커밋 간 벤치마크 비교 가능
+# ==========================================
+START_DATE = date(2023, 1, 2)
+
+CHAPTERS = ["요 약", "기상 전망", "벼", "밭작물", "채소", "과수", "화훼", "특용작물", "축산", "양봉"]
+
+CROPS = ["벼", "보리", "밀", "콩", "옥수수", "감자", "고구마", "고추", "배추", "무", "마늘", "양파",
+         "오이", "토마토", "딸기", "수박", "복숭아", "사과", "배", "포도", "인삼", "오미자", "꿀벌", "돼지", "닭"]
+TASKS = ["파종", "육묘", "정식", "이앙", "물관리", "제초", "전정", "적과", "방제", "수확", "건조", "저장", "방역"]
+ENVS = ["기상전망", "태풍", "장마", "가뭄", "폭염", "동해", "냉해", "집중호우", "일조량", "시설하우스", "월동관리"]
+PESTS = ["탄저병", "도열병", "흰가루병", "과수화상병", "진딧물", "응애", "총채벌레", "멸구", "구제역"]
+REGIONS = ["중부", "남부", "동해안", "제주", "강원 산간"]
+
+SENTENCES = [
+    "{crop}는 {task} 시기를 놓치지 않도록 합니다.",
+    "{env}에 대비하여 {crop} 포장의 배수로를 정비하고 {task} 작업을 서두릅니다.",
+    "{pest} 발생이 늘고 있으니 {crop} 재배 농가는 예찰과 {task}를 철저히 합니다.",
+    "최근 {env} 영향으로 {crop} 생육이 부진하므로 웃거름을 주고 {task}에 유의합니다.",
+    "{crop} 시설 재배 시 낮 기온이 {temp}℃ 이상 오르면 환기하고, 밤에는 {low}℃ 이하로 내려가지 않도록 보온합니다.",
+    "{pest} 방제는 등록된 약제를 사용하고 PLS 기준을 지켜 살포합니다.",
+]
+
+
+def _week_range(week_no: int) -> str:
+    start = START_DATE + timedelta(weeks=week_no)
+    end = start + timedelta(days=6)
+    return f"{start.isoformat()}~{end.isoformat()}"
+
+def _paragraph(rng: random.Random, n: int) -> str:
+    lines = []
+    for _ in range(n):
+        lines.append("- " + rng.choice(SENTENCES).format(
+            crop=rng.choice(CROPS), task=rng.choice(TASKS), env=rng.choice(ENVS), pest=rng.choice(PESTS),
+            temp=rng.randint(25, 35), low=rng.randint(-5, 10)
+        ))
+    return "\n".join(lines)
+
+def _weather_table(rng: random.Random) -> str:
+    rows = ["| 지역 | 평균기온(℃) | 강수량(mm) | 습도(%) |", "|---|---|---|---|"]
+    for region in REGIONS:
+        t = round(rng.uniform(-8, 30), 1)
+        rows.append(f"| {region} | {t}(평년 {round(t + rng.uniform(-2, 2), 1)}) | {rng.randint(0, 150)} | {rng.randint(40, 95)} |")
+    return "\n".join(rows)
+
+def _summary_table(rng: random.Random) -> str:
+    rows = ["| 구분 | 주요 내용 | 쪽 |"]
+    for i, chapter in enumerate(CHAPTERS[2:], start=1):
+        rows.append(f"| 제{i}장 | {chapter} {rng.choice(TASKS)} ······ | {i * 3} |")
+    return "\n".join(rows)
+
+def iter_sections(n_sections: int, seed: int = 0) -> Iterator[str]:
+    """섹션 단위 마크다운을 순서대로 생성 (메모리 사용량은 섹션 1개 분량)"""
+    rng = random.Random(seed)
+    produced = 0
+    week_no = 0
+    while produced < n_sections:
+        w_range = _week_range(week_no)
+        for n, chapter in enumerate(CHAPTERS):
+            if produced >= n_sections: break
+            header = f"# [{w_range}] 제{n}장 {chapter}"
+            if chapter == "요 약":
+                body = f"## 이번 주 중점 관리\n{_summary_table(rng)}\n{_paragraph(rng, 3)}"
+            elif chapter == "기상 전망":
+                body = f"## 기상 전망\n{_weather_table(rng)}\n{_paragraph(rng, 2)}"
+            else:
+                body = f"## {chapter} 관리\n{_paragraph(rng, rng.randint(3, 8))}"
+            yield f"{header}\n{body}\n"
+            produced += 1
+        week_no += 1
+
+def write_corpus(path: str, n_sections: int, seed: int = 0) -> int:
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for section in iter_sections(n_sections, seed):
+            f.write(section)
+            f.write("\n")
+            written += 1
+    return written
+
+
+class HashEncoder:
+    """네트워크/모델 없이 쓰는 결정적 인코더 (SentenceTransformer.encode 와 같은 호출 형태)
+
+    글자 2-gram 해시 버킷의 빈도 벡터. 의미 검색 품질은 없지만 차원/비용 모양이 같아서
+    적재·SQL·행렬 연산 단계의 성능 측정에 쓴다.
+    """
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single: texts = [texts]
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for j in range(len(text) - 1):
+                h = int.from_bytes(hashlib.blake2b(text[j:j + 2].encode('utf-8'), digest_size=4).digest(), 'little')
+                out[i, h % self.dim] += 1.0
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 주간농사정보 마크다운 생성")
+    parser.add_argument('-n', '--sections', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='-')
+    args = parser.parse_args()
+
+    if args.output == '-':
+        for section in iter_sections(args.sections, args.seed):
+            sys.stdout.write(section + "\n")
+    else:
+        count = write_corpus(args.output, args.sections, args.seed)
+        print(f"✅ {count}개 섹션 생성 -> {args.output}")
@@ -0,0 +1,124 @@
+import time
+import argparse
+import duckdb
+from typing import Tuple
+from db_publish import clone_current, publish
+from category_classifier import detect_category
+from farm_queries import week_no_sql
+
+# ==========================================
+# 태그 트렌드 큐브 (활용방안 #3 병해충 발생 트렌드)
+# - tag_trend: (태그 종류, 태그, 분류, 연도, 주차) -> 언급 섹션 수
+# - tag_first_mention: 연도별 첫 언급 주차 (큐브 위의 뷰, 큐브가 작아서 즉시 계산)
+# - 증분 유지: 주차별 (행 수, id 합) 지문을 tag_trend_weeks 에 저장해 두고
+#   지문이 달라진 주차(추가/삭제/재게시)만 다시 집계 -> 주간 추가 시 1주 분량만 계산
+# ==========================================
+TAG_TYPES = ['crop', 'task', 'env', 'pest', 'admin']
+WEEK_EXPR = "regexp_extract(title, '\\[(.*?)\\]', 1)"
+
+
+def init_cube(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS tag_trend (
+            tag_type VARCHAR, tag VARCHAR, category VARCHAR,
+            year INTEGER, week INTEGER, week_range VARCHAR, week_start DATE,
+            mentions INTEGER
+        )
+    """)
+    init_week_fingerprints(con, 'tag_trend_weeks')
+    con.execute("""
+        CREATE OR REPLACE VIEW tag_first_mention AS
+        SELECT tag_type, tag, category, year, min(week_start) as first_week_start, min(week) as first_week
+        FROM tag_trend GROUP BY ALL
+    """)
+
+def _register_classifier(con: duckdb.DuckDBPyConnection) -> None:
+    # 섹션 분류는 변환기와 같은 규칙 (category_classifier, 헤더별 캐시)
+    try:
+        con.create_function('section_category', lambda t: detect_category(t.split(']')[-1]), ['VARCHAR'], 'VARCHAR')
+    except duckdb.Error:
+        pass  # 같은 연결에서 이미 등록됨
+
+def init_week_fingerprints(con: duckdb.DuckDBPyConnection, state_table: str) -> None:
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {state_table} (
+            week_range VARCHAR PRIMARY KEY, n_rows BIGINT, id_sum HUGEINT
+        )
+    """)
+
+def stage_changed_weeks(con: duckdb.DuckDBPyConnection, state_table: str, temp_table: str) -> int:
+    """현재 farm_info 와 저장된 지문이 다른 주차 -> TEMP temp_table(week_range, n_rows, id_sum). 삭제된 주차는 n_rows NULL"""
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {temp_table} AS
+        WITH cur AS (
+            SELECT {WEEK_EXPR} as week_range, COUNT(*) as n_rows, SUM(id)::HUGEINT as id_sum
+            FROM farm_info GROUP BY 1
+        )
+        SELECT coalesce(cur.week_range, old.week_range) as week_range, cur.n_rows, cur.id_sum
+        FROM cur FULL OUTER JOIN {state_table} old USING (week_range)
+        WHERE cur.n_rows IS DISTINCT FROM old.n_rows OR cur.id_sum IS DISTINCT FROM old.id_sum
+    """)
+    return con.execute(f"SELECT COUNT(*) FROM {temp_table}").fetchone()[0]
+
+def save_week_fingerprints(con: duckdb.DuckDBPyConnection, state_table: str, temp_table: str) -> None:
+    con.execute(f"DELETE FROM {state_table} WHERE week_range IN (SELECT week_range FROM {temp_table})")
+    con.execute(f"""
+        INSERT INTO {state_table}
+        SELECT week_range, n_rows, id_sum FROM {temp_table} WHERE n_rows IS NOT NULL
+    """)
+
+def refresh_trend_cube(con: duckdb.DuckDBPyConnection, full: bool = False) -> Tuple[int, int]:
+    """지문이 바뀐 주차만 다시 집계 (다시 집계한 주차 수, 큐브 전체 행 수)"""
+    init_cube(con)
+    _register_classifier(con)
+    if full:
+        con.execute("DELETE FROM tag_trend")
+        con.execute("DELETE FROM tag_trend_weeks")
+
+    changed = stage_changed_weeks(con, 'tag_trend_weeks', 'trend_changed')
+    if changed:
+        con.execute("DELETE FROM tag_trend WHERE week_range IN (SELECT week_range FROM trend_changed)")
+        tag_union = "\nUNION ALL\n".join(
+            f"SELECT id, '{t}' as tag_type, unnest(tags_{t}) as tag FROM farm_info WHERE {WEEK_EXPR} IN (SELECT week_range FROM trend_changed)"
+            for t in TAG_TYPES
+        )
+        con.execute(f"""
+            INSERT INTO tag_trend
+            WITH sections AS (
+                SELECT id, year, {WEEK_EXPR} as week_range, section_category(title) as category
+                FROM farm_info WHERE {WEEK_EXPR} IN (SELECT week_range FROM trend_changed)
+            ),
+            tags AS ({tag_union})
+            SELECT t.tag_type, t.tag, s.category, s.year,
+                   {week_no_sql('w.week_start')} as week, s.week_range, w.week_start,
+                   COUNT(DISTINCT t.id) as mentions
+            FROM tags t JOIN sections s USING (id),
+                 LATERAL (SELECT try_strptime(split_part(s.week_range, '~', 1), '%Y-%m-%d')::DATE as week_start) w
+            WHERE t.tag IS NOT NULL
+            GROUP BY ALL
+            ORDER BY t.tag_type, t.tag, s.year, week
+        """)
+        save_week_fingerprints(con, 'tag_trend_weeks', 'trend_changed')
+    con.execute("DROP TABLE IF EXISTS trend_changed")
+    return changed, con.execute("SELECT COUNT(*) FROM tag_trend").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="태그 트렌드 큐브 갱신 후 새 버전으로 공개")
+    parser.add_argument('--full', action='store_true', help="전체 다시 집계")
+    args = parser.parse_args()
+
+    db_path = clone_current()
+    con = duckdb.connect(db_path)
+    # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    t0 = time.perf_counter()
+    changed, rows = refresh_trend_cube(con, full=args.full)
+    con.execute("CHECKPOINT")
+    con.close()
+    print(f"📈 트렌드 큐브: {changed}개 주차 재집계, 전체 {rows}행 ({time.perf_counter() - t0:.2f}s)")
+    publish(db_path)
+
+if __name__ == "__main__":
+    main()
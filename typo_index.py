@@ -0,0 +1,203 @@
+import time
+import argparse
+import duckdb
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from db_publish import clone_current, publish, resolve_db_path
+from hangul import decompose, normalize_query
+import farm_queries
+
+# ==========================================
+# 오타 보정 (휴대폰 입력 오타: '탄져병' -> '탄저병', '응에' -> '응애')
+# - 적재 시: 태그 사전 / 섹션 제목 / 본문 주요 단어 -> typo_vocab(word, weight)
+#   검색어 로그는 오타가 섞여 있으므로 사전에 넣지 않음
+# - 앱: 단어를 자모로 분해한 2-gram 역색인(길이별)으로 후보를 좁히고
+#   공유 gram 수 하한(q-gram 보조정리) -> 자모 편집 거리(길이별 상한 max_edits) 확인
+# - 사전에 없는 단어만 가장 가까운 단어로 바꾼 뒤 임베딩/검색 (모델 추가 호출 없음)
+# ==========================================
+GRAM = 2
+MIN_WORD_LEN = 2
+MIN_DOC_FREQ = 3          # 본문 단어는 이 문서 수 이상에서 나온 것만
+KIND_WEIGHT = {'tag': 3.0, 'title': 2.0, 'content': 1.0}
+WORD_SPLIT = '[^가-힣A-Za-z0-9]+'
+
+VOCAB_SQL = """
+    WITH tags AS (
+        SELECT word, COUNT(*) as n FROM (
+            SELECT unnest(string_split(tag, ' ')) as word FROM (
+                SELECT unnest(list_concat(tags_crop, tags_task, tags_env, tags_pest, tags_admin)) as tag FROM farm_info
+            )
+        ) GROUP BY 1
+    ),
+    titles AS (
+        SELECT word, COUNT(*) as n FROM (
+            SELECT unnest(regexp_split_to_array({title_expr}, '{split}')) as word
+            FROM farm_info f {title_join}
+        ) GROUP BY 1
+    ),
+    content AS (
+        SELECT word, COUNT(DISTINCT id) as n FROM (
+            SELECT id, unnest(regexp_split_to_array(content_md, '{split}')) as word
+            FROM farm_info WHERE content_md NOT LIKE '%목 차%'
+        ) GROUP BY 1 HAVING COUNT(DISTINCT id) >= {min_df}
+    ),
+    weighted AS (
+        SELECT lower(word) as word, n * {w_tag} as weight FROM tags
+        UNION ALL SELECT lower(word), n * {w_title} FROM titles
+        UNION ALL SELECT lower(word), n * {w_content} FROM content
+    )
+    SELECT word, sum(weight)::DOUBLE as weight
+    FROM weighted
+    WHERE length(word) >= {min_len} AND NOT regexp_full_match(word, '[0-9]+')
+    GROUP BY word
+    ORDER BY word
+"""
+
+
+# ==========================================
+# 1. 적재 시: 단어 사전
+# ==========================================
+def build_typo_vocab(con: duckdb.DuckDBPyConnection) -> int:
+    """typo_vocab 전체 재생성 (단어 수)"""
+    has_display = farm_queries.has_table(con, 'farm_display')
+    sql = VOCAB_SQL.format(
+        title_expr="coalesce(d.clean_title, split_part(f.title, ']', 2))" if has_display else "split_part(f.title, ']', 2)",
+        title_join="LEFT JOIN farm_display d USING (id)" if has_display else "",
+        split=WORD_SPLIT, min_df=MIN_DOC_FREQ, min_len=MIN_WORD_LEN,
+        w_tag=KIND_WEIGHT['tag'], w_title=KIND_WEIGHT['title'], w_content=KIND_WEIGHT['content'],
+    )
+    con.execute(f"CREATE OR REPLACE TABLE typo_vocab AS {sql}")
+    return con.execute("SELECT COUNT(*) FROM typo_vocab").fetchone()[0]
+
+
+# ==========================================
+# 2. 메모리 인덱스
+# ==========================================
+def max_edits(key_len: int) -> int:
+    """자모 길이별 허용 편집 수 (짧은 단어는 보정하지 않음)"""
+    if key_len <= 3: return 0
+    if key_len <= 6: return 1
+    return 2
+
+def jamo_grams(key: str) -> List[str]:
+    """양 끝을 표시한 자모 2-gram, 같은 gram 은 등장 순번을 붙여 집합 교집합 = 다중집합 교집합"""
+    padded = f"^{key}$"
+    seen: Counter = Counter()
+    grams = []
+    for i in range(len(padded) - GRAM + 1):
+        g = padded[i:i + GRAM]
+        grams.append(f"{g}{seen[g]}")
+        seen[g] += 1
+    return grams
+
+def bounded_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """편집 거리, limit 를 넘으면 None (행 최솟값이 limit 를 넘으면 바로 중단)"""
+    if abs(len(a) - len(b)) > limit: return None
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > limit: return None
+        prev = cur
+    return prev[-1] if prev[-1] <= limit else None
+
+class TypoIndex:
+    def __init__(self, entries: List[Tuple[str, float]]):
+        self.words = [e[0] for e in entries]
+        self.weights = [float(e[1]) for e in entries]
+        self.keys = [decompose(w) for w in self.words]
+        self.exact = set(self.words)
+        self.gram_sets = [frozenset(jamo_grams(key)) for key in self.keys]
+        # (자모 길이, gram) -> 단어 번호
+        self.postings: Dict[Tuple[int, str], List[int]] = {}
+        for idx, key in enumerate(self.keys):
+            for g in self.gram_sets[idx]:
+                self.postings.setdefault((len(key), g), []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def correct(self, word: str) -> Optional[str]:
+        """사전에 없는 단어 -> 편집 거리가 가장 작은(같으면 가중치 큰) 사전 단어, 없으면 None"""
+        word = word.lower()
+        if word in self.exact: return None
+        key = decompose(word)
+        k = max_edits(len(key))
+        if k == 0: return None
+
+        grams = jamo_grams(key)
+        lengths = range(len(key) - k, len(key) + k + 1)
+        # 편집 1회는 2-gram 을 최대 GRAM 개 깨뜨림 -> 후보는 적어도 len(grams) - GRAM * k 개를 공유
+        # 그러면 가장 드문 gram GRAM * k + 1 개 중 하나는 반드시 공유 (prefix filter) -> 그 목록만 훑음
+        sizes = {g: sum(len(self.postings.get((n, g), ())) for n in lengths) for g in grams}
+        candidates = set()
+        for g in sorted(grams, key=sizes.get)[:GRAM * k + 1]:
+            for n in lengths:
+                candidates.update(self.postings.get((n, g), ()))
+
+        query_grams = set(grams)
+        best = None
+        for idx in candidates:
+            cand_key = self.keys[idx]
+            if len(self.gram_sets[idx] & query_grams) < max(len(grams), len(cand_key) + 1) - GRAM * k: continue
+            dist = bounded_distance(key, cand_key, k)
+            if dist is None: continue
+            rank = (dist, -self.weights[idx])
+            if best is None or rank < best[0]:
+                best = (rank, idx)
+        return self.words[best[1]] if best else None
+
+    def rewrite(self, query: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """검색어 -> (보정된 검색어, [(원래 단어, 바꾼 단어), ...])"""
+        words = normalize_query(query).split(' ')
+        fixes = []
+        for i, w in enumerate(words):
+            fixed = self.correct(w) if w else None
+            if fixed:
+                fixes.append((w, fixed))
+                words[i] = fixed
+        return " ".join(words), fixes
+
+def load_typo_index(con: duckdb.DuckDBPyConnection) -> TypoIndex:
+    if not farm_queries.has_table(con, 'typo_vocab'):
+        return TypoIndex([])
+    return TypoIndex(con.execute("SELECT word, weight FROM typo_vocab").fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오타 보정 사전")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('build', help="typo_vocab 재생성 후 새 버전으로 공개")
+    p_try = sub.add_parser('try', help="보정 결과/지연 확인")
+    p_try.add_argument('queries', nargs='+')
+    p_try.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        db_path = clone_current()
+        con = duckdb.connect(db_path)
+        # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+        con.execute("LOAD vss;")
+        con.execute("SET hnsw_enable_experimental_persistence = true;")
+        t0 = time.perf_counter()
+        n = build_typo_vocab(con)
+        con.execute("CHECKPOINT")
+        con.close()
+        print(f"🔤 오타 보정 사전 {n}단어 ({time.perf_counter() - t0:.1f}s)")
+        publish(db_path)
+        return
+
+    con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+    t0 = time.perf_counter()
+    index = load_typo_index(con)
+    con.close()
+    print(f"📚 사전 {len(index)}단어, gram {len(index.postings)}개 로드 ({time.perf_counter() - t0:.2f}s)")
+    for query in args.queries:
+        t0 = time.perf_counter()
+        fixed, fixes = index.rewrite(query)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        print(f"'{query}' -> '{fixed}' ({elapsed_ms:.3f}ms) " + ", ".join(f"{a}->{b}" for a, b in fixes))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import time
+import argparse
+import duckdb
+from db_publish import clone_current, publish
+
+# ==========================================
+# 기상 표 -> 숫자 시계열 (weather_series)
+# - '기상' 섹션의 파이프 표를 적재 시 DuckDB 에서 한 번에 파싱 (줄 분리/셀 분리/숫자 추출 모두 SQL)
+#   debug_chart.py 의 '렌더링 때마다 표 파싱 + 셀마다 re.findall' 을 대체
+# - 헤더에 기온/온도/강수/습도가 있는 열만: (주차, 지역, 지표) 당 1행, 괄호 안 평년값은 normal 로 분리
+# - 대시보드는 weather_series 에 숫자 쿼리만 실행해 연도별 비교 차트를 그림
+# ==========================================
+METRIC_LABELS = {
+    'temp': '평균기온(℃)', 'temp_max': '최고기온(℃)', 'temp_min': '최저기온(℃)',
+    'precip': '강수량(mm)', 'humidity': '습도(%)',
+}
+NUM = r'-?[0-9]+(?:\.[0-9]+)?'
+NUMBER = rf'(?:^|[^0-9.])({NUM})'   # '10-15' 같은 범위의 '-' 는 부호로 읽지 않음
+
+BUILD_SQL = f"""
+    CREATE OR REPLACE TABLE weather_series AS
+    WITH split AS (
+        SELECT id, year, month, regexp_extract(title, '\\[(.*?)\\]', 1) AS week_range,
+               string_split(content_md, chr(10)) AS lines
+        FROM farm_info
+        WHERE title LIKE '%기상%' AND content_md LIKE '%|%'
+    ),
+    lines AS (
+        SELECT id, year, month, week_range, unnest(range(1, len(lines) + 1)) AS line_no, unnest(lines) AS line
+        FROM split
+    ),
+    pipe AS (
+        -- 연속된 파이프 줄 = 표 1개 (줄 번호 - 파이프 줄 순번 이 같으면 같은 표)
+        SELECT *, line_no - row_number() OVER (PARTITION BY id ORDER BY line_no) AS block,
+               list_transform(string_split(trim(trim(line), '|'), '|'), c -> trim(c)) AS cells
+        FROM lines
+        WHERE contains(line, '|')
+    ),
+    table_rows AS (
+        SELECT *, row_number() OVER (PARTITION BY id, block ORDER BY line_no) AS row_in_block
+        FROM pipe
+        WHERE len(list_filter(cells, c -> NOT regexp_full_match(c, ':?-*:?'))) > 0   -- 구분선/빈 행 제외
+    ),
+    headers AS (
+        SELECT id, block, cells AS header
+        FROM table_rows
+        WHERE row_in_block = 1 AND regexp_matches(array_to_string(cells, ' '), '기온|온도|강수|습도')
+    ),
+    cells AS (
+        SELECT r.id, r.year, r.month, r.week_range, r.cells[1] AS region, h.header, r.cells,
+               unnest(range(2, len(h.header) + 1)) AS col
+        FROM table_rows r JOIN headers h USING (id, block)
+        WHERE r.row_in_block > 1
+    ),
+    parsed AS (
+        SELECT id, year, month, week_range, region,
+               replace(header[col], ' ', '') AS label,
+               cells[col] AS raw
+        FROM cells
+        WHERE col <= len(cells) AND regexp_matches(header[col], '기온|온도|강수|습도')
+    )
+    SELECT * FROM (
+    SELECT id, year, month, week_range,
+           try_strptime(split_part(week_range, '~', 1), '%Y-%m-%d')::DATE AS week_start,
+           region,
+           CASE WHEN contains(label, '강수') THEN 'precip'
+                WHEN contains(label, '습도') THEN 'humidity'
+                WHEN contains(label, '최고') THEN 'temp_max'
+                WHEN contains(label, '최저') THEN 'temp_min'
+                ELSE 'temp' END AS metric,
+           label,
+           list_avg(list_transform(
+               regexp_extract_all(regexp_replace(raw, '\\(.*?\\)', '', 'g'), '{NUMBER}', 1), x -> x::DOUBLE
+           )) AS value,
+           TRY_CAST(NULLIF(regexp_extract(raw, '평년\\s*({NUM})', 1), '') AS DOUBLE) AS normal
+    FROM parsed
+    WHERE region <> ''
+    )
+    WHERE value IS NOT NULL
+    ORDER BY metric, week_start, region
+"""
+
+
+def build_weather_series(con: duckdb.DuckDBPyConnection) -> int:
+    """weather_series 전체 재생성 (지표/주차 순으로 정렬해 저장 -> 구간 조회 시 zonemap 으로 블록 건너뜀)"""
+    con.execute(BUILD_SQL)
+    con.execute("CREATE INDEX IF NOT EXISTS weather_series_idx ON weather_series (metric, region)")
+    return con.execute("SELECT COUNT(*) FROM weather_series").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기상 표를 weather_series 로 추출한 뒤 새 버전으로 공개")
+    parser.parse_args()
+
+    db_path = clone_current()
+    con = duckdb.connect(db_path)
+    # farm_info 에 HNSW 인덱스가 있으므로 vss 를 올린 상태로 기록/체크포인트
+    con.execute("LOAD vss;")
+    con.execute("SET hnsw_enable_experimental_persistence = true;")
+    t0 = time.perf_counter()
+    n = build_weather_series(con)
+    summary = con.execute("SELECT metric, COUNT(*), COUNT(DISTINCT region) FROM weather_series GROUP BY 1 ORDER BY 1").fetchall()
+    con.execute("CHECKPOINT")
+    con.close()
+    print(f"🌡️ 기상 시계열 {n}행 ({time.perf_counter() - t0:.1f}s)")
+    for metric, rows, regions in summary:
+        print(f"   - {METRIC_LABELS.get(metric, metric)}: {rows}행, 지역 {regions}곳")
+    publish(db_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import os
+import time
+import argparse
+import duckdb
+from datetime import date, datetime
+from typing import Optional, Tuple
+from db_publish import resolve_db_path
+from content_render import RENDER_VERSION
+import farm_queries
+
+# ==========================================
+# 주간 영농 알림 일괄 생성 (활용방안 #2)
+# - 구독자 파일(작목, 지역, 채널)을 DuckDB 로 읽어 대상 주차는 한 번만 계산
+# - (작목 조합, 지역, 채널) 이 같은 구독자는 본문이 같으므로 '프로필' 단위로 한 번만 렌더링
+#   -> 구독자 10만 명이어도 프로필 수(수백~수천)만큼만 문자열 조립, 나머지는 조인
+# - 본문은 적재 시 렌더링된 farm_display 사용 (없거나 구버전이면 원문)
+# - 결과는 outbox 파일(JSONL/Parquet) 로 COPY -> 발송기는 파일만 읽음
+# ==========================================
+OUTBOX_DIR = "outbox"
+SHORT_CHANNELS = ['sms', 'kakao']   # 나머지(email 등)는 전체 본문
+DEFAULT_CHANNEL = 'sms'
+SHORT_SECTIONS = 3
+SHORT_EXCERPT = 60
+MATCH_WINDOW_DAYS = 7   # 최신 연도에 이만큼 가까운 주차가 없으면 더 이전 연도에서 찾음
+
+TARGET_WEEK_SQL = """
+    WITH weeks AS (
+        SELECT DISTINCT year, regexp_extract(title, '\\[(.*?)\\]', 1) as week_range
+        FROM farm_info
+        WHERE ? IS NULL OR year = ?
+    ),
+    dated AS (
+        SELECT year, week_range,
+               try_strptime(split_part(week_range, '~', 1), '%Y-%m-%d')::DATE as week_start
+        FROM weeks WHERE week_range <> ''
+    )
+    SELECT year, week_range,
+           abs(date_diff('day', (week_start + to_years(year(?::DATE) - year))::DATE, ?::DATE)) as diff
+    FROM dated
+    WHERE week_start IS NOT NULL
+    ORDER BY (diff <= ?) DESC, year DESC, diff
+    LIMIT 1
+"""
+
+
+def pick_target_week(con: duckdb.DuckDBPyConnection, target: date,
+                     year: Optional[int] = None) -> Optional[Tuple[int, str]]:
+    """대시보드와 같은 기준: 과거 연도 중 날짜(월/일)가 가장 가까운 주차 (최신 연도 우선)"""
+    row = con.execute(TARGET_WEEK_SQL, [year, year, target, target, MATCH_WINDOW_DAYS]).fetchone()
+    return (row[0], row[1]) if row else None
+
+def load_subscribers(con: duckdb.DuckDBPyConnection, path: str) -> int:
+    """CSV/Parquet/JSONL -> TEMP subscribers(subscriber_id, crops VARCHAR[], region, channel)"""
+    safe_path = path.replace("'", "''")
+    if path.endswith('.parquet'):
+        reader = f"read_parquet('{safe_path}')"
+    elif path.endswith(('.jsonl', '.json')):
+        reader = f"read_json_auto('{safe_path}')"
+    else:
+        reader = f"read_csv_auto('{safe_path}')"
+    con.execute(f"CREATE OR REPLACE TEMP TABLE raw_subscribers AS SELECT * FROM {reader}")
+
+    # crops 는 리스트 컬럼 또는 '고추;마늘' 같은 구분자 문자열
+    crops_type = {r[0]: r[1] for r in con.execute("DESCRIBE raw_subscribers").fetchall()}.get('crops', 'VARCHAR')
+    crops_expr = "crops::VARCHAR[]" if crops_type.endswith('[]') else \
+        "list_filter(list_transform(string_split_regex(coalesce(crops, ''), '[;,|/]'), c -> trim(c)), c -> c <> '')"
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE subscribers AS
+        SELECT subscriber_id,
+               list_sort(list_distinct({crops_expr})) as crops,
+               nullif(trim(region), '') as region,
+               lower(coalesce(nullif(trim(channel), ''), '{DEFAULT_CHANNEL}')) as channel
+        FROM raw_subscribers
+    """)
+    con.execute("DROP TABLE raw_subscribers")
+    return con.execute("SELECT COUNT(*) FROM subscribers").fetchone()[0]
+
+def render_profiles(con: duckdb.DuckDBPyConnection, year: int, week_range: str) -> int:
+    """프로필(작목 조합, 지역, 채널) 별 알림 본문 -> TEMP alert_profiles"""
+    display = ("CASE WHEN d.render_version = {v} THEN d.display_md END".format(v=RENDER_VERSION)
+               if farm_queries.has_table(con, 'farm_display') else "NULL")
+    display_join = "LEFT JOIN farm_display d USING (id)" if farm_queries.has_table(con, 'farm_display') else ""
+    clean_title = "d.clean_title" if display_join else "NULL"
+    # 지역 날씨 한 줄 (weather_series 가 있을 때만)
+    weather_cte = weather_join = ""
+    weather_line = "''"
+    if farm_queries.has_table(con, 'weather_series'):
+        weather_cte = """,
+        weather AS (
+            SELECT region,
+                   avg(value) FILTER (WHERE metric = 'temp') as temp,
+                   avg(value) FILTER (WHERE metric = 'precip') as precip
+            FROM weather_series WHERE week_range = $week GROUP BY 1
+        )"""
+        weather_join = "LEFT JOIN weather w ON w.region = p.region"
+        weather_line = """CASE WHEN w.temp IS NOT NULL OR w.precip IS NOT NULL THEN
+                   '🌡️ ' || p.region || ' ' || concat_ws(', ',
+                       CASE WHEN w.temp IS NOT NULL THEN '평균기온 ' || round(w.temp, 1) || '℃' END,
+                       CASE WHEN w.precip IS NOT NULL THEN '강수량 ' || round(w.precip, 1) || 'mm' END) || chr(10)
+               ELSE '' END"""
+
+    short = ", ".join(f"'{c}'" for c in SHORT_CHANNELS)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE alert_profiles AS
+        WITH sections AS (
+            SELECT f.id, f.tags_crop,
+                   coalesce({clean_title}, trim(split_part(f.title, ']', 2))) as clean_title,
+                   coalesce({display}, f.content_md) as body,
+                   (f.title LIKE '%요약%' OR f.title LIKE '%요 약%') as is_summary
+            FROM farm_info f {display_join}
+            WHERE f.year = $year AND f.title LIKE '%' || $week || '%'
+              AND f.content_md NOT LIKE '%목 차%' AND f.title NOT LIKE '%기상%'
+        ),
+        profiles AS (
+            SELECT DISTINCT crops, region, channel FROM subscribers
+        ){weather_cte},
+        matched AS (
+            -- 요약은 모두에게, 나머지는 구독 작목 태그가 겹치는 섹션만
+            SELECT p.crops, p.region, p.channel, s.id, s.clean_title, s.body, s.is_summary
+            FROM profiles p JOIN sections s
+              ON s.is_summary OR list_has_any(s.tags_crop, p.crops)
+        ),
+        bodies AS (
+            SELECT crops, region, channel, COUNT(*) as n_sections,
+                   CASE WHEN channel IN ({short}) THEN
+                        array_to_string(list('· ' || clean_title || ': ' ||
+                            left(trim(regexp_replace(body, '[#|*\\s]+', ' ', 'g')), {SHORT_EXCERPT})
+                            ORDER BY is_summary DESC, id)[1:{SHORT_SECTIONS}], chr(10))
+                   ELSE
+                        string_agg('## ' || clean_title || chr(10) || chr(10) || body, chr(10) || chr(10)
+                                   ORDER BY is_summary DESC, id)
+                   END as sections_text
+            FROM matched
+            GROUP BY crops, region, channel
+        )
+        SELECT p.crops, p.region, p.channel, coalesce(b.n_sections, 0) as n_sections,
+               {weather_line} || coalesce(b.sections_text, '') as body
+        FROM profiles p
+        LEFT JOIN bodies b ON b.crops = p.crops AND b.region IS NOT DISTINCT FROM p.region AND b.channel = p.channel
+        {weather_join}
+    """, {'year': int(year), 'week': week_range})
+    return con.execute("SELECT COUNT(*) FROM alert_profiles").fetchone()[0]
+
+def write_outbox(con: duckdb.DuckDBPyConnection, out_path: str, subject: str, week_range: str) -> int:
+    """구독자 x 프로필 본문 조인을 그대로 파일로 COPY (본문이 빈 구독자는 제외)"""
+    fmt = "PARQUET" if out_path.endswith('.parquet') else "JSON"
+    safe_path = out_path.replace("'", "''")
+    safe_subject = subject.replace("'", "''")
+    safe_week = week_range.replace("'", "''")
+    con.execute(f"""
+        COPY (
+            SELECT s.subscriber_id, s.channel, s.region, s.crops,
+                   '{safe_subject}' as subject, p.body, p.n_sections, '{safe_week}' as source_week
+            FROM subscribers s
+            JOIN alert_profiles p
+              ON p.crops = s.crops AND p.region IS NOT DISTINCT FROM s.region AND p.channel = s.channel
+            WHERE p.n_sections > 0
+            ORDER BY s.subscriber_id
+        ) TO '{safe_path}' (FORMAT {fmt})
+    """)
+    return con.execute("""
+        SELECT COUNT(*) FROM subscribers s JOIN alert_profiles p
+          ON p.crops = s.crops AND p.region IS NOT DISTINCT FROM s.region AND p.channel = s.channel
+        WHERE p.n_sections > 0
+    """).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="구독자별 주간 영농 알림 일괄 생성 -> outbox 파일")
+    parser.add_argument('subscribers', help="구독자 파일 (.csv/.parquet/.jsonl: subscriber_id, crops, region, channel)")
+    parser.add_argument('-o', '--output', default=None, help="기본값: outbox/alerts_<날짜>.jsonl (.parquet 가능)")
+    parser.add_argument('--date', default=None, help="기준 날짜 YYYY-MM-DD (기본값: 오늘)")
+    parser.add_argument('--year', type=int, default=None, help="지침을 가져올 연도 (기본값: 가까운 주차가 있는 최신 연도)")
+    parser.add_argument('--db', default=None, help="기본값: 현재 공개된 버전")
+    args = parser.parse_args()
+
+    target = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else date.today()
+    out_path = args.output or os.path.join(OUTBOX_DIR, f"alerts_{target:%Y%m%d}.jsonl")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+    con = duckdb.connect(args.db or resolve_db_path(), read_only=True)
+    t0 = time.perf_counter()
+    picked = pick_target_week(con, target, args.year)
+    if not picked:
+        print("❌ 대상 주차를 찾지 못했습니다.")
+        con.close()
+        return
+    year, week_range = picked
+    print(f"📅 기준 {target} -> {year}년 [{week_range}] 지침")
+
+    n_subs = load_subscribers(con, args.subscribers)
+    n_profiles = render_profiles(con, year, week_range)
+    subject = f"{target.month}월 {target.day}일 주간 영농 알림"
+    sent = write_outbox(con, out_path, subject, week_range)
+    con.close()
+    print(f"✅ 구독자 {n_subs}명 (프로필 {n_profiles}개) -> 알림 {sent}건: {out_path} ({time.perf_counter() - t0:.2f}s)")
+
+if __name__ == "__main__":
+    main()